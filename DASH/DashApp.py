@@ -1,51 +1,152 @@
 import dash
 import dash_table
+from dash_table.Format import Format, Scheme
+from dash_table import FormatTemplate
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
 import plotly.graph_objs as go
-import base64
-from os.path import join
+import flask
+import hmac
+import logging
+import os
+import time
+from os.path import abspath, dirname, join, relpath
+from threading import Lock
 
+import numpy as np
 import pandas as pd
 
+from cache_backends import open_backend
+from callback_cache import OutputCache
+from data_api import DataAPI
+from data_store import DEFAULT_LEAGUE, ODDS_DECIMALS, append_rows, files_signature, open_dataset, store_is_fresh, write_store_partition
+from data_watcher import DataWatcher
+from leaderboards import season_leaderboards
+from metrics import Metrics, StageTimer, instrument_callbacks
+from odds import BOOKMAKERS, ODDS_CSV, OddsAnalytics, read_matches
+from payloads import PayloadStats, enable_compression
+from search_index import dataset_search_index
+from standings import StandingsEngine
+from static_assets import PrebuiltLayout, add_asset_cache_headers, asset_url, fingerprint
+from table_queries import query_page, requested_page
+from team_profiles import FEATURES, open_profiles, profiles_path
+
 
 
 # I. DATA GATHERING AND PREPROCESSING -----------------------------------------------------------------------------------------------------
 
-root_path = 'assets'
+logging.basicConfig(level = os.environ.get('LIGANOS_LOG_LEVEL', 'INFO'))
+logger = logging.getLogger('DashApp')
+
+root_path = join(dirname(abspath(__file__)), 'assets')
+
+# First season shown (SeasonOrder 1 is 94/95)
+FirstSeason_Order = int(os.environ.get('LIGANOS_FIRST_SEASON', 1))
+
+# Maximum number of (league, season) data partitions kept in memory
+MAX_PARTITIONS = int(os.environ.get('LIGANOS_MAX_PARTITIONS', 32))
+
+# Callback outputs cache: maximum number of entries kept per callback and whether to compute all of them at startup
+CACHE_MAX_ENTRIES = int(os.environ.get('LIGANOS_CACHE_MAX_ENTRIES', 512))
+CACHE_PREWARM = os.environ.get('LIGANOS_CACHE_PREWARM', '0') == '1'
+
+# Callback outputs cache backend: 'memory' (per process), 'sqlite:///path/cache.sqlite' (shared by the workers of a host) or
+# 'redis://host:port/db' (shared by every host), and seconds each entry is served for (0: until evicted)
+CACHE_BACKEND = os.environ.get('LIGANOS_CACHE_BACKEND', 'memory')
+CACHE_TTL = float(os.environ.get('LIGANOS_CACHE_TTL', 0)) or None
+
+# Client-side round rendering: each season's cumulative points matrix and games are sent to the browser once, and the
+# round-level outputs (games table, live classification chart and round titles) are then rendered in JavaScript
+CLIENTSIDE_ROUNDS = os.environ.get('LIGANOS_CLIENTSIDE_ROUNDS', '0') == '1'
+
+# Hot reload: seconds between checks of the data files for a new version (0 disables the watcher)
+RELOAD_INTERVAL = float(os.environ.get('LIGANOS_RELOAD_INTERVAL', 10))
+
+# Pre-fork serving (set by gunicorn.conf.py): the data is loaded and the caches prewarmed once, before the workers are forked,
+# and each worker starts its own data watcher after the fork (start_data_watcher), as threads do not survive it
+PREFORK = os.environ.get('LIGANOS_PREFORK', '0') == '1'
+
+# Callback responses compression, in order of preference (brotli, then gzip; empty to disable)
+COMPRESSION = [algorithm for algorithm in os.environ.get('LIGANOS_COMPRESSION', 'br,gzip').split(',') if algorithm]
 
-FirstSeason_Order = 15
+# Payload sizes: every callback response is sized per output and logged (LIGANOS_PAYLOAD_SAMPLE > 1 only sizes one response in
+# every LIGANOS_PAYLOAD_SAMPLE, 0 none of them: the response sizes are still exported on /metrics)
+PAYLOAD_SAMPLE = int(os.environ.get('LIGANOS_PAYLOAD_SAMPLE', 1))
 
-# Uploading needed dataframes
+# Profiling: callback requests slower than LIGANOS_PROFILE_SLOW_MS are profiled with cProfile, one .prof file each in
+# PROFILE_FOLDER (0 disables it: profiling every request has a cost)
+PROFILE_THRESHOLD = float(os.environ.get('LIGANOS_PROFILE_SLOW_MS', 0)) / 1e3
+PROFILE_FOLDER = os.environ.get('LIGANOS_PROFILE_FOLDER', join(dirname(abspath(__file__)), 'profiles'))
+
+# Size of the season leaderboards (top-N scorers, assistants and most carded players), precomputed when a season is loaded
+LEADERBOARD_SIZE = int(os.environ.get('LIGANOS_LEADERBOARD_SIZE', 10))
+
+# Bookmaker selected by default in the betting odds view (when it quoted the season)
+ODDS_BOOKMAKER = os.environ.get('LIGANOS_ODDS_BOOKMAKER', 'B365')
+
+# Number of team profiles (k-means clusters of the team-seasons) of the similar teams view
+PROFILE_CLUSTERS = int(os.environ.get('LIGANOS_PROFILE_CLUSTERS', 6))
+
+# Live results: bearer token of the POST /ingest/<league>/<SeasonOrder> route (unset: the route is disabled)
+INGEST_TOKEN = os.environ.get('LIGANOS_INGEST_TOKEN')
+
+# Needed dataframes (from the columnar store built by data_store.py when available, from the CSVs otherwise):
+#   df_class         - classification table
+#   df_bcr           - cumulative classifications for each round
+#   df_games         - games
+#   df_scorers       - best scorers
+#   df_assists       - best assistants (since 0405)
+#   df_player_cards  - most undisciplined players
+# Only the metadata index (leagues, seasons and rounds) is read here: each (league, season) partition is loaded on first access
 df_list_csvs = ['df_class.csv', 'df_bcr.csv', 'df_games.csv', 'df_scorers.csv', 'df_assists.csv', 'df_player_cards.csv']
-df_list = []
 
-for i in range(len(df_list_csvs)):
-    df = pd.read_csv(join(root_path,
-                          df_list_csvs[i]),
-                     index_col = 0)
+# Files watched for a new data version: the dataframes, the match history the betting odds analytics are computed from and
+# the team profiles folder (a fit written by the batch step after the data changed is picked up as well)
+data_files = df_list_csvs + [ODDS_CSV, relpath(profiles_path(root_path), root_path)]
 
-    df['Season'] = df['Season'].map(lambda x: '0' * (4 - len(str(x))) + str(x))
-    df['Season'] = df['Season'].astype(str)
-    df['SeasonExtended'] = df['Season'].map(lambda x: '20' + x[:2] + "/" + x[2:])
-    
-    df = df[df['SeasonOrder'] >= FirstSeason_Order]
-    
-    df_list.append(df)
-    
-# For readability, each dataframe will be assigned a proper name
-df_class = df_list[0]                # Upload classification table (for all seasons)
-df_bcr = df_list[1]                  # Upload cumulative classifications for each round (for all seasons)
-df_games = df_list[2]                # Upload games (for all seasons)
-df_scorers = df_list[3]              # Upload best scorers (for all seasons)
-df_assists = df_list[4]              # Upload best assistants (since 0405)
-df_player_cards = df_list[5]         # Upload most undisciplined players (for all seasons)
+data_signature = files_signature(root_path, data_files)
+data = open_dataset(root_path, df_list_csvs, first_season_order = FirstSeason_Order, max_partitions = MAX_PARTITIONS,
+                    derive = lambda frames: season_leaderboards(frames, LEADERBOARD_SIZE))
+data_loaded_at = time.time()
+
+League_Default = DEFAULT_LEAGUE if DEFAULT_LEAGUE in data.leagues() else data.leagues()[0]
+Season_Default = data.seasons(League_Default)[-1]
+
+# Loading the partition shown on the first page load and reporting the memory footprint of the dataframes of every season (the
+# other partitions are read once for it, without being kept: only when the report is logged)
+data.partition(League_Default, Season_Default['SeasonOrder'])
+if logger.isEnabledFor(logging.INFO):
+    memory_report_df = data.memory_report(every_partition = True)
+    logger.info("Dataframes of the %d seasons (%.2f MB in total once loaded):\n%s", len(data.keys()),
+                memory_report_df['MB'].sum(), memory_report_df.round(3).to_string())
 
+# Betting odds analytics, computed at once over the whole match history (every season and bookmaker)
+odds_analytics = OddsAnalytics(read_matches(join(root_path, ODDS_CSV)))
 
+# Team profiles and similar team-seasons: fitted once per data version by the batch step (python team_profiles.py) and only
+# loaded here. None until the current data version has a fit: the similar teams view is then left empty
+team_profiles = open_profiles(root_path, clusters = PROFILE_CLUSTERS)
 
-logo_liganos = root_path + r'\liga-nos-png.png'
-logo_liganos_enc = base64.b64encode(open(logo_liganos, 'rb').read()).decode('ascii')
+# Player and team search: an inverted index of the names of every season, with their precomputed careers (a lookup per keystroke).
+# Built on the first search (or at startup when the caches are prewarmed), then kept up to date with the changed seasons only
+search_index = None
+search_index_lock = Lock()
+
+
+def current_search_index():
+    global search_index
+
+    if search_index is None:
+        with search_index_lock:
+            if search_index is None:
+                search_index = dataset_search_index(data)
+                logger.info("Indexed %d players and teams for search", len(search_index.profiles))
+    return search_index
+
+
+def season_marks(league):
+    return {season['SeasonOrder']: season['SeasonExtended'] for season in data.seasons(league)}
 
 
 
@@ -53,10 +154,135 @@ logo_liganos_enc = base64.b64encode(open(logo_liganos, 'rb').read()).decode('asc
 
 # II. APP LAYOUT -------------------------------------------------------------------------------------------------------------------------
 
-app = dash.Dash(__name__, show_undo_redo = False)
+app = dash.Dash(__name__, show_undo_redo = False, compress = False)
+server = app.server          # WSGI entry point for production servers, e.g. gunicorn -c gunicorn.conf.py DashApp:server
+
+# Dash sets its logger (named after this module, so the parent of the DashApp.* loggers) to INFO: LIGANOS_LOG_LEVEL applies to it too
+app.logger.setLevel(logging.getLogger().level)
+
+# Callback latency histograms and stage timers, exported in the Prometheus format on /metrics
+metrics = Metrics()
+instrument_callbacks(app, metrics, profile_threshold = PROFILE_THRESHOLD, profile_folder = PROFILE_FOLDER)
+
+# Callback responses are compressed, and the size of each output is counted, logged and exported on /metrics
+enable_compression(app, COMPRESSION)
+payload_stats = PayloadStats(sample_every = PAYLOAD_SAMPLE, metrics = metrics)
+payload_stats.attach(app)
+
+# Static files (logo, stylesheet) are served from assets/ with fingerprinted URLs and long-lived cache headers
+add_asset_cache_headers(app)
 
 BackgroundBlue = "#253275"
 
+# Tables are persistent components styled here, once: the callbacks only send their rows
+table_style = dict(style_cell = {'textAlign': 'center',
+                                 'backgroundColor': BackgroundBlue,
+                                 'border': '0px',
+                                 'fontSize': 11,
+                                 'fontFamily': 'Segoe UI Light',
+                                 'color': 'white',
+                                 'height': 8},
+                   style_header = {'backgroundColor': BackgroundBlue,
+                                   'textAlign': 'center',
+                                   'float': 'center',
+                                   'fontFamily': 'Segoe UI Light',
+                                   'fontWeight': 'bold',
+                                   'color': 'white'})
+
+# Final classification table
+classification_table_columns = ['Position', 'Team', 'Games', 'Won', 'Drawn', 'Lost', 'Points',
+                                'GoalsScored', 'GoalsConceded', 'GoalsDifference']
+classification_table_style = dict(table_style, style_cell = dict(table_style['style_cell'], fontSize = 12))
+
+# Round games table, shared by the server-side and client-side rendering paths
+games_table_columns = ['Date', 'B365H', 'B365D', 'B365A', 'Match']
+
+# Charts template: fonts, colours and axes styling shared by the line and bar charts, so each figure only carries its data,
+# title and size. Point labels are drawn from the trace values (texttemplate) instead of one annotation per point
+charts_template = go.layout.Template(
+                    layout = go.Layout(
+                                bargap = 0.35,
+                                xaxis = dict(color = 'white'),
+                                yaxis = dict(ticks = 'outside',
+                                             tickcolor = BackgroundBlue,
+                                             color = 'white'),
+                                font = {"family": "Segoe UI Light", "color": "white"},
+                                hovermode = 'closest',
+                                paper_bgcolor = BackgroundBlue,
+                                plot_bgcolor = BackgroundBlue,
+                                autosize = False))
+
+# Top-N leaderboards view (expandable)
+leaderboard_tables = {'leaderboard-scorers': ('leaderboard_scorers', "Top Scorers", ['Rank', 'Player', 'Team', 'J', 'G', 'PEN']),
+                      'leaderboard-assists': ('leaderboard_assists', "Top Assists", ['Rank', 'Player', 'Team', 'J', 'G', 'ASS']),
+                      'leaderboard-discipline': ('leaderboard_discipline', "Discipline", ['Rank', 'Player', 'Team', 'J', 'A', '2A', 'VE'])}
+
+# Betting odds view (expandable): the bookmakers that quoted the season, and the calibration, teams and history of the selected one
+percentage_format = FormatTemplate.percentage(1)
+odds_bookmakers_columns = [{"name": "Bookmaker", "id": 'Name'},
+                           {"name": "Matches", "id": 'Matches'}] + \
+                          [{"name": name, "id": column, 'type': 'numeric', 'format': percentage_format}
+                           for column, name in [('Margin', "Margin"), ('FavouriteWins', "Favourite Wins"),
+                                                ('FavouriteROI', "Favourite ROI"), ('UnderdogROI', "Underdog ROI"),
+                                                ('HomeROI', "Home ROI"), ('DrawROI', "Draw ROI"), ('AwayROI', "Away ROI")]] + \
+                          [{"name": "Brier", "id": 'Brier', 'type': 'numeric', 'format': Format(precision = 3, scheme = Scheme.fixed)}]
+odds_teams_columns = [{"name": "Team", "id": 'Team'},
+                      {"name": "Matches", "id": 'Matches'},
+                      {"name": "Wins", "id": 'Wins'},
+                      {"name": "Expected Wins", "id": 'ExpectedWins', 'type': 'numeric', 'format': Format(precision = 1, scheme = Scheme.fixed)},
+                      {"name": "ROI", "id": 'ROI', 'type': 'numeric', 'format': percentage_format}]
+
+# Similar teams view (expandable): the team-seasons of other seasons closest to the selected team, and their features
+similar_teams_columns = [{"name": "Rank", "id": 'Rank'},
+                         {"name": "Season", "id": 'SimilarSeasonExtended'},
+                         {"name": "Team", "id": 'SimilarTeam'},
+                         {"name": "Position", "id": 'SimilarPosition'},
+                         {"name": "Points", "id": 'SimilarPoints'},
+                         {"name": "Profile", "id": 'SimilarProfile'},
+                         {"name": "Distance", "id": 'Distance', 'type': 'numeric', 'format': Format(precision = 2, scheme = Scheme.fixed)}]
+SIMILAR_TEAMS_CHART = 3          # similar team-seasons compared in the features chart
+
+# Player and team search view (expandable): the names matching the query, and the season-by-season profile of the selected one
+search_columns = {'Team': [{"name": "Season", "id": 'SeasonExtended'},
+                           {"name": "Position", "id": 'Position'},
+                           {"name": "Games", "id": 'Games'},
+                           {"name": "Won", "id": 'Won'},
+                           {"name": "Drawn", "id": 'Drawn'},
+                           {"name": "Lost", "id": 'Lost'},
+                           {"name": "Points", "id": 'Points'},
+                           {"name": "Scored", "id": 'GoalsScored'},
+                           {"name": "Conceded", "id": 'GoalsConceded'},
+                           {"name": "Top Scorer", "id": 'TopScorer'},
+                           {"name": "Goals", "id": 'TopScorerGoals'}],
+                  'Player': [{"name": "Season", "id": 'SeasonExtended'},
+                             {"name": "Team", "id": 'Team'},
+                             {"name": "Games", "id": 'Games'},
+                             {"name": "Goals", "id": 'Goals'},
+                             {"name": "Penalties", "id": 'Penalties'},
+                             {"name": "Assists", "id": 'Assists'},
+                             {"name": "Yellow", "id": 'Yellow'},
+                             {"name": "2nd Yellow", "id": 'SecondYellow'},
+                             {"name": "Red", "id": 'Red'}]}
+
+# History tables (full season fixtures and classification explorer): paged, sorted and filtered on the server, so the
+# browser only ever receives TABLE_PAGE_SIZE rows
+TABLE_PAGE_SIZE = 10
+fixtures_table_columns = ['Round', 'Date', 'Match', 'B365H', 'B365D', 'B365A']
+explorer_table_columns = ['Season', 'Position', 'Team', 'Games', 'Won', 'Drawn', 'Lost', 'Points',
+                          'GoalsScored', 'GoalsConceded', 'GoalsDifference']
+# Numeric columns are declared as such, so a bare filter value (e.g. '70') is read as '= 70' and not as 'contains 70'
+history_text_columns = ['Date', 'Match', 'Season', 'Team']
+history_table_options = dict(page_current = 0,
+                             page_size = TABLE_PAGE_SIZE,
+                             page_action = 'custom',
+                             sort_action = 'custom',
+                             sort_mode = 'multi',
+                             sort_by = [],
+                             filter_action = 'custom',
+                             filter_query = '',
+                             style_filter = {'backgroundColor': 'white', 'color': BackgroundBlue},
+                             **table_style)
+
 
 
 app.layout = html.Div(
@@ -76,7 +302,7 @@ app.layout = html.Div(
                 html.Div(
                     [
                         html.Img(
-                            src = 'data:image/png;base64,{}'.format(logo_liganos_enc),
+                            src = asset_url(app, 'liga-nos-png.png'),
                             style = {'float': 'right',
                                      'height': '70%',
                                      'width': '70%',
@@ -96,16 +322,20 @@ app.layout = html.Div(
                             children = "Select a season and check how your team performed along the way",
                             style = {'textAlign': 'left', }
                         ),
+                        # League selector, only shown when the dataset holds more than one league
+                        dcc.Dropdown(
+                            id = 'league-dropdown',
+                            options = [{'label': league, 'value': league} for league in data.leagues()],
+                            value = League_Default,
+                            clearable = False,
+                            style = {'display': 'block' if len(data.leagues()) > 1 else 'none',
+                                     'marginBottom': '0.5em'}),
                         dcc.Slider(
                             id = 'season-slider',
-                            min = df_class['SeasonOrder'].min(),
-                            max = df_class['SeasonOrder'].max(),
-                            value = df_class['SeasonOrder'].max(),
-                            marks = df_class[['SeasonExtended', 'SeasonOrder']] \
-                                            .drop_duplicates() \
-                                            .set_index('SeasonOrder') \
-                                            .to_dict() \
-                                            ['SeasonExtended'],
+                            min = min(season_marks(League_Default)),
+                            max = max(season_marks(League_Default)),
+                            value = Season_Default['SeasonOrder'],
+                            marks = season_marks(League_Default),
                             step = None,
                             included = False)
 
@@ -119,10 +349,10 @@ app.layout = html.Div(
                             style = {'textAlign': 'left'}),
                         dcc.Slider(
                             id = 'round-slider',
-                            min = df_bcr['Round'].min(),
-                            max = df_bcr['Round'].max(),
-                            value = df_bcr['Round'].max() - 5,
-                            marks = {str(i): str(i) for i in df_bcr['Round'].unique()},
+                            min = Season_Default['FirstRound'],
+                            max = Season_Default['LastRound'],
+                            value = Season_Default['LastRound'] - 5,
+                            marks = {str(i): str(i) for i in range(Season_Default['FirstRound'], Season_Default['LastRound'] + 1)},
                             step = None,
                             included = False)
                     ], className = "four columns", style = {'margin-left': 0,
@@ -141,7 +371,11 @@ app.layout = html.Div(
                              'marginTop': '0.0em',
                              'fontWeight': 'bold'}),
                 # Classification Table
-                html.Div(id = 'classification-table', style = {'marginBottom': '2.0em'}),
+                html.Div(id = 'classification-table',
+                         children = dash_table.DataTable(id = 'classification-datatable',
+                                                         columns = [{"name": i, "id": i} for i in classification_table_columns],
+                                                         **classification_table_style),
+                         style = {'marginBottom': '2.0em'}),
                 html.Div(
                     [
                         # 1st Card - Best Attacking Team
@@ -299,9 +533,13 @@ app.layout = html.Div(
                     style = {'textAlign': 'right',
                              'marginTop': '0.0em',
                              'fontWeight': 'bold'}),
-                # Games Table
-                html.Div(id = 'games-table', style = {'margin-top': '0.0em',
-                                                      'marginBottom': '1.0em'}),
+                # Games Table (a persistent table whose data is replaced on every round)
+                html.Div(id = 'games-table',
+                         children = dash_table.DataTable(id = 'games-datatable',
+                                                         columns = [{"name": i, "id": i} for i in games_table_columns],
+                                                         **table_style),
+                         style = {'margin-top': '0.0em',
+                                  'marginBottom': '1.0em'}),
                 html.H6(
                     id = 'right-chart-title',
                     children = "Live Classification",
@@ -309,9 +547,212 @@ app.layout = html.Div(
                              'marginTop': '0.0em',
                              'fontWeight': 'bold'}),
                 # Round Classification Bar Chart
-                html.Div(dcc.Graph(id = 'round-classification-bar-chart')),                
+                html.Div(dcc.Graph(id = 'round-classification-bar-chart')),
+                # Season points matrix and games, for the client-side round rendering
+                dcc.Store(id = 'season-rounds-store'),
             ], className="four columns", style = {'float': 'right'},
         ),
+
+        # STANDINGS RACE ROW (expandable animated classification, one frame per round, played in the browser)
+        html.Details(
+            [
+                html.Summary(
+                    id = 'standings-race-title',
+                    children = "Standings Race",
+                    style = {'fontWeight': 'bold',
+                             'cursor': 'pointer'}),
+                dcc.Graph(id = 'standings-race-chart', config = {'displayModeBar': False})
+            ], className = 'row', style = {'clear': 'both',
+                                           'paddingTop': '2.5em'}
+        ),
+
+        # LEADERBOARDS ROW (expandable top-N view of the season leaderboards)
+        html.Details(
+            [
+                html.Summary(
+                    id = 'leaderboards-title',
+                    children = "Top " + str(LEADERBOARD_SIZE) + " Players",
+                    style = {'fontWeight': 'bold',
+                             'cursor': 'pointer'}),
+                html.Div(
+                    [
+                        html.Div(
+                            [
+                                html.H6(
+                                    children = title,
+                                    style = {'textAlign': 'left',
+                                             'fontWeight': 'bold'}),
+                                dash_table.DataTable(
+                                    id = table_id,
+                                    columns = [{"name": i, "id": i} for i in columns],
+                                    **table_style)
+                            ], className = "four columns", style = {'margin-left': 0} if position == 0 else {})
+                        for position, (table_id, (_, title, columns)) in enumerate(leaderboard_tables.items())
+                    ], className = 'row'),
+            ], className = 'row', style = {'clear': 'both',
+                                           'paddingTop': '2.5em'}
+        ),
+
+        # ODDS ROW (expandable betting odds analytics of the season)
+        html.Details(
+            [
+                html.Summary(
+                    id = 'odds-title',
+                    children = "Betting Odds Analytics",
+                    style = {'fontWeight': 'bold',
+                             'cursor': 'pointer'}),
+                html.Div(
+                    [
+                        # Bookmakers of the season
+                        html.Div(
+                            [
+                                html.H6(
+                                    children = "Bookmakers",
+                                    style = {'textAlign': 'left',
+                                             'fontWeight': 'bold'}),
+                                dcc.Dropdown(
+                                    id = 'odds-bookmaker-dropdown',
+                                    clearable = False,
+                                    style = {'color': BackgroundBlue,
+                                             'marginBottom': '0.5em'}),
+                                dash_table.DataTable(
+                                    id = 'odds-bookmakers-table',
+                                    columns = odds_bookmakers_columns,
+                                    sort_action = 'native',
+                                    **table_style)
+                            ], className = "seven columns", style = {'margin-left': 0}),
+                        # Calibration of the selected bookmaker
+                        html.Div(dcc.Graph(id = 'odds-calibration-chart'), className = "five columns", style = {'float': 'right'}),
+                    ], className = 'row'),
+                html.Div(
+                    [
+                        # Backing each team at the selected bookmaker
+                        html.Div(
+                            [
+                                html.H6(
+                                    id = 'odds-teams-title',
+                                    children = "Teams",
+                                    style = {'textAlign': 'left',
+                                             'fontWeight': 'bold'}),
+                                dash_table.DataTable(
+                                    id = 'odds-teams-table',
+                                    columns = odds_teams_columns,
+                                    sort_action = 'native',
+                                    **table_style)
+                            ], className = "five columns", style = {'margin-left': 0}),
+                        # Margin and favourite wins of the selected bookmaker, season by season
+                        html.Div(dcc.Graph(id = 'odds-history-chart'), className = "seven columns", style = {'float': 'right'}),
+                    ], className = 'row', style = {'paddingTop': '1.0em'}),
+            ], className = 'row', style = {'clear': 'both',
+                                           'paddingTop': '2.5em'}
+        ),
+
+        # SIMILAR TEAMS ROW (expandable: team profiles and the closest team-seasons of other seasons)
+        html.Details(
+            [
+                html.Summary(
+                    id = 'similar-teams-title',
+                    children = "Similar Teams Across Eras",
+                    style = {'fontWeight': 'bold',
+                             'cursor': 'pointer'}),
+                html.Div(
+                    [
+                        html.Div(
+                            [
+                                dcc.Dropdown(
+                                    id = 'similar-team-dropdown',
+                                    clearable = False,
+                                    style = {'color': BackgroundBlue,
+                                             'marginBottom': '0.5em'}),
+                                html.P(id = 'similar-team-profile', style = {'textAlign': 'left',
+                                                                             'fontSize': 13}),
+                                dash_table.DataTable(
+                                    id = 'similar-teams-table',
+                                    columns = similar_teams_columns,
+                                    **table_style)
+                            ], className = "five columns", style = {'margin-left': 0}),
+                        # Standardized features of the team and of its closest team-seasons
+                        html.Div(dcc.Graph(id = 'similar-teams-chart'), className = "seven columns", style = {'float': 'right'}),
+                    ], className = 'row'),
+            ], className = 'row', style = {'clear': 'both',
+                                           'paddingTop': '2.5em'}
+        ),
+
+        # SEARCH ROW (expandable: any player's or team's history, across every season)
+        html.Details(
+            [
+                html.Summary("Player & Team Search", style = {'fontWeight': 'bold',
+                                                              'cursor': 'pointer'}),
+                html.Div(
+                    [
+                        html.Div(
+                            [
+                                dcc.Input(
+                                    id = 'search-input',
+                                    type = 'search',
+                                    placeholder = "Player or team (e.g. guimaraes, jardel)",
+                                    debounce = False,
+                                    style = {'width': '100%',
+                                             'marginBottom': '0.5em'}),
+                                dcc.RadioItems(
+                                    id = 'search-results',
+                                    labelStyle = {'display': 'block',
+                                                  'fontSize': 13}),
+                            ], className = "three columns", style = {'margin-left': 0}),
+                        html.Div(
+                            [
+                                html.P(id = 'search-profile-summary', style = {'textAlign': 'left',
+                                                                               'fontSize': 13}),
+                                dash_table.DataTable(
+                                    id = 'search-profile-table',
+                                    columns = search_columns['Team'],
+                                    **table_style)
+                            ], className = "nine columns", style = {'float': 'right'}),
+                    ], className = 'row'),
+            ], className = 'row', style = {'clear': 'both',
+                                           'paddingTop': '2.5em'}
+        ),
+
+        # HISTORY ROW
+        html.Div(
+            [
+                # Full Season Fixtures
+                html.Div(
+                    [
+                        html.H6(
+                            id = 'fixtures-title',
+                            children = "Season Fixtures",
+                            style = {'textAlign': 'left',
+                                     'fontWeight': 'bold'}),
+                        dash_table.DataTable(
+                            id = 'fixtures-table',
+                            columns = [{"name": i, "id": i, 'type': 'text' if i in history_text_columns else 'numeric'}
+                                       for i in fixtures_table_columns],
+                            **history_table_options)
+                    ], className = "six columns", style = {'margin-left': 0}),
+                # Multi-season Classification Explorer
+                html.Div(
+                    [
+                        html.H6(
+                            children = "Classification Explorer",
+                            style = {'textAlign': 'right',
+                                     'fontWeight': 'bold'}),
+                        dcc.RangeSlider(
+                            id = 'explorer-season-range',
+                            min = min(season_marks(League_Default)),
+                            max = max(season_marks(League_Default)),
+                            value = [max(min(season_marks(League_Default)), Season_Default['SeasonOrder'] - 4), Season_Default['SeasonOrder']],
+                            marks = season_marks(League_Default),
+                            step = None),
+                        dash_table.DataTable(
+                            id = 'classification-explorer',
+                            columns = [{"name": i, "id": i, 'type': 'text' if i in history_text_columns else 'numeric'}
+                                       for i in explorer_table_columns],
+                            **history_table_options)
+                    ], className = "six columns", style = {'float': 'right'}),
+            ], className = 'row', style = {'clear': 'both',
+                                           'paddingTop': '2.5em'}
+        ),
                 
     ], style = {'margin-top': 50,
                 'margin-right': 100,
@@ -319,18 +760,40 @@ app.layout = html.Div(
                 'margin-down': 30}
 )
 
+# The layout is static: it is serialized and gzip-compressed once, and served as is on every page load
+prebuilt_layout = PrebuiltLayout(app)
+
+# Read-only data API (/api/v1): each season's tables, prebuilt in JSON and Arrow, precompressed and served with strong ETags
+data_api = DataAPI(app, data, encodings = COMPRESSION)
+
 
                 
 # II. APP DYNAMICS -------------------------------------------------------------------------------------------------------------------------
+
+@app.callback(
+    [Output(component_id = 'season-slider', component_property = 'min'),
+     Output(component_id = 'season-slider', component_property = 'max'),
+     Output(component_id = 'season-slider', component_property = 'marks'),
+     Output(component_id = 'season-slider', component_property = 'value'),
+     Output(component_id = 'explorer-season-range', component_property = 'min'),
+     Output(component_id = 'explorer-season-range', component_property = 'max'),
+     Output(component_id = 'explorer-season-range', component_property = 'marks'),
+     Output(component_id = 'explorer-season-range', component_property = 'value')],
+    [Input(component_id = 'league-dropdown', component_property = 'value')]
+)
+def update_league_seasons(selected_league):
+    marks = season_marks(selected_league)
+    return min(marks), max(marks), marks, max(marks), \
+           min(marks), max(marks), marks, [max(min(marks), max(marks) - 4), max(marks)]
+
                 
 @app.callback(
     [Output(component_id = 'season-slider-title', component_property = 'children'),
-     Output(component_id = 'round-slider-title', component_property = 'children'),
      Output(component_id = 'round-slider', component_property = 'min'),
      Output(component_id = 'round-slider', component_property = 'max'),
      Output(component_id = 'round-slider', component_property = 'marks'),
      Output(component_id = 'left-title', component_property = 'children'),
-     Output(component_id = 'classification-table', component_property = 'children'),
+     Output(component_id = 'classification-datatable', component_property = 'data'),
      Output(component_id = 'card-best-attack', component_property = 'children'),
      Output(component_id = 'card-best-attack-2', component_property = 'children'),
      Output(component_id = 'card-best-deffence', component_property = 'children'),
@@ -346,21 +809,214 @@ app.layout = html.Div(
      Output(component_id = 'top-discipline-1', component_property = 'children'),
      Output(component_id = 'top-discipline-2', component_property = 'children'),
      Output(component_id = 'top-discipline-3', component_property = 'children'),
-     Output(component_id = 'line-chart', component_property = 'figure'),
-     Output(component_id = 'right-table-title', component_property = 'children'),
-     Output(component_id = 'games-table', component_property = 'children'),
-     Output(component_id = 'right-chart-title', component_property = 'children'),
-     Output(component_id = 'round-classification-bar-chart', component_property = 'figure')],
-    [Input(component_id = 'season-slider', component_property = 'value'),
-     Input(component_id = 'round-slider', component_property = 'value')]
+     Output(component_id = 'line-chart', component_property = 'figure')],
+    [Input(component_id = 'league-dropdown', component_property = 'value'),
+     Input(component_id = 'season-slider', component_property = 'value')]
+)
+def update_season_stats(selected_league, selected_season):
+    return season_stats_cache.get(selected_league, selected_season)
+
+
+if CLIENTSIDE_ROUNDS:
+    @app.callback(
+        Output(component_id = 'season-rounds-store', component_property = 'data'),
+        [Input(component_id = 'league-dropdown', component_property = 'value'),
+         Input(component_id = 'season-slider', component_property = 'value')]
+    )
+    def update_season_rounds(selected_league, selected_season):
+        return season_rounds_cache.get(selected_league, selected_season)
+
+    # Rendered by window.dash_clientside.liganos.round_stats (assets/clientside.js): no server round-trip per round
+    app.clientside_callback(
+        ClientsideFunction(namespace = 'liganos', function_name = 'round_stats'),
+        [Output(component_id = 'round-slider-title', component_property = 'children'),
+         Output(component_id = 'right-table-title', component_property = 'children'),
+         Output(component_id = 'games-datatable', component_property = 'data'),
+         Output(component_id = 'right-chart-title', component_property = 'children'),
+         Output(component_id = 'round-classification-bar-chart', component_property = 'figure')],
+        [Input(component_id = 'season-rounds-store', component_property = 'data'),
+         Input(component_id = 'round-slider', component_property = 'value')]
+    )
+else:
+    @app.callback(
+        [Output(component_id = 'round-slider-title', component_property = 'children'),
+         Output(component_id = 'right-table-title', component_property = 'children'),
+         Output(component_id = 'games-datatable', component_property = 'data'),
+         Output(component_id = 'right-chart-title', component_property = 'children'),
+         Output(component_id = 'round-classification-bar-chart', component_property = 'figure')],
+        [Input(component_id = 'league-dropdown', component_property = 'value'),
+         Input(component_id = 'season-slider', component_property = 'value'),
+         Input(component_id = 'round-slider', component_property = 'value')]
+    )
+    def update_round_stats(selected_league, selected_season, selected_round):
+        return round_stats_cache.get(selected_league, selected_season, selected_round)
+
+
+# Standings race: the whole animation is sent once per season, playing it needs no callback
+@app.callback(
+    [Output(component_id = 'standings-race-title', component_property = 'children'),
+     Output(component_id = 'standings-race-chart', component_property = 'figure')],
+    [Input(component_id = 'league-dropdown', component_property = 'value'),
+     Input(component_id = 'season-slider', component_property = 'value')]
+)
+def update_standings_race(selected_league, selected_season):
+    return standings_race_cache.get(selected_league, selected_season)
+
+
+# Top-N leaderboards view: served straight from the precomputed season leaderboards
+@app.callback(
+    [Output(component_id = 'leaderboards-title', component_property = 'children')] +
+    [Output(component_id = table_id, component_property = 'data') for table_id in leaderboard_tables],
+    [Input(component_id = 'league-dropdown', component_property = 'value'),
+     Input(component_id = 'season-slider', component_property = 'value')]
+)
+def update_leaderboards(selected_league, selected_season):
+    title = "Top " + str(LEADERBOARD_SIZE) + " Players - Season " + data.season_info(selected_league, selected_season)['SeasonExtended']
+    return [title] + [data.season(name, selected_league, selected_season)[columns].to_dict('records')
+                      for name, _, columns in leaderboard_tables.values()]
+
+
+# Betting odds view: the bookmakers that quoted the season (the selected one is kept when it did), then its precomputed analytics
+@app.callback(
+    [Output(component_id = 'odds-bookmaker-dropdown', component_property = 'options'),
+     Output(component_id = 'odds-bookmaker-dropdown', component_property = 'value')],
+    [Input(component_id = 'league-dropdown', component_property = 'value'),
+     Input(component_id = 'season-slider', component_property = 'value')],
+    [State(component_id = 'odds-bookmaker-dropdown', component_property = 'value')]
+)
+def update_odds_bookmakers(selected_league, selected_season, selected_bookmaker):
+    bookmakers = list(odds_analytics.season_bookmakers(selected_league, selected_season)['Bookmaker'])
+    if selected_bookmaker not in bookmakers:
+        selected_bookmaker = ODDS_BOOKMAKER if ODDS_BOOKMAKER in bookmakers else next(iter(bookmakers), None)
+
+    return [{'label': BOOKMAKERS[bookmaker], 'value': bookmaker} for bookmaker in bookmakers], selected_bookmaker
+
+
+@app.callback(
+    [Output(component_id = 'odds-title', component_property = 'children'),
+     Output(component_id = 'odds-bookmakers-table', component_property = 'data'),
+     Output(component_id = 'odds-calibration-chart', component_property = 'figure'),
+     Output(component_id = 'odds-teams-title', component_property = 'children'),
+     Output(component_id = 'odds-teams-table', component_property = 'data'),
+     Output(component_id = 'odds-history-chart', component_property = 'figure')],
+    [Input(component_id = 'league-dropdown', component_property = 'value'),
+     Input(component_id = 'season-slider', component_property = 'value'),
+     Input(component_id = 'odds-bookmaker-dropdown', component_property = 'value')]
+)
+def update_odds_stats(selected_league, selected_season, selected_bookmaker):
+    return odds_stats_cache.get(selected_league, selected_season, selected_bookmaker)
+
+
+# Similar teams view: the teams of the season (the selected one is kept when it played it, the champion otherwise), then the
+# precomputed profile and closest team-seasons of the selected team
+@app.callback(
+    [Output(component_id = 'similar-team-dropdown', component_property = 'options'),
+     Output(component_id = 'similar-team-dropdown', component_property = 'value')],
+    [Input(component_id = 'league-dropdown', component_property = 'value'),
+     Input(component_id = 'season-slider', component_property = 'value')],
+    [State(component_id = 'similar-team-dropdown', component_property = 'value')]
+)
+def update_similar_team_options(selected_league, selected_season, selected_team):
+    teams = [] if team_profiles is None else list(team_profiles.season_teams(selected_league, selected_season)['Team'])
+    if selected_team not in teams:
+        selected_team = next(iter(teams), None)
+
+    return [{'label': team, 'value': team} for team in teams], selected_team
+
+
+@app.callback(
+    [Output(component_id = 'similar-teams-title', component_property = 'children'),
+     Output(component_id = 'similar-team-profile', component_property = 'children'),
+     Output(component_id = 'similar-teams-table', component_property = 'data'),
+     Output(component_id = 'similar-teams-chart', component_property = 'figure')],
+    [Input(component_id = 'league-dropdown', component_property = 'value'),
+     Input(component_id = 'season-slider', component_property = 'value'),
+     Input(component_id = 'similar-team-dropdown', component_property = 'value')]
+)
+def update_similar_teams(selected_league, selected_season, selected_team):
+    return similar_teams_cache.get(selected_league, selected_season, selected_team)
+
+
+# Player and team search: the matches of the query (the selected name is kept while it still matches, the best match otherwise),
+# then the precomputed profile of the selected one. Both are index lookups, answered on every keystroke
+@app.callback(
+    [Output(component_id = 'search-results', component_property = 'options'),
+     Output(component_id = 'search-results', component_property = 'value')],
+    [Input(component_id = 'search-input', component_property = 'value')],
+    [State(component_id = 'search-results', component_property = 'value')]
 )
-def update_season_stats(selected_season, selected_round):
+def update_search_results(query, selected_result):
+    results = current_search_index().search(query or '')
+    options = [{'label': "{} ({}, {} season{})".format(result['Name'], result['Kind'], result['Seasons'],
+                                                      '' if result['Seasons'] == 1 else 's'),
+                'value': result['Kind'] + '|' + result['Name']} for result in results]
+    values = [option['value'] for option in options]
+
+    return options, selected_result if selected_result in values else next(iter(values), None)
+
+
+@app.callback(
+    [Output(component_id = 'search-profile-summary', component_property = 'children'),
+     Output(component_id = 'search-profile-table', component_property = 'columns'),
+     Output(component_id = 'search-profile-table', component_property = 'data')],
+    [Input(component_id = 'search-results', component_property = 'value')]
+)
+def update_search_profile(selected_result):
+    profile = current_search_index().profile(*selected_result.split('|', 1)) if selected_result else None
+    if profile is None:
+        return "", search_columns['Team'], []
+
+    return profile_summary(profile), search_columns[profile['Kind']], profile['Seasons'][::-1]
+
+
+# History tables: back to the first page whenever the data or the filter behind them changes. The page is reset in the same
+# callback (page_current is both an input and an output, see table_queries.requested_page), so a change costs one round trip
+@app.callback(
+    [Output(component_id = 'fixtures-title', component_property = 'children'),
+     Output(component_id = 'fixtures-table', component_property = 'data'),
+     Output(component_id = 'fixtures-table', component_property = 'page_count'),
+     Output(component_id = 'fixtures-table', component_property = 'page_current')],
+    [Input(component_id = 'league-dropdown', component_property = 'value'),
+     Input(component_id = 'season-slider', component_property = 'value'),
+     Input(component_id = 'fixtures-table', component_property = 'page_current'),
+     Input(component_id = 'fixtures-table', component_property = 'page_size'),
+     Input(component_id = 'fixtures-table', component_property = 'sort_by'),
+     Input(component_id = 'fixtures-table', component_property = 'filter_query')]
+)
+def update_fixtures_table(selected_league, selected_season, page_current, page_size, sort_by, filter_query):
+    page_current = requested_page(page_current, dash.callback_context.triggered,
+                                  ['league-dropdown.value', 'season-slider.value', 'fixtures-table.filter_query'])
+    rows, page_count, page_current = query_page(fixtures_rows(selected_league, selected_season), page_current, page_size, sort_by, filter_query)
+    return "Season " + data.season_info(selected_league, selected_season)['SeasonExtended'] + " Fixtures", rows, page_count, page_current
+
+
+@app.callback(
+    [Output(component_id = 'classification-explorer', component_property = 'data'),
+     Output(component_id = 'classification-explorer', component_property = 'page_count'),
+     Output(component_id = 'classification-explorer', component_property = 'page_current')],
+    [Input(component_id = 'league-dropdown', component_property = 'value'),
+     Input(component_id = 'explorer-season-range', component_property = 'value'),
+     Input(component_id = 'classification-explorer', component_property = 'page_current'),
+     Input(component_id = 'classification-explorer', component_property = 'page_size'),
+     Input(component_id = 'classification-explorer', component_property = 'sort_by'),
+     Input(component_id = 'classification-explorer', component_property = 'filter_query')]
+)
+def update_classification_explorer(selected_league, selected_seasons, page_current, page_size, sort_by, filter_query):
+    page_current = requested_page(page_current, dash.callback_context.triggered,
+                                  ['league-dropdown.value', 'explorer-season-range.value', 'classification-explorer.filter_query'])
+    rows, page_count, page_current = query_page(classification_history(selected_league, *selected_seasons), page_current, page_size,
+                                                sort_by, filter_query)
+    return rows, page_count, page_current
+
+
+# Season-scoped outputs: only recomputed when the season changes
+def compute_season_stats(selected_league, selected_season):
+    stages = StageTimer(metrics, 'compute_season_stats')
     
     # I. Filtering Dataframes -------------------------------------------------------------------------------------------------------
     
     # Filtering df_class for selected_season
-    df_class_filtered = df_class[df_class['SeasonOrder'] == selected_season]
-    season = df_class_filtered['Season'].values[0]
+    df_class_filtered = data.season('df_class', selected_league, selected_season)
     df_class_filtered = df_class_filtered[['Team', 'Games', 'Won', 'Drawn', 'Lost',
                                            'Points', 'GoalsScored', 'GoalsConceded', 'GoalsDifference', 'VE', '2A', 'A']] \
                                          .reset_index() \
@@ -368,242 +1024,88 @@ def update_season_stats(selected_season, selected_round):
     df_class_filtered['Position'] = pd.Series([i for i in range(1, len(df_class_filtered) + 1)])
     
     # Filtering df_bcr for selected_season
-    df_bcr_seasonfiltered = df_bcr[df_bcr['SeasonOrder'] == selected_season] \
-                                  [['Round', 'Team', 'TotalPoints']]
-                            
-    # Filtering df_bcr for selected_round
-    df_bcr_roundfiltered = df_bcr_seasonfiltered[df_bcr_seasonfiltered['Round'] == selected_round] \
-                                                [['Team', 'TotalPoints']] \
-                                                .reset_index() \
-                                                .rename(columns = {'TotalPoints': 'Points'}) \
-                                                .sort_values(by = 'Points')
+    df_bcr_seasonfiltered = data.season('df_bcr', selected_league, selected_season)[['Round', 'Team', 'TotalPoints']]
+    stages.lap('filtering')
     
 
 
     # II. FILTER ROW ---------------------------------------------------------------------------------------------------------------
-    string_season = "Season " + '20' + season[:2] + '/' + season[2:]
+    string_season = "Season " + data.season_info(selected_league, selected_season)['SeasonExtended']
     
     # Season Slider Title
     season_slider_title = "Check how your team performed along the years - now rewinding " + string_season
     
     # Round Slider
-    round_slider_title = string_season + " storyline, by the times of round " + str(selected_round)
     round_slider_min = df_bcr_seasonfiltered['Round'].min()
     round_slider_max = df_bcr_seasonfiltered['Round'].max()
     round_slider_marks = {str(i): str(i) for i in df_bcr_seasonfiltered['Round']}
+    stages.lap('filter_row')
     
     
 
     # III. LEFT COLUMN ---------------------------------------------------------------------------------------------------------- 
     string_left = string_season + ' - Final Classification'     
     
-    df_class_toshow = df_class_filtered.drop(columns = ['VE', '2A', 'A'])
-    
-    table_final_classification = (dash_table.DataTable(
-                                                columns = [{"name": i, "id": i} for i in df_class_toshow.columns],
-                                                data = df_class_toshow.to_dict('records'),
-                                                style_cell = {
-                                                    'textAlign': 'center',
-                                                    'backgroundColor': BackgroundBlue,
-                                                    'border': '0px',
-                                                    'fontSize': 12,
-                                                    'fontFamily': 'Segoe UI Light',
-                                                    'color': 'white',
-                                                    'height': 8},
-                                                style_header = {
-                                                    'backgroundColor': BackgroundBlue,
-                                                    'textAlign': 'center',
-                                                    'float': 'center',
-                                                    'fontFamily': 'Segoe UI Light',
-                                                    'fontWeight': 'bold',
-                                                    'color': 'white'}))
-    
+    df_class_toshow = df_class_filtered[classification_table_columns]
     
-    # Computing Best Defence
-    best_defence = df_class_filtered[df_class_filtered['GoalsConceded'] == df_class_filtered['GoalsConceded'].min()]['Team'].values[0]
-    best_defence_info = str(df_class_filtered[df_class_filtered['GoalsConceded'] == df_class_filtered['GoalsConceded'].min()] \
-                                             ['GoalsConceded'] \
-                                             .values[0]) \
-                                             + ' Goals Conceded'
+    table_final_classification = df_class_toshow.to_dict('records')
     
-    # Computing Best Attack
-    best_attack = df_class_filtered[df_class_filtered['GoalsScored'] == df_class_filtered['GoalsScored'].max()]['Team'].values[0]
-    best_attack_info = str(df_class_filtered[df_class_filtered['GoalsScored'] == df_class_filtered['GoalsScored'].max()] \
-                                            ['GoalsScored'] \
-                                            .values[0]) \
-                                            + ' Goals Scored'
-                                            
-    # Computing Most Undisciplined Team
-    most_undisciplined_df = df_class_filtered.sort_values(by = ['VE', '2A', 'A'], ascending = False)
-    most_undisciplined_df['TotalReds'] = most_undisciplined_df['VE'] + most_undisciplined_df['2A']
-    most_undisciplined = most_undisciplined_df['Team'].values[0]
-    most_undisciplined_info =  str(int(most_undisciplined_df['TotalReds'].values[0])) + " Reds, " \
-                               + str(int(most_undisciplined_df['A'].values[0])) + " Yellows"
     
+    # Team records (Best Attack, Best Defence, Most Undisciplined), precomputed with the season leaderboards
+    team_records = data.season('leaderboard_teams', selected_league, selected_season).set_index('Record')
 
+    best_attack = team_records.at['Best Attack', 'Team']
+    best_attack_info = str(team_records.at['Best Attack', 'GoalsScored']) + ' Goals Scored'
 
-    # IV. MIDDLE COLUMN ----------------------------------------------------------------------------------------------------------   
+    best_defence = team_records.at['Best Defence', 'Team']
+    best_defence_info = str(team_records.at['Best Defence', 'GoalsConceded']) + ' Goals Conceded'
 
-    # Top Scorers, Assists and Undisciplined
-    df_scorers_filtered = df_scorers[df_scorers['SeasonOrder'] == selected_season].reset_index(drop = True)
-    df_assists_filtered = df_assists[df_assists['SeasonOrder'] == selected_season].reset_index(drop = True)
-    df_discipline_filtered = df_player_cards[df_player_cards['SeasonOrder'] == selected_season].reset_index(drop = True)
-    df_discipline_filtered['TotalReds'] = df_discipline_filtered['VE'] + df_discipline_filtered['2A']
-    
+    most_undisciplined = team_records.at['Most Undisciplined', 'Team']
+    most_undisciplined_info = str(int(team_records.at['Most Undisciplined', 'VE'] + team_records.at['Most Undisciplined', '2A'])) \
+                              + " Reds, " + str(int(team_records.at['Most Undisciplined', 'A'])) + " Yellows"
+    stages.lap('classification')
     
-    n_top = 3
-    top_scorer = []
-    top_scorer_team = []
-    top_scorer_goals = []
-    top_scorer_string = []
-    
-    top_assist = []
-    top_assist_team = []
-    top_assist_goals = []
-    top_assist_string = []
-
-    top_discipline = []
-    top_discipline_team = []
-    top_discipline_yellowcards = []
-    top_discipline_redcards = []
-    top_discipline_string = []
-
-    for i in range(n_top):
-        top_scorer.append(df_scorers_filtered['Player'].values[i])
-        top_scorer_team.append(df_scorers_filtered['Team'].values[i])
-        top_scorer_goals.append(df_scorers_filtered['G'].values[i])
-        
-        top_scorer_string.append(str(i+1) + ". " + top_scorer[i] \
-                                 + " (" + top_scorer_team[i] + ") - " \
-                                 + str(top_scorer_goals[i]) + " Goals")
 
 
-        top_assist.append(df_assists_filtered['Player'].values[i])
-        top_assist_team.append(df_assists_filtered['Team'].values[i])
-        top_assist_goals.append(df_assists_filtered['ASS'].values[i])
-        
-        top_assist_string.append(str(i+1) + ". " + top_assist[i] \
-                                 + " (" + top_assist_team[i] + ") - " \
-                                 + str(top_assist_goals[i]) + " Assists")
+    # IV. MIDDLE COLUMN ----------------------------------------------------------------------------------------------------------   
 
-        
-        top_discipline.append(df_discipline_filtered['Player'].values[i])
-        top_discipline_team.append(df_discipline_filtered['Team'].values[i])
-        top_discipline_yellowcards.append(df_discipline_filtered['A'].values[i])
-        top_discipline_redcards.append(df_discipline_filtered['TotalReds'].values[i])
-        
-        top_discipline_string.append(str(i+1) + ". " + top_discipline[i] \
-                                     + " (" + top_discipline_team[i] + ") - " \
-                                     + str(top_discipline_yellowcards[i]) + " Y, " \
-                                     + str(top_discipline_redcards[i]) + " R")
+    # Top Scorers, Assists and Undisciplined: the first n_top rows of the precomputed season leaderboards
+    n_top = 3
+    top_scorer_string = leaderboard_strings(data.season('leaderboard_scorers', selected_league, selected_season), n_top,
+                                            "{Rank}. {Player} ({Team}) - {G} Goals")
+    top_assist_string = leaderboard_strings(data.season('leaderboard_assists', selected_league, selected_season), n_top,
+                                            "{Rank}. {Player} ({Team}) - {ASS} Assists")
+    top_discipline_string = leaderboard_strings(data.season('leaderboard_discipline', selected_league, selected_season), n_top,
+                                                "{Rank}. {Player} ({Team}) - {A} Y, {TotalReds} R")
+    stages.lap('top_players')
 
 
     # Line Chart
     team_winner = df_class_toshow[df_class_toshow['Position'] == 1]['Team'].values[0]
     
-    df_bcr_line = df_bcr[df_bcr['SeasonOrder'] == selected_season] \
-                        [df_bcr['Team'] == team_winner] \
-                        [['Round', 'Position']]
-    
-    lc_annotations = [dict(
-                        x = xi,
-                        y = yi,
-                        text = str(yi),
-                        xanchor = 'auto',
-                        yanchor = 'bottom',
-                        showarrow = False,
-                    ) for xi, yi in zip(df_bcr_line['Round'], df_bcr_line['Position'])]
+    df_bcr_line = data.season_team('df_bcr', selected_league, selected_season, team_winner)[['Round', 'Position']]
     
     line_chart = {'data': [go.Scatter(
                                 x = df_bcr_line['Round'],
                                 y = df_bcr_line['Position'],
-                                mode = "markers + lines",
+                                mode = "markers + lines + text",
+                                texttemplate = '%{y}',
+                                textposition = 'top center',
+                                cliponaxis = False,
                                 marker = { "color" : 'white'})],
                   'layout': go.Layout(
+                                template = charts_template,
                                 title = '<b>' + team_winner + " - Road to the Top (position by round)" + '</b>',
-                                annotations = lc_annotations,
-                                bargap = 0.35,
-                                xaxis = dict(color = 'white',
-                                             dtick = 10),
-                                yaxis = dict(ticks = 'outside',
-                                             tickcolor = BackgroundBlue,
-                                             color = 'white'),
-                                font = {"family": "Segoe UI Light", "color": "white"},
-                                hovermode = 'closest',
-                                paper_bgcolor = BackgroundBlue,
-                                plot_bgcolor = BackgroundBlue,
-                                autosize = False,
+                                xaxis = dict(dtick = 10),
                                 height = 230,
                                 margin = dict(r = 0, t = 30, l = 20))}
+    stages.lap('line_chart')
 
 
 
-    # V. RIGHT COLUMN ------------------------------------------------------------------------------------------------------------   
-                    
-    # Visuals titles
-    string_right_table = "Round " + str(selected_round) + " Matches - Betting Odds and Results"
-    string_right_chart = "Round " + str(selected_round) + " Live Classification"
-    
-    
-    # Games Table    
-    df_games_filtered = df_games[df_games['SeasonOrder'] == selected_season] \
-                                [df_games['Round'] == selected_round] \
-                                [['Date', 'B365H', 'B365D', 'B365A', 'Match']] \
-                                .reset_index(drop = True)    
-    
-    games_table = dash_table.DataTable(
-                                columns = [{"name": i, "id": i} for i in df_games_filtered.columns],
-                                data = df_games_filtered.to_dict('records'),
-                                style_cell={'textAlign': 'center',
-                                            'backgroundColor': BackgroundBlue,
-                                            'border': '0px',
-                                            'fontSize': 11,
-                                            'fontFamily': 'Segoe UI Light',
-                                            'color': 'white',
-                                            'height': 8},
-                                style_header={'backgroundColor': BackgroundBlue,
-                                                'textAlign': 'center',
-                                                'float': 'center',
-                                                'fontFamily': 'Segoe UI Light',
-                                                'fontWeight': 'bold',
-                                                'color': 'white'})
-    
-    # Live Classification Bar Chart
-    bc_annotations = [dict(
-                        x = xi,
-                        y = yi,
-                        text = str(xi),
-                        xanchor = 'left',
-                        font = dict(family = 'Segoe UI Light', color = 'white'),
-                        showarrow = False,
-                    ) for xi, yi in zip(df_bcr_roundfiltered['Points'], df_bcr_roundfiltered['Team'])]
-    
-    bar_chart = {'data': [go.Bar(
-                            x = df_bcr_roundfiltered['Points'],
-                            y = df_bcr_roundfiltered['Team'],
-                            orientation='h', marker = { "color" : 'white'})],
-                'layout': go.Layout(
-                            bargap = 0.35,
-                            annotations = bc_annotations,
-                            xaxis = dict(color = 'white',
-                                         dtick = 7),
-                            yaxis = dict(ticks = 'outside',
-                                         tickcolor = BackgroundBlue,
-                                         color = 'white'),
-                            font = {"family": "Segoe UI Light", "color": "white"},
-                            hovermode = 'closest',
-                            paper_bgcolor = BackgroundBlue,
-                            plot_bgcolor = BackgroundBlue,
-                            autosize = False,
-                            height = 430,
-                            margin = dict(r = 0, t = 0, l = 80))}
-    
-
-
-    # VI. Variables Returned ------------------------------------------------------------------------------------------------------------   
+    # V. Variables Returned ------------------------------------------------------------------------------------------------------------   
 
     return season_slider_title, \
-           round_slider_title, \
            round_slider_min, \
            round_slider_max, \
            round_slider_marks, \
@@ -624,13 +1126,541 @@ def update_season_stats(selected_season, selected_round):
            top_discipline_string[0], \
            top_discipline_string[1], \
            top_discipline_string[2], \
-           line_chart, \
+           line_chart
+
+
+# Round-scoped outputs: the only ones recomputed when just the round slider moves
+def compute_round_stats(selected_league, selected_season, selected_round):
+    stages = StageTimer(metrics, 'compute_round_stats')
+
+    # I. Filtering Dataframes -------------------------------------------------------------------------------------------------------
+
+    # Filtering df_bcr for selected_season and selected_round
+    # (ties are broken by the round position, so the order does not depend on the dtypes the sort runs on)
+    df_bcr_roundfiltered = data.season_round('df_bcr', selected_league, selected_season, selected_round) \
+                                 [['Team', 'TotalPoints', 'Position']] \
+                                 .reset_index() \
+                                 .rename(columns = {'TotalPoints': 'Points'}) \
+                                 .sort_values(by = ['Points', 'Position'], ascending = [True, False])
+    stages.lap('filtering')
+
+
+
+    # II. FILTER ROW ---------------------------------------------------------------------------------------------------------------
+    string_season = "Season " + data.season_info(selected_league, selected_season)['SeasonExtended']
+
+    # Round Slider Title
+    round_slider_title = string_season + " storyline, by the times of round " + str(selected_round)
+
+
+
+    # III. RIGHT COLUMN ------------------------------------------------------------------------------------------------------------   
+                    
+    # Visuals titles
+    string_right_table = "Round " + str(selected_round) + " Matches - Betting Odds and Results"
+    string_right_chart = "Round " + str(selected_round) + " Live Classification"
+    
+    
+    # Games Table    
+    df_games_filtered = games_table_rows(data.season_round('df_games', selected_league, selected_season, selected_round))
+    
+    games_table = df_games_filtered.to_dict('records')
+    stages.lap('games_table')
+    
+    # Live Classification Bar Chart
+    bar_chart = {'data': [go.Bar(
+                            x = df_bcr_roundfiltered['Points'],
+                            y = df_bcr_roundfiltered['Team'],
+                            texttemplate = '%{x}',
+                            textposition = 'outside',
+                            cliponaxis = False,
+                            orientation='h', marker = { "color" : 'white'})],
+                'layout': bar_chart_layout()}
+    stages.lap('bar_chart')
+    
+
+
+    # IV. Variables Returned ------------------------------------------------------------------------------------------------------------   
+
+    return round_slider_title, \
            string_right_table, \
            games_table, \
            string_right_chart, \
            bar_chart
 
 
+# Betting odds outputs: lookups of the precomputed analytics of the season and the selected bookmaker
+def compute_odds_stats(selected_league, selected_season, selected_bookmaker):
+    stages = StageTimer(metrics, 'compute_odds_stats')
+    string_season = "Season " + data.season_info(selected_league, selected_season)['SeasonExtended']
+    bookmaker_name = BOOKMAKERS.get(selected_bookmaker, "")
+
+    # Bookmakers Table (no odds before 2004/05)
+    df_bookmakers = odds_analytics.season_bookmakers(selected_league, selected_season)
+    odds_title = "Betting Odds Analytics - " + string_season + ("" if len(df_bookmakers) else " (no odds available)")
+    bookmakers_table = df_bookmakers[[column['id'] for column in odds_bookmakers_columns]].round(4).to_dict('records')
+    stages.lap('bookmakers_table')
+
+    # Calibration Chart - fair probabilities against observed frequencies, for the season and for every season of the league
+    df_season_calibration = odds_analytics.season_calibration(selected_league, selected_season, selected_bookmaker)
+    df_league_calibration = odds_analytics.league_calibration(selected_league, selected_bookmaker)
+    calibration_chart = {'data': [go.Scatter(
+                                      x = [0, 1],
+                                      y = [0, 1],
+                                      mode = "lines",
+                                      name = "Fair",
+                                      line = {"color": 'grey', "dash": 'dot'}),
+                                  go.Scatter(
+                                      x = df_league_calibration['Predicted'].round(4),
+                                      y = df_league_calibration['Observed'].round(4),
+                                      mode = "markers + lines",
+                                      name = "All seasons",
+                                      marker = {"color": 'lightskyblue'}),
+                                  go.Scatter(
+                                      x = df_season_calibration['Predicted'].round(4),
+                                      y = df_season_calibration['Observed'].round(4),
+                                      customdata = df_season_calibration['Outcomes'],
+                                      hovertemplate = '%{x:.0%} fair, %{y:.0%} observed (%{customdata} outcomes)',
+                                      mode = "markers",
+                                      name = string_season,
+                                      marker = {"color": 'white', "size": 9})],
+                         'layout': go.Layout(
+                                      template = charts_template,
+                                      title = '<b>' + bookmaker_name + " - Calibration" + '</b>',
+                                      xaxis = dict(range = [0, 1], tickformat = '.0%', title = "Fair probability"),
+                                      yaxis = dict(range = [0, 1], tickformat = '.0%', title = "Observed frequency"),
+                                      legend = dict(orientation = 'h', y = -0.3),
+                                      height = 380,
+                                      margin = dict(r = 0, t = 30, l = 50))}
+    stages.lap('calibration_chart')
+
+    # Teams Table - backing each team in every match, best returns first
+    odds_teams_title = "Backing each team at " + bookmaker_name if bookmaker_name else "Teams"
+    teams_table = odds_analytics.season_teams(selected_league, selected_season, selected_bookmaker) \
+                                .sort_values(by = 'ROI', ascending = False, kind = 'mergesort') \
+                                [[column['id'] for column in odds_teams_columns]] \
+                                .round(4) \
+                                .to_dict('records')
+    stages.lap('teams_table')
+
+    # History Chart - favourite win rate and margin of the bookmaker, season by season (the selected season highlighted)
+    marks = season_marks(selected_league)
+    df_history = odds_analytics.bookmaker_history(selected_league, selected_bookmaker)
+    df_history = df_history[df_history['SeasonOrder'].isin(list(marks))]
+    seasons = [marks[season_order] for season_order in df_history['SeasonOrder']]
+    history_chart = {'data': [go.Bar(
+                                  x = seasons,
+                                  y = df_history['FavouriteWins'].round(4),
+                                  name = "Favourite wins",
+                                  texttemplate = '%{y:.0%}',
+                                  textposition = 'outside',
+                                  cliponaxis = False,
+                                  marker = {"color": ['white' if season_order == selected_season else 'lightskyblue'
+                                                      for season_order in df_history['SeasonOrder']]}),
+                              go.Scatter(
+                                  x = seasons,
+                                  y = df_history['Margin'].round(4),
+                                  mode = "markers + lines",
+                                  name = "Margin",
+                                  marker = {"color": 'orange'})],
+                     'layout': go.Layout(
+                                  template = charts_template,
+                                  title = '<b>' + bookmaker_name + " - Favourite Wins and Margin by Season" + '</b>',
+                                  yaxis = dict(tickformat = '.0%'),
+                                  legend = dict(orientation = 'h', y = -0.3),
+                                  height = 380,
+                                  margin = dict(r = 0, t = 30, l = 50))}
+    stages.lap('history_chart')
+
+    return odds_title, bookmakers_table, calibration_chart, odds_teams_title, teams_table, history_chart
+
+
+# Similar teams outputs: lookups of the persisted team profiles (never refitted here)
+def compute_similar_teams(selected_league, selected_season, selected_team):
+    season_extended = data.season_info(selected_league, selected_season)['SeasonExtended']
+    similar_teams_title = "Similar Teams Across Eras - Season " + season_extended
+
+    if team_profiles is None:
+        return similar_teams_title, "Team profiles not fitted yet for this data version", [], \
+               {'data': [], 'layout': go.Layout(template = charts_template, height = 100)}
+
+    df_teams = team_profiles.season_teams(selected_league, selected_season)
+    df_team = df_teams[df_teams['Team'] == selected_team]
+    if df_team.empty:
+        return similar_teams_title, "", [], {'data': [], 'layout': go.Layout(template = charts_template, height = 100)}
+
+    # Profile of the team
+    profile = team_profiles.profiles[int(df_team['Profile'].iloc[0])]
+    profile_string = selected_team + " " + season_extended + " - Profile " + str(profile['Profile']) + ": " + \
+                     profile['Description'] + " (" + str(profile['Teams']) + " team-seasons)"
+
+    # Similar Teams Table
+    df_similar = team_profiles.similar_teams(selected_league, selected_season, selected_team)
+    similar_teams_table = df_similar[[column['id'] for column in similar_teams_columns]].round({'Distance': 3}).to_dict('records')
+
+    # Features Chart - standardized features of the team and of its closest team-seasons (missing features are left out)
+    df_compared = pd.concat([df_team] + [team_profiles.season_teams(selected_league, row['SimilarSeasonOrder'])
+                                         .loc[lambda df: df['Team'] == row['SimilarTeam']]
+                                         for row in df_similar.head(SIMILAR_TEAMS_CHART).to_dict('records')])
+    df_standardized = team_profiles.standardized(df_compared).round(3)
+    features_chart = {'data': [go.Bar(
+                                   x = list(FEATURES.values()),
+                                   y = [None if pd.isna(value) else value for value in values],
+                                   name = team + " " + season,
+                                   marker = {"color": 'white' if position == 0 else None})
+                               for position, (team, season, values) in enumerate(zip(df_compared['Team'],
+                                                                                     df_compared['SeasonExtended'],
+                                                                                     df_standardized.values.tolist()))],
+                      'layout': go.Layout(
+                                   template = charts_template,
+                                   title = '<b>' + "Features (standard deviations from the average team-season)" + '</b>',
+                                   bargap = 0.2,
+                                   legend = dict(orientation = 'h', y = -0.45),
+                                   height = 420,
+                                   margin = dict(r = 0, t = 30, l = 30, b = 120))}
+
+    return similar_teams_title, profile_string, similar_teams_table, features_chart
+
+
+# Career line of a search profile (stats missing from every season, e.g. assists before 2004/05, are left out)
+def profile_summary(profile):
+    career = profile['Career']
+    seasons = "{} season{} ({} - {})".format(career['Seasons'], '' if career['Seasons'] == 1 else 's', career['First'], career['Last'])
+
+    if profile['Kind'] == 'Team':
+        return "{}: {} - {} titles, best position {}, {} points, {} wins, {} goals scored, {} conceded".format(
+                   profile['Name'], seasons, career['Titles'], career['BestPosition'], career['Points'], career['Won'],
+                   career['GoalsScored'], career['GoalsConceded'])
+
+    stats = [(career['Goals'], "goals"), (career['Penalties'], "penalties"), (career['Assists'], "assists"),
+             (career['Yellow'], "yellow cards"), (career['Red'], "red cards")]
+    return profile['Name'] + " (" + ", ".join(career['Teams']) + "): " + seasons + " in the season top lists - " + \
+           ", ".join("{} {}".format(value, name) for value, name in stats if value is not None)
+
+
+# (older seasons have fewer, or no, player stats: missing entries are left blank)
+def leaderboard_strings(df_leaderboard, n_top, template):
+    rows = df_leaderboard.head(n_top).to_dict('records')
+    return [template.format(**row) for row in rows] + [""] * (n_top - len(rows))
+
+
+def games_table_rows(df_games_filtered):
+    return df_games_filtered[games_table_columns] \
+                            .reset_index(drop = True) \
+                            .astype({'B365H': 'float64', 'B365D': 'float64', 'B365A': 'float64'}) \
+                            .round(ODDS_DECIMALS)
+
+
+def bar_chart_layout():
+    return go.Layout(
+                template = charts_template,
+                xaxis = dict(dtick = 7),
+                height = 430,
+                margin = dict(r = 0, t = 0, l = 80))
+
+
+# History tables: one season's games, and the final classifications of a range of seasons (each one a partition lookup)
+def fixtures_rows(selected_league, selected_season):
+    return data.season('df_games', selected_league, selected_season)[fixtures_table_columns] \
+               .reset_index(drop = True) \
+               .astype({'Date': str, 'B365H': 'float64', 'B365D': 'float64', 'B365A': 'float64'}) \
+               .round(ODDS_DECIMALS)
+
+
+def classification_history(selected_league, first_season, last_season):
+    seasons = []
+    for season in data.seasons(selected_league):
+        if first_season <= season['SeasonOrder'] <= last_season:
+            df_class_filtered = data.season('df_class', selected_league, season['SeasonOrder'])
+            seasons.append(df_class_filtered.assign(Season = season['SeasonExtended'],
+                                                    Position = range(1, len(df_class_filtered) + 1),
+                                                    Team = df_class_filtered['Team'].astype(str)))
+
+    if not seasons:
+        return pd.DataFrame(columns = explorer_table_columns)
+    return pd.concat(seasons, ignore_index = True)[explorer_table_columns]
+
+
+# Client-side mode payload: one season's cumulative points and positions (Round x Team, as in bcr_df.csv), its games
+# by round, and the bar chart layout, so assets/clientside.js renders every round without calling the server
+def compute_season_rounds(selected_league, selected_season):
+    df_games_seasonfiltered = data.season('df_games', selected_league, selected_season)
+    points, positions = season_standings(selected_league, selected_season)
+
+    return {'season': "Season " + data.season_info(selected_league, selected_season)['SeasonExtended'],
+            'teams': [str(team) for team in points.columns],
+            'rounds': points.index.tolist(),
+            'points': points.values.tolist(),
+            'positions': positions.values.tolist(),
+            'games': {str(game_round): games_table_rows(games).to_dict('records')
+                      for game_round, games in df_games_seasonfiltered.groupby('Round')},
+            'bar_chart_layout': bar_chart_layout()}
+
+
+# Round x Team matrices of a season's cumulative points and positions (df_bcr has one row per round and team)
+def season_standings(selected_league, selected_season):
+    df_bcr_seasonfiltered = data.season('df_bcr', selected_league, selected_season)
+
+    points = df_bcr_seasonfiltered.pivot(index = 'Round', columns = 'Team', values = 'TotalPoints') \
+                                  .dropna(axis = 1, how = 'all')
+    positions = df_bcr_seasonfiltered.pivot(index = 'Round', columns = 'Team', values = 'Position') \
+                                     .reindex(index = points.index, columns = points.columns)
+
+    return points, positions
+
+
+# Standings race of a season: an animated bar chart with one frame per round. Each team is a bar at its position (y) with its
+# points (x), so a frame is only the x and y values of the round (a delta on the trace, no layout), and the team names stay in
+# the trace text. Axes ranges are fixed for the whole season, so the frames never relayout
+def compute_standings_race(selected_league, selected_season):
+    string_season = "Season " + data.season_info(selected_league, selected_season)['SeasonExtended']
+
+    points, positions = season_standings(selected_league, selected_season)
+    points = points.ffill().fillna(0).astype(int)
+    positions = positions.ffill().fillna(len(points.columns))
+    # Teams that missed a round keep their last points, so each round is ranked again: by points, ties by the recorded position
+    order = np.argsort(-points.values * (len(points.columns) + 1) + positions.values, axis = 1, kind = 'stable')
+    positions = np.argsort(order, axis = 1) + 1
+    rounds = [str(game_round) for game_round in points.index]
+
+    if not rounds:
+        return string_season + " Standings Race", {'data': [], 'layout': go.Layout(template = charts_template, height = 100)}
+
+    frames = [{'name': game_round, 'data': [{'x': round_points, 'y': round_positions}], 'traces': [0]}
+              for game_round, round_points, round_positions in zip(rounds, points.values.tolist(), positions.tolist())]
+
+    race = {'type': 'bar',
+            'orientation': 'h',
+            'x': frames[0]['data'][0]['x'],
+            'y': frames[0]['data'][0]['y'],
+            'text': [str(team) for team in points.columns],
+            'texttemplate': '%{text}  %{x}',
+            'textposition': 'outside',
+            'hovertemplate': '%{text}: %{x} points<extra></extra>',
+            'cliponaxis': False,
+            'marker': {'color': 'white'}}
+
+    # Play / Pause buttons and a round slider, all handled by plotly.js
+    animation = {'frame': {'duration': 600, 'redraw': False}, 'transition': {'duration': 450, 'easing': 'linear'}}
+    still = {'frame': {'duration': 0, 'redraw': False}, 'transition': {'duration': 0}, 'mode': 'immediate'}
+    layout = go.Layout(template = charts_template,
+                       xaxis = dict(range = [0, int(points.values.max()) * 1.2 + 1], dtick = 10),
+                       yaxis = dict(range = [len(points.columns) + 0.5, 0.5], showticklabels = False),
+                       height = 520,
+                       margin = dict(r = 0, t = 10, l = 20, b = 90),
+                       updatemenus = [dict(type = 'buttons',
+                                           direction = 'left',
+                                           showactive = False,
+                                           x = 0, y = -0.08, xanchor = 'left', yanchor = 'top',
+                                           buttons = [dict(label = "Play", method = 'animate',
+                                                           args = [None, dict(animation, fromcurrent = True)]),
+                                                      dict(label = "Pause", method = 'animate', args = [[None], still])])],
+                       sliders = [dict(active = 0,
+                                       x = 0.15, y = -0.05, len = 0.85,
+                                       currentvalue = dict(prefix = "Round "),
+                                       transition = dict(duration = 0),
+                                       steps = [dict(label = game_round, method = 'animate', args = [[game_round], still])
+                                                for game_round in rounds])])
+
+    return string_season + " Standings Race", {'data': [race], 'layout': layout, 'frames': frames}
+
+
+# Cached outputs are keyed by the data version of their season (or by the given version), and by this file's content
+# (shared backends outlive deploys)
+def outputs_cache(compute, name, version = None):
+    return OutputCache(compute,
+                       backend = open_backend(CACHE_BACKEND, max_entries = CACHE_MAX_ENTRIES),
+                       version = version or (lambda league, season_order, *key: data.cache_version(league, season_order)),
+                       ttl = CACHE_TTL,
+                       name = name,
+                       namespace = fingerprint(abspath(__file__)))
+
+season_stats_cache = outputs_cache(compute_season_stats, 'season_stats')
+round_stats_cache = outputs_cache(compute_round_stats, 'round_stats')
+season_rounds_cache = outputs_cache(compute_season_rounds, 'season_rounds')
+standings_race_cache = outputs_cache(compute_standings_race, 'standings_race')
+odds_stats_cache = outputs_cache(compute_odds_stats, 'odds_stats', version = lambda *key: odds_analytics.version)
+similar_teams_cache = outputs_cache(compute_similar_teams, 'similar_teams',
+                                    version = lambda *key: team_profiles.version if team_profiles is not None else None)
+
+if CACHE_PREWARM and CLIENTSIDE_ROUNDS:
+    season_stats_cache.prewarm(data.keys())
+    standings_race_cache.prewarm(data.keys())
+    season_rounds_cache.prewarm(data.keys())
+elif CACHE_PREWARM:
+    season_stats_cache.prewarm(data.keys())
+    standings_race_cache.prewarm(data.keys())
+    round_stats_cache.prewarm((league, season_order, game_round)
+                              for league, season_order in data.keys()
+                              for game_round in range(data.season_info(league, season_order)['FirstRound'],
+                                                      data.season_info(league, season_order)['LastRound'] + 1))
+
+if CACHE_PREWARM:
+    data_api.prewarm()
+    current_search_index()
+
+
+# Live results: new matches of a season (rows shaped like df_liganos) are added to its standings engine, seeded once from the
+# season's df_games and card counts. Only the snapshots of the rounds they changed (the new one, or every round from a postponed
+# match's onwards) and the new games are appended to the season's df_bcr and df_games, and its df_class is replaced.
+# The season's files are rewritten in the store, so the data watcher of every other worker reloads it; this one keeps its
+# partition and engine (they carry the store's version) and only drops that season's cached outputs
+live_engines = {}
+ingest_lock = Lock()
+
+def season_engine(league, season_order):
+    if (league, season_order) not in live_engines:
+        engine = StandingsEngine(data.season_info(league, season_order)['Season'], season_order)
+        engine.add_games(data.season('df_games', league, season_order))
+        engine.set_cards(data.season('df_class', league, season_order))
+        live_engines[(league, season_order)] = engine
+
+    return live_engines[(league, season_order)]
+
+
+def ingest_results(league, season_order, df_matches):
+    global search_index
+
+    engine = season_engine(league, season_order)
+    first_round = min(engine.add_matches(df_matches))
+
+    df_bcr = data.season('df_bcr', league, season_order)
+    df_games = append_rows(data.season('df_games', league, season_order), engine.games[-len(df_matches):])
+    if first_round <= df_bcr['Round'].max():
+        df_games = df_games.sort_values('Round', kind = 'stable', ignore_index = True)
+    df_class = data.season('df_class', league, season_order)
+    frames = {'df_class': append_rows(df_class.iloc[0:0], engine.standings()),
+              'df_bcr': append_rows(df_bcr[df_bcr['Round'] < first_round],
+                                    [row for game_round in engine.rounds_from(first_round) for row in engine.round_standings(game_round)]),
+              'df_games': df_games}
+
+    version = write_store_partition(root_path, df_list_csvs, league, season_order, frames)
+    data.replace_partition(league, season_order, frames, version = version)
+    with search_index_lock:
+        if search_index is not None:
+            search_index = search_index.updated({(league, season_order): data.partition_frames(league, season_order)},
+                                                {(league, season_order): data.cache_version(league, season_order)})
+
+    for cache in [season_stats_cache, round_stats_cache, season_rounds_cache, standings_race_cache]:
+        cache.invalidate(lambda key: key[:2] == (league, season_order))
+    data_api.invalidate([(league, season_order)])
+    logger.info("Ingested %d results into %s season %d (last round: %d)", len(df_matches), league, season_order, engine.last_round)
+
+    return engine.last_round
+
+
+@app.server.route('/ingest/<league>/<int:season_order>', methods = ['POST'])
+def ingest(league, season_order):
+    # Body: {"matches": [rows shaped like df_liganos]}, with an "Authorization: Bearer <LIGANOS_INGEST_TOKEN>" header
+    authorization = flask.request.headers.get('Authorization', '')
+    if not INGEST_TOKEN or not hmac.compare_digest(authorization, 'Bearer ' + INGEST_TOKEN):
+        return flask.jsonify(error = "ingestion is disabled or the token is wrong"), 403
+    if (league, season_order) not in data.keys():
+        return flask.jsonify(error = "unknown season: {} {}".format(league, season_order)), 404
+    if not store_is_fresh(root_path, df_list_csvs):
+        return flask.jsonify(error = "results can only be ingested into the data store (python data_store.py)"), 409
+
+    matches = (flask.request.get_json(silent = True) or {}).get('matches')
+    if not matches:
+        return flask.jsonify(error = "no matches in the request body"), 400
+
+    with ingest_lock:
+        last_round = ingest_results(league, season_order, pd.DataFrame(matches))
+    return flask.jsonify(league = league, season_order = season_order, last_round = last_round)
+
+
+# Hot reload of the data files: the new version is opened aside and swapped in, then only the seasons whose content changed
+# lose their loaded partition, live engine and cached outputs (the page layout is rebuilt for the league selector)
+def reload_data():
+    global data_loaded_at, data_signature, odds_analytics, team_profiles, search_index
+
+    data_signature = files_signature(root_path, data_files)
+    changed = data.reload(open_dataset(root_path, df_list_csvs, first_season_order = FirstSeason_Order, max_partitions = MAX_PARTITIONS))
+    data_loaded_at = time.time()
+
+    for key in changed:
+        live_engines.pop(key, None)
+
+    # Only the changed seasons are read again for the search index (when it is built), the others' rows are reused
+    seasons = set(data.keys())
+    with search_index_lock:
+        if search_index is not None:
+            search_index = search_index.updated({key: data.partition_frames(*key) for key in changed if key in seasons},
+                                                {key: data.cache_version(*key) for key in changed if key in seasons},
+                                                removed = [key for key in changed if key not in seasons])
+    for cache in [season_stats_cache, round_stats_cache, season_rounds_cache, standings_race_cache]:
+        cache.invalidate(lambda key: key[:2] in changed)
+    data_api.invalidate(changed)
+
+    # The odds analytics are recomputed in one pass: their outputs are dropped when the match history changed
+    reloaded_odds = OddsAnalytics(read_matches(join(root_path, ODDS_CSV)))
+    if reloaded_odds.version != odds_analytics.version:
+        odds_analytics = reloaded_odds
+        odds_stats_cache.invalidate(lambda key: True)
+
+    # Team profiles of the new data version, when the batch step already fitted it (never fitted here)
+    reloaded_profiles = open_profiles(root_path, clusters = PROFILE_CLUSTERS)
+    if getattr(reloaded_profiles, 'version', None) != getattr(team_profiles, 'version', None):
+        team_profiles = reloaded_profiles
+        similar_teams_cache.invalidate(lambda key: True)
+
+    app.layout['league-dropdown'].options = [{'label': league, 'value': league} for league in data.leagues()]
+    app.layout['league-dropdown'].style['display'] = 'block' if len(data.leagues()) > 1 else 'none'
+    prebuilt_layout.refresh()
+
+    logger.info("Loaded data version %s (%d seasons changed)", data.version, len(changed))
+    return changed
+
+
+@app.server.route('/health')
+def health():
+    return flask.jsonify({'status': 'ok',
+                          'data_version': data.version,
+                          'data_loaded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(data_loaded_at)),
+                          'seasons': len(data.keys())})
+
+
+# Counters and gauges exported on /metrics next to the latency histograms
+@metrics.collector
+def dashboard_metrics():
+    caches = {'season_stats': season_stats_cache, 'round_stats': round_stats_cache, 'season_rounds': season_rounds_cache,
+              'standings_race': standings_race_cache, 'odds_stats': odds_stats_cache, 'similar_teams': similar_teams_cache}
+    payloads = payload_stats.report()
+    # Redis caches do not count their entries (None): they are left out of the entries gauge
+    entries = {name: cache.entries() for name, cache in caches.items()}
+
+    return [('liganos_cache_hits_total', 'counter', 'Callback outputs cache hits',
+             [({'cache': name}, cache.hits) for name, cache in caches.items()]),
+            ('liganos_cache_misses_total', 'counter', 'Callback outputs cache misses',
+             [({'cache': name}, cache.misses) for name, cache in caches.items()]),
+            ('liganos_cache_entries', 'gauge', 'Callback outputs cache entries',
+             [({'cache': name}, count) for name, count in entries.items() if count is not None]),
+            ('liganos_callback_calls_total', 'counter', 'Callback invocations, by callback',
+             [({'callback': callback}, calls) for callback, calls in payloads['calls'].items()]),
+            ('liganos_output_bytes_total', 'counter', 'Bytes sent for each callback output, before compression (estimated when sampled)',
+             [({'output': output}, size) for output, size in payloads['bytes'].items()]),
+            ('liganos_api_requests_total', 'counter', 'Data API requests, by resource and status',
+             [({'resource': resource, 'status': str(status)}, requests)
+              for (resource, status), requests in list(data_api.requests.items())]),
+            ('liganos_data_seasons', 'gauge', 'Seasons in the loaded data version',
+             [({'version': data.version}, len(data.keys()))])]
+
+
+# The watcher starts from the signature of the files the data was loaded from, so a worker forked after they changed still reloads
+data_watcher = None
+
+def start_data_watcher():
+    global data_watcher
+
+    if RELOAD_INTERVAL > 0:
+        data_watcher = DataWatcher(lambda: files_signature(root_path, data_files), reload_data,
+                                   interval = RELOAD_INTERVAL, current = data_signature).start()
+    return data_watcher
+
+
+if not PREFORK:
+    start_data_watcher()
+
 
                
 
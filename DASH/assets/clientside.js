@@ -0,0 +1,48 @@
+// Client-side rendering of the round-level outputs (enabled with LIGANOS_CLIENTSIDE_ROUNDS=1).
+// The season payload comes from compute_season_rounds in DashApp.py, once per season: moving the round
+// slider only runs this function in the browser.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    liganos: {
+        round_stats: function(season, selected_round) {
+            if (!season) {
+                return Array(5).fill(window.dash_clientside.no_update);
+            }
+
+            // Round standings, ascending by points (ties broken by the round position), as the bar chart draws them
+            var round_index = season.rounds.indexOf(selected_round);
+            var standings = [];
+            if (round_index >= 0) {
+                season.teams.forEach(function(team, team_index) {
+                    var points = season.points[round_index][team_index];
+                    if (points !== null) {
+                        standings.push({team: team,
+                                        points: points,
+                                        position: season.positions[round_index][team_index]});
+                    }
+                });
+            }
+            standings.sort(function(a, b) {
+                return (a.points - b.points) || (b.position - a.position);
+            });
+
+            // Same trace as compute_round_stats: the point labels come from the bar values (texttemplate)
+            var bar_chart = {
+                data: [{type: 'bar',
+                        x: standings.map(function(row) { return row.points; }),
+                        y: standings.map(function(row) { return row.team; }),
+                        texttemplate: '%{x}',
+                        textposition: 'outside',
+                        cliponaxis: false,
+                        orientation: 'h',
+                        marker: {color: 'white'}}],
+                layout: Object.assign({}, season.bar_chart_layout)
+            };
+
+            return [season.season + " storyline, by the times of round " + selected_round,
+                    "Round " + selected_round + " Matches - Betting Odds and Results",
+                    season.games[String(selected_round)] || [],
+                    "Round " + selected_round + " Live Classification",
+                    bar_chart];
+        }
+    }
+});
@@ -0,0 +1,284 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import warnings
+from os.path import abspath, dirname, join
+
+import numpy as np
+
+# Running from the DASH folder, as the dashboard does, without the hot reload watcher nor a prewarmed cache
+os.chdir(dirname(dirname(abspath(__file__))))
+sys.path.insert(0, os.getcwd())
+warnings.filterwarnings('ignore')
+os.environ['LIGANOS_RELOAD_INTERVAL'] = '0'
+os.environ['LIGANOS_CACHE_PREWARM'] = '0'
+os.environ.setdefault('LIGANOS_LOG_LEVEL', 'WARNING')
+
+
+
+# Callbacks benchmark suite, offline over the bundled assets/ data:
+#   startup    - time to import DashApp (data index load + layout build) and RSS of a fresh worker, then after computing
+#                every season and round output (median of --startups worker processes)
+#   compute    - uncached compute_season_stats for every season and compute_round_stats for every (SeasonOrder, Round) pair
+#   callbacks  - the season and round callbacks (through their outputs caches, cleared first) for every (SeasonOrder, Round) pair
+#   http       - slider-drag sessions posted to /_dash-update-component through the Flask test client by N concurrent clients:
+#                p50/p95/p99 latency and throughput (caches are cleared before each concurrency level)
+# Results are written as JSON (benchmarks/results/callbacks-<commit>.json by default), and --compare prints the changes
+# against a previous results file.
+# Usage (from the DASH folder): python benchmarks/callbacks_benchmark.py [--clients 1 4 8] [--sessions 5] [--compare old.json]
+
+RESULTS_FOLDER = join('benchmarks', 'results')
+ACCEPT_ENCODING = 'br, gzip'
+
+
+def rss_mb():
+    # Resident set size of this process (Linux /proc, peak RSS from getrusage elsewhere)
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def summary(latencies):
+    values = np.array(latencies) * 1e3
+    return {'calls': len(values),
+            'mean_ms': round(float(values.mean()), 3),
+            'p50_ms': round(float(np.percentile(values, 50)), 3),
+            'p95_ms': round(float(np.percentile(values, 95)), 3),
+            'p99_ms': round(float(np.percentile(values, 99)), 3),
+            'max_ms': round(float(values.max()), 3)}
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+# Startup ------------------------------------------------------------------------------------------------------------------------
+
+def startup_worker():
+    # Run in a fresh process (--worker): prints the startup measures as JSON
+    started = time.perf_counter()
+    import dash, pandas, plotly                     # noqa: F401 (library imports, measured apart from the dashboard startup)
+    libraries_loaded = time.perf_counter()
+
+    import DashApp
+    from data_store import feather, store_is_fresh
+    startup_seconds = time.perf_counter() - libraries_loaded
+    rss_startup = rss_mb()
+
+    DashApp.season_stats_cache.prewarm(DashApp.data.keys())
+    DashApp.round_stats_cache.prewarm(round_keys(DashApp))
+
+    print(json.dumps({'libraries_seconds': libraries_loaded - started,
+                      'startup_seconds': startup_seconds,
+                      'data_path': 'store' if feather is not None and store_is_fresh(DashApp.root_path, DashApp.df_list_csvs) else 'csv',
+                      'rss_startup_mb': rss_startup,
+                      'rss_warm_mb': rss_mb()}))
+
+
+def bench_startup(workers):
+    runs = [json.loads(subprocess.run([sys.executable, abspath(__file__), '--worker'], check = True,
+                                      stdout = subprocess.PIPE, stderr = subprocess.DEVNULL).stdout.decode().splitlines()[-1])
+            for _ in range(workers)]
+
+    result = {key: round(float(np.median([run[key] for run in runs])), 3)
+              for key in ['libraries_seconds', 'startup_seconds', 'rss_startup_mb', 'rss_warm_mb']}
+    result.update(workers = workers, data_path = runs[0]['data_path'])
+    return result
+
+
+# In-process callbacks -----------------------------------------------------------------------------------------------------------
+
+def round_keys(DashApp):
+    return [(league, season_order, game_round)
+            for league, season_order in DashApp.data.keys()
+            for game_round in range(DashApp.data.season_info(league, season_order)['FirstRound'],
+                                    DashApp.data.season_info(league, season_order)['LastRound'] + 1)]
+
+
+def clear_caches(DashApp):
+    for cache in [DashApp.season_stats_cache, DashApp.round_stats_cache, DashApp.season_rounds_cache]:
+        cache.clear()
+
+
+def bench_compute(DashApp):
+    return {'compute_season_stats': summary([timed(DashApp.compute_season_stats, *key) for key in DashApp.data.keys()]),
+            'compute_round_stats': summary([timed(DashApp.compute_round_stats, *key) for key in round_keys(DashApp)])}
+
+
+def bench_callbacks(DashApp):
+    # Season callback for every (SeasonOrder, Round) pair: one miss per season, hits while its rounds are browsed
+    clear_caches(DashApp)
+    keys = round_keys(DashApp)
+    return {'update_season_stats': summary([timed(DashApp.season_stats_cache.get, league, season_order)
+                                            for league, season_order, _ in keys]),
+            'update_round_stats': summary([timed(DashApp.round_stats_cache.get, *key) for key in keys])}
+
+
+# HTTP slider-drag sessions ------------------------------------------------------------------------------------------------------
+
+def request_body(callback, inputs, changed):
+    # callback: (output key, callback_map entry). inputs: {'component.property': value}
+    output_key, entry = callback
+    outputs = [dict(zip(['id', 'property'], output.rsplit('.', 1))) for output in output_key.strip('.').split('...')]
+    return {'output': output_key,
+            'outputs': outputs if output_key.startswith('..') else outputs[0],
+            'inputs': [dict(spec, value = inputs[spec['id'] + '.' + spec['property']]) for spec in entry['inputs']],
+            'changedPropIds': changed}
+
+
+def drag_session(DashApp, callbacks, rng, league, season_drag = 3, round_drag = 12):
+    # A user dragging the season slider over a few neighbouring seasons (each step fires the season, round and fixtures
+    # callbacks), then the round slider over a range of rounds (each step fires the round callback)
+    seasons = [season['SeasonOrder'] for season in DashApp.data.seasons(league)]
+    position = rng.randrange(len(seasons))
+    step = rng.choice([-1, 1])
+    inputs = {'league-dropdown.value': league, 'fixtures-table.page_current': 0, 'fixtures-table.page_size': DashApp.TABLE_PAGE_SIZE,
+              'fixtures-table.sort_by': [], 'fixtures-table.filter_query': ''}
+
+    bodies = []
+    for _ in range(season_drag):
+        position = min(max(position + step, 0), len(seasons) - 1)
+        info = DashApp.data.season_info(league, seasons[position])
+        inputs.update({'season-slider.value': seasons[position], 'round-slider.value': info['LastRound']})
+        bodies += [request_body(callbacks['update_season_stats'], inputs, ['season-slider.value']),
+                   request_body(callbacks['update_round_stats'], inputs, ['season-slider.value']),
+                   request_body(callbacks['update_fixtures_table'], inputs, ['season-slider.value'])]
+
+    target = rng.randint(info['FirstRound'], info['LastRound'])
+    for game_round in np.linspace(info['LastRound'], target, num = round_drag).round().astype(int).tolist():
+        inputs['round-slider.value'] = game_round
+        bodies.append(request_body(callbacks['update_round_stats'], inputs, ['round-slider.value']))
+
+    return bodies
+
+
+def bench_http(DashApp, clients, sessions, seed):
+    callbacks = {entry['callback'].__name__: (output_key, entry) for output_key, entry in DashApp.app.callback_map.items()}
+    endpoint = DashApp.app.config.routes_pathname_prefix + '_dash-update-component'
+
+    results = {}
+    for n_clients in clients:
+        clear_caches(DashApp)
+        rng = random.Random(seed)
+        client_bodies = [[body for _ in range(sessions) for body in drag_session(DashApp, callbacks, rng, DashApp.League_Default)]
+                         for _ in range(n_clients)]
+        latencies = [[] for _ in range(n_clients)]
+        errors = []
+        barrier = threading.Barrier(n_clients + 1)
+
+        def run_client(index):
+            client = DashApp.app.server.test_client()
+            barrier.wait()
+            for body in client_bodies[index]:
+                start = time.perf_counter()
+                response = client.post(endpoint, json = body, headers = {'Accept-Encoding': ACCEPT_ENCODING})
+                latencies[index].append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+        threads = [threading.Thread(target = run_client, args = (index,)) for index in range(n_clients)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        all_latencies = [latency for client_latencies in latencies for latency in client_latencies]
+        results[str(n_clients)] = dict(summary(all_latencies),
+                                       seconds = round(elapsed, 3),
+                                       throughput_rps = round(len(all_latencies) / elapsed, 1),
+                                       errors = len(errors))
+    return results
+
+
+# Results ------------------------------------------------------------------------------------------------------------------------
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], stdout = subprocess.PIPE, stderr = subprocess.DEVNULL,
+                                check = True).stdout.decode().strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], stdout = subprocess.PIPE,
+                               stderr = subprocess.DEVNULL, check = True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def flatten(results, prefix = ''):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(previous, current):
+    old, new = flatten(previous), flatten(current)
+    print("\n{:<50}{:>12}{:>12}{:>9}".format('Compared with ' + previous.get('commit', '?'), 'Before', 'After', 'Change'))
+    for key in new:
+        if key in old and key.endswith(('_ms', '_rps', '_seconds', '_mb')):
+            change = '{:+.0%}'.format(new[key] / old[key] - 1) if old[key] else '-'
+            print("{:<50}{:>12}{:>12}{:>9}".format(key, old[key], new[key], change))
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Dashboard callbacks benchmark (offline, over the bundled assets/ data)")
+    parser.add_argument('--clients', type = int, nargs = '+', default = [1, 4, 8], help = "concurrent HTTP clients, one run per value")
+    parser.add_argument('--sessions', type = int, default = 5, help = "slider-drag sessions per HTTP client")
+    parser.add_argument('--startups', type = int, default = 3, help = "fresh worker processes measured for startup and RSS")
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--output', help = "results file (default: benchmarks/results/callbacks-<commit>.json)")
+    parser.add_argument('--compare', help = "previous results file to compare with")
+    parser.add_argument('--worker', action = 'store_true', help = argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return startup_worker()
+
+    commit = git_commit()
+    results = {'commit': commit,
+               'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'startup': bench_startup(args.startups)}
+
+    import DashApp
+    import pandas
+    results['pandas'] = pandas.__version__
+    results['compute'] = bench_compute(DashApp)
+    results['callbacks'] = bench_callbacks(DashApp)
+    results['http'] = bench_http(DashApp, args.clients, args.sessions, args.seed)
+
+    output = args.output or join(RESULTS_FOLDER, 'callbacks-{}.json'.format(commit))
+    os.makedirs(dirname(abspath(output)), exist_ok = True)
+    with open(output, 'w') as output_file:
+        json.dump(results, output_file, indent = 1)
+
+    print(json.dumps({key: results[key] for key in ['startup', 'compute', 'callbacks', 'http']}, indent = 1))
+    print("Results saved to", output)
+
+    if args.compare:
+        with open(args.compare) as previous_file:
+            compare(json.load(previous_file), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from os.path import abspath, dirname, join
+from urllib.parse import urlsplit
+
+from callbacks_benchmark import RESULTS_FOLDER, drag_session, git_commit, summary
+
+
+
+# Load test of the production serving mode: the dashboard runs under gunicorn (gunicorn.conf.py) with 1, 2, 4, ... workers
+# in turn, and client processes replay slider-drag sessions against /_dash-update-component over keep-alive connections for
+# a fixed duration. Throughput should scale near-linearly with the workers, up to the cores left free by the clients.
+# --url load tests an already running server instead (any deployment), with the same sessions.
+# Usage (from the DASH folder): python benchmarks/load_test.py [--workers 1 2 4] [--clients 16] [--duration 20] [--url URL]
+
+PORT = 8765
+ACCEPT_ENCODING = 'br, gzip'
+
+
+def session_bodies(sessions, seed):
+    import DashApp
+    callbacks = {entry['callback'].__name__: (output_key, entry) for output_key, entry in DashApp.app.callback_map.items()}
+    rng = random.Random(seed)
+    return [json.dumps(body).encode('utf-8')
+            for _ in range(sessions) for body in drag_session(DashApp, callbacks, rng, DashApp.League_Default)]
+
+
+def run_client(arguments):
+    # One client process: replays its bodies in a loop over one keep-alive connection until the deadline
+    url, bodies, warmup_until, deadline = arguments
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/') + '/_dash-update-component'
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout = 60)
+    headers = {'Content-Type': 'application/json', 'Accept-Encoding': ACCEPT_ENCODING}
+
+    latencies, errors, index = [], 0, 0
+    while time.time() < deadline:
+        start = time.perf_counter()
+        connection.request('POST', path, body = bodies[index % len(bodies)], headers = headers)
+        response = connection.getresponse()
+        response.read()
+        if time.time() >= warmup_until:
+            latencies.append(time.perf_counter() - start)
+            errors += response.status != 200
+        index += 1
+
+    connection.close()
+    return latencies, errors
+
+
+def load(url, bodies, clients, duration, warmup):
+    warmup_until = time.time() + warmup
+    deadline = warmup_until + duration
+    # Each client starts at a different point of the sessions, so they do not request the same outputs in lockstep
+    arguments = [(url, bodies[i * len(bodies) // clients:] + bodies[:i * len(bodies) // clients], warmup_until, deadline)
+                 for i in range(clients)]
+
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(run_client, arguments)
+
+    latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+    return dict(summary(latencies),
+                throughput_rps = round(len(latencies) / duration, 1),
+                errors = sum(errors for _, errors in results))
+
+
+def wait_until_healthy(url, process, timeout = 300):
+    started = time.time()
+    while time.time() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited with code {}".format(process.returncode))
+        try:
+            with urllib.request.urlopen(url + '/health', timeout = 2) as response:
+                if response.status == 200:
+                    return time.time() - started
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError("the server did not answer on {} within {} s".format(url, timeout))
+
+
+def serve(workers, threads):
+    env = dict(os.environ, LIGANOS_WORKERS = str(workers), LIGANOS_THREADS = str(threads),
+               LIGANOS_BIND = '127.0.0.1:{}'.format(PORT), LIGANOS_RELOAD_INTERVAL = '0', LIGANOS_CACHE_PREWARM = '1',
+               LIGANOS_LOG_LEVEL = 'WARNING')
+    return subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'DashApp:server'], env = env,
+                            stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Load test of the dashboard callbacks under gunicorn")
+    parser.add_argument('--workers', type = int, nargs = '+', default = [1, 2, 4], help = "gunicorn worker counts, one run per value")
+    parser.add_argument('--threads', type = int, default = 1, help = "threads per worker")
+    parser.add_argument('--clients', type = int, default = 16, help = "client processes")
+    parser.add_argument('--duration', type = float, default = 20, help = "measured seconds per run")
+    parser.add_argument('--warmup', type = float, default = 3, help = "seconds of load before measuring")
+    parser.add_argument('--sessions', type = int, default = 20, help = "slider-drag sessions replayed by the clients")
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--url', help = "load test this running server instead of launching gunicorn")
+    parser.add_argument('--output', help = "results file (default: benchmarks/results/load-<commit>.json)")
+    args = parser.parse_args()
+
+    bodies = session_bodies(args.sessions, args.seed)
+    results = {'commit': git_commit(),
+               'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+               'cores': multiprocessing.cpu_count(),
+               'clients': args.clients,
+               'threads': args.threads,
+               'runs': {}}
+
+    if args.url:
+        results['runs'][args.url] = load(args.url.rstrip('/'), bodies, args.clients, args.duration, args.warmup)
+    else:
+        url = 'http://127.0.0.1:{}'.format(PORT)
+        for workers in args.workers:
+            process = serve(workers, args.threads)
+            try:
+                startup_seconds = wait_until_healthy(url, process)
+                run = load(url, bodies, args.clients, args.duration, args.warmup)
+            finally:
+                process.terminate()
+                process.wait()
+            run['startup_seconds'] = round(startup_seconds, 1)
+            results['runs'][str(workers)] = run
+
+        # Scaling efficiency: throughput per worker relative to the single worker run
+        base = results['runs'][str(args.workers[0])]['throughput_rps'] / args.workers[0]
+        for workers in args.workers:
+            results['runs'][str(workers)]['scaling'] = round(results['runs'][str(workers)]['throughput_rps'] / (base * workers), 2)
+
+    output = args.output or join(RESULTS_FOLDER, 'load-{}.json'.format(results['commit']))
+    os.makedirs(dirname(abspath(output)), exist_ok = True)
+    with open(output, 'w') as output_file:
+        json.dump(results, output_file, indent = 1)
+
+    print("{:<28}{:>12}{:>10}{:>10}{:>10}{:>9}".format('Run', 'Requests/s', 'p50 ms', 'p95 ms', 'p99 ms', 'Scaling'))
+    for run_name, run in results['runs'].items():
+        print("{:<28}{:>12}{:>10}{:>10}{:>10}{:>9}".format(run_name if args.url else run_name + ' workers', run['throughput_rps'],
+                                                          run['p50_ms'], run['p95_ms'], run['p99_ms'], run.get('scaling', '-')))
+    print("Results saved to", output)
+
+
+if __name__ == '__main__':
+    main()
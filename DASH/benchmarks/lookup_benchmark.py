@@ -0,0 +1,130 @@
+import os
+import sys
+import time
+import warnings
+from os.path import abspath, dirname
+
+# Running from the DASH folder, as the dashboard does
+os.chdir(dirname(dirname(abspath(__file__))))
+sys.path.insert(0, os.getcwd())
+warnings.filterwarnings('ignore')
+
+import DashApp
+from data_access import FrameIndex
+from data_store import frame_name, read_csv_frame
+from leaderboards import PLAYER_LEADERBOARDS, season_leaderboards
+
+
+
+# Micro-benchmark: per-callback filtering latency with the old boolean masks vs the FrameIndex lookups, and the end-to-end
+# compute functions run over both (the masked baseline also derives the season leaderboards on every call, as before).
+# Usage (from the DASH folder): python benchmarks/lookup_benchmark.py [repetitions]
+
+# Whole-history frames, as the dashboard held them before the partitioned dataset
+frames = {frame_name(csv_name): read_csv_frame(DashApp.root_path, csv_name) for csv_name in DashApp.df_list_csvs}
+df_class, df_bcr, df_games = frames['df_class'], frames['df_bcr'], frames['df_games']
+df_scorers, df_assists, df_player_cards = frames['df_scorers'], frames['df_assists'], frames['df_player_cards']
+data = FrameIndex(frames)
+league = DashApp.League_Default
+
+
+def season_filters_masks(selected_season, team):
+    df_class[df_class['SeasonOrder'] == selected_season]
+    df_bcr[df_bcr['SeasonOrder'] == selected_season][['Round', 'Team', 'TotalPoints']]
+    df_scorers[df_scorers['SeasonOrder'] == selected_season]
+    df_assists[df_assists['SeasonOrder'] == selected_season]
+    df_player_cards[df_player_cards['SeasonOrder'] == selected_season]
+    df_bcr[df_bcr['SeasonOrder'] == selected_season][df_bcr['Team'] == team][['Round', 'Position']]
+
+
+def season_filters_index(selected_season, team):
+    data.season('df_class', selected_season)
+    data.season('df_bcr', selected_season)[['Round', 'Team', 'TotalPoints']]
+    data.season('df_scorers', selected_season)
+    data.season('df_assists', selected_season)
+    data.season('df_player_cards', selected_season)
+    data.season_team('df_bcr', selected_season, team)[['Round', 'Position']]
+
+
+def round_filters_masks(selected_season, selected_round):
+    df_class[df_class['SeasonOrder'] == selected_season]
+    df_bcr[df_bcr['SeasonOrder'] == selected_season][df_bcr['Round'] == selected_round]
+    df_games[df_games['SeasonOrder'] == selected_season][df_games['Round'] == selected_round]
+
+
+def round_filters_index(selected_season, selected_round):
+    data.season('df_class', selected_season)
+    data.season_round('df_bcr', selected_season, selected_round)
+    data.season_round('df_games', selected_season, selected_round)
+
+
+class MaskedData:
+
+    # DashApp.data's interface over the whole-history frames, sliced with boolean masks on every call
+    def __init__(self, dataset):
+        self.dataset = dataset                  # for the seasons metadata
+
+    def season_info(self, league, season_order):
+        return self.dataset.season_info(league, season_order)
+
+    def season(self, name, league, season_order):
+        if name.startswith('leaderboard_'):
+            names = [frame for frame, _ in PLAYER_LEADERBOARDS.values()] + ['df_class']
+            return season_leaderboards({frame: self.season(frame, league, season_order) for frame in names})[name]
+        df = frames[name]
+        return df[df['SeasonOrder'] == season_order]
+
+    def season_round(self, name, league, season_order, game_round):
+        df = frames[name]
+        return df[(df['SeasonOrder'] == season_order) & (df['Round'] == game_round)]
+
+    def season_team(self, name, league, season_order, team):
+        df = frames[name]
+        return df[(df['SeasonOrder'] == season_order) & (df['Team'] == team)]
+
+
+def with_data(dataset, function):
+    # Runs function with DashApp.data swapped for dataset (the compute functions read the module global)
+    def run(*key):
+        indexed, DashApp.data = DashApp.data, dataset
+        try:
+            return function(*key)
+        finally:
+            DashApp.data = indexed
+    return run
+
+
+def timeit(function, keys, repetitions):
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for key in keys:
+            function(*key)
+    return (time.perf_counter() - start) / (repetitions * len(keys)) * 1e3
+
+
+if __name__ == '__main__':
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    winners = df_class.groupby('SeasonOrder', sort = False)['Team'].first().astype(str)
+    season_keys = list(winners.items())
+    round_keys = list(df_bcr[['SeasonOrder', 'Round']].drop_duplicates().itertuples(index = False, name = None))
+
+    def season_stats(s, _):
+        return DashApp.compute_season_stats(league, s)
+
+    def round_stats(s, r):
+        return DashApp.compute_round_stats(league, s, r)
+
+    masked = MaskedData(DashApp.data)
+    results = [('season callback filters', timeit(season_filters_masks, season_keys, repetitions),
+                                           timeit(season_filters_index, season_keys, repetitions)),
+               ('round callback filters', timeit(round_filters_masks, round_keys, repetitions),
+                                          timeit(round_filters_index, round_keys, repetitions)),
+               ('compute_season_stats', timeit(with_data(masked, season_stats), season_keys, repetitions),
+                                        timeit(season_stats, season_keys, repetitions)),
+               ('compute_round_stats', timeit(with_data(masked, round_stats), round_keys, repetitions),
+                                       timeit(round_stats, round_keys, repetitions))]
+
+    print("{:<25}{:>15}{:>15}{:>10}".format('Stage (ms per call)', 'Boolean masks', 'FrameIndex', 'Speedup'))
+    for stage, before, after in results:
+        print("{:<25}{:>15.3f}{:>15.3f}{:>10}".format(stage, before, after, '{:.1f}x'.format(before / after)))
@@ -0,0 +1,296 @@
+import fnmatch
+import json
+import os
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+
+
+# Storage backends of the callback outputs caches (callback_cache.OutputCache):
+#   MemoryBackend   per-process LRU holding the outputs as they are (the default)
+#   SQLiteBackend   a SQLite file shared by every worker process of a host
+#   RedisBackend    a Redis (or Redis-compatible) server shared by every host, spoken to over RESP with the standard library
+# Keys are tuples (namespace, cache name, data version, *callback key): a data reload or a runtime ingestion changes the version
+# of the seasons involved, so their stale entries are simply never read again (and expire with the TTL or the LRU cap).
+# Shared backends store the outputs as serialized JSON. RedisStandIn is a minimal in-process Redis-compatible server, to run
+# the Redis backend without a Redis install.
+
+class MemoryBackend:
+
+    def __init__(self, max_entries = 512):
+        self.max_entries = max_entries          # LRU cap (None or 0 disables eviction)
+        self._entries = OrderedDict()           # key -> (expires_at or None, outputs)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, outputs, ttl = None):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl if ttl else None, outputs)
+            self._entries.move_to_end(key)
+            if self.max_entries:
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last = False)
+
+    def discard(self, predicate):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self, prefix):
+        self.discard(lambda key: key[:len(prefix)] == prefix)
+
+    def count(self, prefix):
+        with self._lock:
+            return sum(key[:len(prefix)] == prefix for key in self._entries)
+
+
+def key_string(key):
+    return ':'.join(str(part) for part in key)
+
+
+class SQLiteBackend:
+
+    # Entries are capped at max_entries per cache (oldest stored first) and expired entries are purged as new ones come in
+    TRIM_EVERY = 64
+
+    def __init__(self, path, max_entries = 512):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._sets = 0
+        with self._connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS outputs (prefix TEXT, key TEXT PRIMARY KEY, value BLOB, "
+                               "expires REAL, stored REAL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS outputs_prefix ON outputs (prefix, stored)")
+
+    def _connection(self):
+        # One connection per thread and process: connections must not cross threads, nor a fork
+        if getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok = True)
+            connection = sqlite3.connect(self.path, timeout = 10, isolation_level = None)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return self._local.connection
+
+    def get(self, key):
+        row = self._connection().execute("SELECT value FROM outputs WHERE key = ? AND (expires IS NULL OR expires >= ?)",
+                                          (key_string(key), time.time())).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key, outputs, ttl = None):
+        now = time.time()
+        prefix = key_string(key[:2])
+        connection = self._connection()
+        connection.execute("INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?)",
+                           (prefix, key_string(key), json.dumps(outputs).encode('utf-8'), now + ttl if ttl else None, now))
+
+        self._sets += 1
+        if self._sets % self.TRIM_EVERY == 0:
+            connection.execute("DELETE FROM outputs WHERE expires < ?", (now,))
+            if self.max_entries:
+                connection.execute("DELETE FROM outputs WHERE prefix = ? AND key NOT IN "
+                                   "(SELECT key FROM outputs WHERE prefix = ? ORDER BY stored DESC LIMIT ?)",
+                                   (prefix, prefix, self.max_entries))
+
+    def discard(self, predicate):
+        # Nothing to do: the entries of changed data are keyed by their old version, never read again and trimmed in time
+        pass
+
+    def clear(self, prefix):
+        self._connection().execute("DELETE FROM outputs WHERE prefix = ? OR prefix LIKE ?",
+                                   (key_string(prefix), key_string(prefix) + ':%'))
+
+    def count(self, prefix):
+        return self._connection().execute("SELECT COUNT(*) FROM outputs WHERE (prefix = ? OR prefix LIKE ?) "
+                                          "AND (expires IS NULL OR expires >= ?)",
+                                          (key_string(prefix), key_string(prefix) + ':%', time.time())).fetchone()[0]
+
+
+class RedisError(Exception):
+    pass
+
+
+def encode_command(*arguments):
+    arguments = [argument if isinstance(argument, bytes) else str(argument).encode('utf-8') for argument in arguments]
+    return b'*' + str(len(arguments)).encode() + b'\r\n' + \
+           b''.join(b'$' + str(len(argument)).encode() + b'\r\n' + argument + b'\r\n' for argument in arguments)
+
+
+def read_reply(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    kind, value = line[:1], line[1:-2]
+    if kind == b'+':
+        return value.decode()
+    if kind == b'-':
+        raise RedisError(value.decode())
+    if kind == b':':
+        return int(value)
+    if kind == b'$':
+        return None if int(value) < 0 else stream.read(int(value) + 2)[:-2]
+    if kind == b'*':
+        return None if int(value) < 0 else [read_reply(stream) for _ in range(int(value))]
+    raise RedisError("unexpected reply: {!r}".format(line))
+
+
+class RedisBackend:
+
+    # max_entries is left to the server (maxmemory-policy), entries expire with the TTL
+    SCAN_COUNT = 500                            # keys examined per SCAN call when clearing a cache
+    def __init__(self, host = '127.0.0.1', port = 6379, db = 0, timeout = 5):
+        self.address = (host, port)
+        self.db = db
+        self.timeout = timeout
+        self._local = threading.local()
+        self.command('PING')
+
+    def command(self, *arguments):
+        # One connection per thread and process, reconnected once when it was dropped
+        for attempt in range(2):
+            if getattr(self._local, 'pid', None) != os.getpid():
+                connection = socket.create_connection(self.address, timeout = self.timeout)
+                self._local.connection, self._local.stream, self._local.pid = connection, connection.makefile('rb'), os.getpid()
+                if self.db:
+                    self._send('SELECT', self.db)
+            try:
+                return self._send(*arguments)
+            except (ConnectionError, socket.timeout):
+                self._local.pid = None
+                if attempt:
+                    raise
+
+    def _send(self, *arguments):
+        self._local.connection.sendall(encode_command(*arguments))
+        return read_reply(self._local.stream)
+
+    def get(self, key):
+        value = self.command('GET', key_string(key))
+        return None if value is None else json.loads(value)
+
+    def set(self, key, outputs, ttl = None):
+        arguments = ['SET', key_string(key), json.dumps(outputs).encode('utf-8')]
+        self.command(*(arguments + ['PX', int(ttl * 1000)] if ttl else arguments))
+
+    def discard(self, predicate):
+        # As SQLiteBackend: stale entries are keyed by their old data version
+        pass
+
+    def clear(self, prefix):
+        # Incremental SCAN rather than KEYS, which blocks the server while it walks the whole keyspace
+        cursor = b'0'
+        while True:
+            cursor, keys = self.command('SCAN', cursor, 'MATCH', key_string(prefix) + ':*', 'COUNT', self.SCAN_COUNT)
+            if keys:
+                self.command('DEL', *keys)
+            if cursor == b'0':
+                break
+
+    def count(self, prefix):
+        # Not counted: it would take a walk over the whole keyspace, and the entries of a shared server are not this process'
+        return None
+
+
+def open_backend(url, max_entries = 512):
+    # 'memory', 'sqlite:///path/to/cache.sqlite' (relative paths: sqlite://cache.sqlite) or 'redis://host:port/db'
+    parts = urlsplit(url)
+    if parts.scheme in ('', 'memory'):
+        return MemoryBackend(max_entries)
+    if parts.scheme == 'sqlite':
+        return SQLiteBackend(parts.netloc + parts.path, max_entries = max_entries)
+    if parts.scheme == 'redis':
+        return RedisBackend(parts.hostname or '127.0.0.1', parts.port or 6379, db = int(parts.path.strip('/') or 0))
+    raise ValueError("unknown cache backend: " + url)
+
+
+class RedisStandIn:
+
+    # Minimal Redis-compatible server (PING, SELECT, GET, SET [EX|PX], DEL, SCAN [MATCH] [COUNT], FLUSHDB), in a background thread:
+    #     with RedisStandIn() as server:
+    #         backend = RedisBackend(port = server.port)
+    def __init__(self, host = '127.0.0.1', port = 0):
+        self.data = {}                          # key -> (value, expires_at or None)
+        self.lock = threading.Lock()
+        stand_in = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        arguments = read_reply(self.rfile)
+                    except (ConnectionError, RedisError):
+                        return
+                    self.wfile.write(stand_in.execute([argument.decode('utf-8') if isinstance(argument, bytes) and i == 0
+                                                       else argument for i, argument in enumerate(arguments)]))
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target = self.server.serve_forever, daemon = True)
+
+    def execute(self, arguments):
+        name, arguments = arguments[0].upper(), arguments[1:]
+        now = time.time()
+        with self.lock:
+            if name == 'PING':
+                return b'+PONG\r\n'
+            if name in ('SELECT', 'FLUSHDB'):
+                if name == 'FLUSHDB':
+                    self.data.clear()
+                return b'+OK\r\n'
+            if name == 'GET':
+                value, expires = self.data.get(arguments[0], (None, None))
+                if value is None or (expires is not None and expires < now):
+                    return b'$-1\r\n'
+                return b'$' + str(len(value)).encode() + b'\r\n' + value + b'\r\n'
+            if name == 'SET':
+                expires = None
+                if len(arguments) == 4:
+                    expires = now + int(arguments[3]) / (1000 if arguments[2].upper() == b'PX' else 1)
+                self.data[arguments[0]] = (arguments[1], expires)
+                return b'+OK\r\n'
+            if name == 'DEL':
+                return b':' + str(sum(self.data.pop(key, None) is not None for key in arguments)).encode() + b'\r\n'
+            if name == 'SCAN':
+                # Keys are walked in the order of their hash and the cursor is the next hash: as with Redis, deleting keys
+                # between calls does not make the scan miss the others (a key may be returned twice)
+                options = {arguments[i].upper(): arguments[i + 1] for i in range(1, len(arguments) - 1, 2)}
+                pattern = options.get(b'MATCH', b'*').decode('utf-8')
+                start, count = int(arguments[0]), int(options.get(b'COUNT', 10))
+                hashed = sorted((zlib.crc32(key) + 1, key) for key in self.data if zlib.crc32(key) + 1 >= start)
+                cursor = hashed[count][0] if len(hashed) > count else 0
+                matched = [key for _, key in hashed[:count] if fnmatch.fnmatchcase(key.decode('utf-8'), pattern)
+                           and (self.data[key][1] is None or self.data[key][1] >= now)]
+                return b'*2\r\n' + encode_command(cursor)[4:] + encode_command(*matched)
+        return b'-ERR unknown command ' + name.encode() + b'\r\n'
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
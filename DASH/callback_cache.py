@@ -0,0 +1,79 @@
+import json
+from threading import Lock
+
+import plotly
+
+from cache_backends import MemoryBackend
+
+
+
+# Warm cache for the dashboard callbacks: outputs are computed once per key (e.g. (season, round)),
+# serialized to plain JSON structures and served from the cache backend afterwards (a per-process LRU by default,
+# or a SQLite file / Redis server shared by the workers, see cache_backends). Entries are keyed by the data version
+# of the season they were computed from.
+
+def serialize_outputs(outputs):
+    # Components and figures are turned into the exact JSON structures Dash sends to the browser,
+    # so cached entries never hold pandas/plotly objects nor need to be rebuilt
+    return json.loads(json.dumps(outputs, cls = plotly.utils.PlotlyJSONEncoder))
+
+
+class OutputCache:
+
+    def __init__(self, compute, max_entries = 512, backend = None, version = None, ttl = None, name = 'outputs', namespace = ''):
+        self.compute = compute                  # function(*key) returning the callback outputs
+        self.backend = backend if backend is not None else MemoryBackend(max_entries)     # see cache_backends
+        self.version = version                  # function(*key) returning the data version the outputs of key depend on
+        self.ttl = ttl                          # seconds an entry is served for (None: until evicted)
+        self.prefix = (namespace, name)         # stored keys: (namespace, name, version, *key)
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0                    # bumped by invalidate(), so outputs computed from older data are not stored
+        self._lock = Lock()
+
+    def stored_key(self, key):
+        return self.prefix + (self.version(*key) if self.version else None,) + key
+
+    def get(self, *key):
+        stored_key = self.stored_key(key)
+        outputs = self.backend.get(stored_key)
+        if outputs is not None:
+            with self._lock:
+                self.hits += 1
+            return outputs
+
+        # Computing outside the lock, so a slow key does not block lookups of warm ones
+        generation = self._generation
+        outputs = serialize_outputs(self.compute(*key))
+
+        with self._lock:
+            self.misses += 1
+            stale = generation != self._generation
+        if not stale:
+            self.backend.set(stored_key, outputs, self.ttl)
+
+        return outputs
+
+    def prewarm(self, keys):
+        # With a shared backend, keys already computed by another worker are only read
+        for key in keys:
+            self.get(*key)
+
+    def invalidate(self, predicate):
+        # Dropping the entries whose key matches, e.g. lambda key: key[:2] == (league, season_order). Shared backends keep
+        # them: the new data has a new version, so they are not read again
+        with self._lock:
+            self._generation += 1
+        self.backend.discard(lambda stored_key: stored_key[:2] == self.prefix and predicate(stored_key[3:]))
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+        self.backend.clear(self.prefix)
+
+    def entries(self):
+        # Entries stored by this cache, or None when the backend does not count them (Redis)
+        return self.backend.count(self.prefix)
+
+    def __contains__(self, key):
+        return self.backend.get(self.stored_key(key)) is not None
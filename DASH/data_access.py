@@ -0,0 +1,217 @@
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+
+import pandas as pd
+
+
+
+# Indexed access to the dashboard dataframes: every frame is partitioned once, at load time, by the keys the callbacks filter on,
+# so a callback gets its slice with a dictionary lookup instead of a full-column boolean mask.
+# Partitions are shared between requests and must be treated as read-only (copy before adding columns).
+#
+# Dataset sits on top: it holds the lightweight metadata index (leagues, seasons, rounds) and loads each (league, season)
+# partition on first access, keeping at most max_partitions of them in memory (least recently used ones are dropped).
+# Partitions rebuilt at runtime (e.g. the running season, by the standings engine) replace the loaded ones and are never dropped.
+# When they were also written to the store, they take its content hash, so the hot reload that follows leaves them in place.
+# Frames derived from a partition's own (e.g. the season leaderboards) are computed once, whenever it is loaded or replaced.
+# Each season carries a content hash (Version) in the metadata: reloading a newer data version only drops the seasons whose
+# hash changed, and the hashes of all seasons make up the data version reported by the health endpoint. A replaced partition
+# gets the content hash of its new frames, so cache_version tells the outputs of every data state apart.
+
+# Partition keys built for each frame, on top of the SeasonOrder partition every frame gets
+PARTITION_KEYS = {'df_bcr': [['SeasonOrder', 'Round'], ['SeasonOrder', 'Team']],
+                  'df_games': [['SeasonOrder', 'Round']]}
+
+
+def partition(df, keys):
+    # groupby keeps the original row order inside each group, so the slices match the boolean-mask ones
+    # (observed = True: categorical keys must not produce empty groups for every category combination)
+    if len(keys) == 1:
+        return {key: group for key, group in df.groupby(keys[0], sort = False, observed = True)}
+    return {key: group for key, group in df.groupby(keys, sort = False, observed = True)}
+
+
+class FrameIndex:
+
+    def __init__(self, frames, partition_keys = PARTITION_KEYS):
+        self.frames = frames
+        self._empty = {name: df.iloc[0:0] for name, df in frames.items()}
+        self._partitions = {}
+
+        for name, df in frames.items():
+            for keys in [['SeasonOrder']] + partition_keys.get(name, []):
+                if set(keys) <= set(df.columns):
+                    self._partitions[(name, tuple(keys))] = partition(df, keys)
+
+    def lookup(self, name, keys, values):
+        return self._partitions[(name, tuple(keys))].get(values, self._empty[name])
+
+    def season(self, name, season_order):
+        return self.lookup(name, ['SeasonOrder'], season_order)
+
+    def season_round(self, name, season_order, game_round):
+        return self.lookup(name, ['SeasonOrder', 'Round'], (season_order, game_round))
+
+    def season_team(self, name, season_order, team):
+        return self.lookup(name, ['SeasonOrder', 'Team'], (season_order, team))
+
+    def seasons(self, name):
+        return sorted(self._partitions[(name, ('SeasonOrder',))])
+
+
+# Content hash of a frame (e.g. one (league, season) partition of df_class) and of a set of frames
+def frame_version(df):
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index = False).values.tobytes()).hexdigest()[:12]
+
+
+def frames_version(frames):
+    return hashlib.sha1(json.dumps([[name, frame_version(frames[name])] for name in sorted(frames)]).encode('utf-8')).hexdigest()[:12]
+
+
+def data_version(metadata):
+    versions = [[league, season['SeasonOrder'], season.get('Version')] for league in sorted(metadata) for season in metadata[league]]
+    return hashlib.sha1(json.dumps(versions).encode('utf-8')).hexdigest()[:12]
+
+
+class Dataset:
+
+    def __init__(self, metadata, load_partition, max_partitions = 32, derive = None):
+        self.metadata = metadata                    # {league: [{'SeasonOrder', 'Season', 'SeasonExtended', 'FirstRound', 'LastRound', 'Version'}]}
+        self.load_partition = load_partition        # function(league, season_order) returning {frame name: dataframe}
+        self.max_partitions = max_partitions
+        self.derive = derive                        # function({frame name: dataframe}) returning the derived frames to add
+        self.version = data_version(metadata)
+        self._season_info = {(league, season['SeasonOrder']): season
+                             for league, seasons in metadata.items() for season in seasons}
+        self._partitions = OrderedDict()
+        self._replaced = {}
+        self._replaced_versions = {}
+        self._lock = Lock()
+
+    def leagues(self):
+        return sorted(self.metadata)
+
+    def seasons(self, league):
+        return self.metadata.get(league, [])
+
+    def season_info(self, league, season_order):
+        return self._season_info[(league, season_order)]
+
+    def keys(self):
+        return list(self._season_info)
+
+    def cache_version(self, league, season_order):
+        # Version of the data behind a season's outputs: its files content hash, or the hash of the frames that replaced it
+        key = (league, season_order)
+        return self._replaced_versions.get(key) or self._season_info[key].get('Version')
+
+    def partition(self, league, season_order):
+        key = (league, season_order)
+        with self._lock:
+            if key in self._replaced:
+                return self._replaced[key]
+            if key in self._partitions:
+                self._partitions.move_to_end(key)
+                return self._partitions[key]
+
+        index = FrameIndex(self.derived(self.load_partition(league, season_order)))
+
+        with self._lock:
+            self._partitions[key] = index
+            while len(self._partitions) > self.max_partitions:
+                self._partitions.popitem(last = False)
+
+        return index
+
+    def partition_frames(self, league, season_order):
+        # A partition's frames, without keeping it loaded: the loaded (or replaced) ones when there are, read otherwise
+        key = (league, season_order)
+        with self._lock:
+            index = self._replaced.get(key) or self._partitions.get(key)
+
+        return index.frames if index is not None else self.load_partition(league, season_order)
+
+    def replace_partition(self, league, season_order, frames, version = None):
+        # frames: {frame name: dataframe} for the frames being replaced, the others are kept from the current partition.
+        # version: the season's content hash once the frames are persisted (see data_store.write_store_partition)
+        frames = dict(self.partition(league, season_order).frames, **frames)
+        index = FrameIndex(self.derived(frames))
+
+        season = self._season_info[(league, season_order)]
+        if version is not None:
+            season['Version'] = version
+        else:
+            version = frames_version(frames)
+        if 'df_bcr' in frames and len(frames['df_bcr']):
+            season['FirstRound'] = int(frames['df_bcr']['Round'].min())
+            season['LastRound'] = int(frames['df_bcr']['Round'].max())
+
+        with self._lock:
+            self._replaced[(league, season_order)] = index
+            self._replaced_versions[(league, season_order)] = version
+            self._partitions.pop((league, season_order), None)
+
+        return index
+
+    def derived(self, frames):
+        return frames if self.derive is None else dict(frames, **self.derive(frames))
+
+    def reload(self, other):
+        # Swapping in the metadata and loader of a newer Dataset. Returns the (league, season_order) keys whose content changed
+        # (or that were added or removed): only those partitions are dropped, the others stay loaded
+        changed = [key for key in set(self._season_info) | set(other._season_info)
+                   if self._season_info.get(key, {}).get('Version') is None
+                   or self._season_info.get(key, {}).get('Version') != other._season_info.get(key, {}).get('Version')]
+
+        with self._lock:
+            # Replaced partitions of unchanged seasons keep their (runtime) rounds
+            for key in self._replaced:
+                if key not in changed:
+                    other._season_info[key].update({'FirstRound': self._season_info[key]['FirstRound'],
+                                                    'LastRound': self._season_info[key]['LastRound']})
+
+            self.metadata = other.metadata
+            self.load_partition = other.load_partition
+            self.version = other.version
+            self._season_info = other._season_info
+            for key in changed:
+                self._partitions.pop(key, None)
+                self._replaced.pop(key, None)
+                self._replaced_versions.pop(key, None)
+
+        return sorted(changed)
+
+    def season(self, name, league, season_order):
+        return self.partition(league, season_order).season(name, season_order)
+
+    def season_round(self, name, league, season_order, game_round):
+        return self.partition(league, season_order).season_round(name, season_order, game_round)
+
+    def season_team(self, name, league, season_order, team):
+        return self.partition(league, season_order).season_team(name, season_order, team)
+
+    def memory_report(self, every_partition = False):
+        # Footprint of the loaded partitions or, with every_partition, of the whole dataset once loaded: the partitions not
+        # loaded are read (and their frames derived) one at a time, without being kept
+        with self._lock:
+            loaded = dict(self._partitions, **self._replaced)
+
+        if every_partition:
+            reports = [memory_report(loaded[key].frames) if key in loaded else memory_report(self.derived(self.load_partition(*key)))
+                       for key in self.keys()]
+        else:
+            reports = [memory_report(index.frames) for index in loaded.values()]
+
+        report = pd.concat(reports or [memory_report({})])
+        return report.groupby(level = 0).agg({'Rows': 'sum', 'Columns': 'max', 'MB': 'sum'})
+
+
+def memory_report(frames):
+    report = pd.DataFrame([{'Frame': name,
+                            'Rows': len(df),
+                            'Columns': len(df.columns),
+                            'MB': df.memory_usage(deep = True).sum() / 2 ** 20} for name, df in frames.items()],
+                          columns = ['Frame', 'Rows', 'Columns', 'MB'])
+    return report.set_index('Frame')
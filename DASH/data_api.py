@@ -0,0 +1,254 @@
+import gzip
+import hashlib
+import json
+from collections import defaultdict
+from os.path import abspath
+from threading import Lock
+
+import flask
+
+from data_store import ODDS_DECIMALS
+from static_assets import fingerprint
+
+try:
+    import brotli
+except ImportError:                     # brotli is optional: without it the responses are gzip-compressed only
+    brotli = None
+
+try:
+    import pyarrow as pa
+except ImportError:                     # pyarrow is optional: without it the API only answers in JSON
+    pa = None
+
+
+
+# Read-only data API on the Flask server, for tools that would otherwise scrape the dashboard or read the CSVs themselves:
+#
+#     GET /api/v1/seasons                                          leagues, seasons, rounds, resources and their data versions
+#     GET /api/v1/<league>/<SeasonOrder>/classification            final table (df_class, with its Position)
+#     GET /api/v1/<league>/<SeasonOrder>/standings[/<Round>]       standings after every round, or after one (df_bcr)
+#     GET /api/v1/<league>/<SeasonOrder>/fixtures                  games with the B365 odds (df_games)
+#     GET /api/v1/<league>/<SeasonOrder>/leaderboards/<name>       scorers, assists, discipline or teams (season leaderboards)
+#
+# Responses are JSON ({league, season_order, season, resource, version, rows}) or, with ?format=arrow or an
+# Accept: application/vnd.apache.arrow.stream header, an Arrow IPC stream (the same fields in the schema metadata).
+# Every response of a season is built at once, the first time one of them is requested (or at startup when the caches are
+# prewarmed), in both formats and already compressed with brotli and gzip: serving one is a dictionary lookup, pandas never
+# runs on the hot path. Strong ETags are derived from the season's data version (and this file's content), so clients
+# revalidate with If-None-Match and get a 304 until the season's data changes.
+
+API_PREFIX = '/api/v1'
+
+JSON_MIMETYPE = 'application/json'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+FORMATS = {'json': JSON_MIMETYPE, 'arrow': ARROW_MIMETYPE}
+
+# Compressed once per data version: brotli quality 7 is within 1% of 9 at a tenth of its cost (11 takes near a second a season)
+API_BR_LEVEL = 7
+API_GZIP_LEVEL = 9
+
+# Fields of each season in the seasons index
+SEASON_FIELDS = ['SeasonOrder', 'Season', 'SeasonExtended', 'FirstRound', 'LastRound']
+
+LEADERBOARDS = {'scorers': 'leaderboard_scorers',
+                'assists': 'leaderboard_assists',
+                'discipline': 'leaderboard_discipline',
+                'teams': 'leaderboard_teams'}
+
+CODE_VERSION = fingerprint(abspath(__file__))
+
+
+# Resources of a season: name -> function(data, league, season_order) returning its dataframe
+def classification(data, league, season_order):
+    df = data.season('df_class', league, season_order).reset_index(drop = True)
+    df.insert(0, 'Position', range(1, len(df) + 1))
+    return df
+
+
+def standings(data, league, season_order):
+    # One row per round and team, in round and position order (the rounds are sliced from it)
+    return data.season('df_bcr', league, season_order).sort_values(['Round', 'Position'], kind = 'stable') \
+                                                      .reset_index(drop = True)
+
+
+def fixtures(data, league, season_order):
+    df = data.season('df_games', league, season_order).reset_index(drop = True)
+    odds = [column for column in ['B365H', 'B365D', 'B365A'] if column in df.columns]
+    return df.astype({column: 'float64' for column in odds}).round({column: ODDS_DECIMALS for column in odds})
+
+
+def leaderboard(name):
+    return lambda data, league, season_order: data.season(LEADERBOARDS[name], league, season_order).reset_index(drop = True)
+
+
+RESOURCES = dict({'classification': classification,
+                  'standings': standings,
+                  'fixtures': fixtures},
+                 **{'leaderboards/' + name: leaderboard(name) for name in LEADERBOARDS})
+
+
+def json_body(rows, fields):
+    return json.dumps(dict(fields, rows = rows), ensure_ascii = False, separators = (',', ':')).encode('utf-8')
+
+
+def arrow_body(table, fields):
+    table = table.replace_schema_metadata(dict(table.schema.metadata or {}, **{key: str(value) for key, value in fields.items()}))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class Representation:
+
+    # One response of the API in one format: its body in every content encoding, and their strong ETags
+    __slots__ = ('mimetype', 'bodies', 'etags')
+
+    def __init__(self, body, mimetype, etag, encodings):
+        self.mimetype = mimetype
+        self.bodies = {'identity': body}
+        if 'br' in encodings and brotli is not None:
+            self.bodies['br'] = brotli.compress(body, quality = API_BR_LEVEL)
+        if 'gzip' in encodings:
+            self.bodies['gzip'] = gzip.compress(body, compresslevel = API_GZIP_LEVEL, mtime = 0)
+        # Each encoding is a different byte sequence, so it gets its own strong ETag
+        self.etags = {encoding: etag if encoding == 'identity' else etag + '-' + encoding for encoding in self.bodies}
+
+
+class DataAPI:
+
+    def __init__(self, app, data, encodings = ('br', 'gzip')):
+        self.data = data
+        self.encodings = [encoding for encoding in encodings if encoding in ('br', 'gzip')]
+        self._seasons = {}                          # (league, season_order) -> (data version, {(resource, format): Representation})
+        self._lock = Lock()
+        self.requests = defaultdict(int)            # (resource, status) -> requests
+        self._requests_lock = Lock()
+
+        app.server.add_url_rule(API_PREFIX + '/seasons', 'data_api_seasons', self.serve_seasons)
+        app.server.add_url_rule(API_PREFIX + '/<league>/<int:season_order>/<path:resource>', 'data_api_resource', self.serve)
+
+    # I. Precomputed responses ---------------------------------------------------------------------------------------------------
+
+    def season_representations(self, league, season_order):
+        key = (league, season_order)
+        version = self.data.cache_version(league, season_order)
+
+        entry = self._seasons.get(key)
+        if entry is None or entry[0] != version:
+            with self._lock:
+                entry = self._seasons.get(key)
+                if entry is None or entry[0] != version:
+                    entry = (version, self.build_season(league, season_order, version))
+                    self._seasons[key] = entry
+
+        return entry[1]
+
+    def build_season(self, league, season_order, version):
+        # Each table is converted once to JSON rows and to an Arrow table. The standings of each round are slices of the
+        # season's (sorted by round): consecutive rows and an Arrow slice, so pandas only runs once per table
+        tables = {}
+        for resource, table in RESOURCES.items():
+            df = table(self.data, league, season_order)
+            df = df.astype({'SeasonOrder': int}) if 'SeasonOrder' in df.columns else df
+            tables[resource] = (json.loads(df.to_json(orient = 'records', double_precision = 6)),
+                                pa.Table.from_pandas(df, preserve_index = False) if pa is not None else None)
+
+        rows, arrow_table = tables['standings']
+        start = 0
+        for end in range(1, len(rows) + 1):
+            if end == len(rows) or rows[end]['Round'] != rows[start]['Round']:
+                tables['standings/' + str(rows[start]['Round'])] = (rows[start:end],
+                                                                    arrow_table.slice(start, end - start) if pa is not None else None)
+                start = end
+
+        season = self.data.season_info(league, season_order)['SeasonExtended']
+        representations = {}
+        for resource, (rows, arrow_table) in tables.items():
+            fields = {'league': league, 'season_order': season_order, 'season': season, 'resource': resource, 'version': version}
+            for format_name, mimetype in FORMATS.items():
+                if format_name == 'arrow' and pa is None:
+                    continue
+                body = json_body(rows, fields) if format_name == 'json' else arrow_body(arrow_table, fields)
+                etag = hashlib.sha1(':'.join([CODE_VERSION, league, str(season_order), str(version), resource, format_name])
+                                    .encode('utf-8')).hexdigest()[:20]
+                representations[(resource, format_name)] = Representation(body, mimetype, etag, self.encodings)
+
+        return representations
+
+    def prewarm(self, keys = None):
+        for league, season_order in keys or self.data.keys():
+            self.season_representations(league, season_order)
+
+    def invalidate(self, keys):
+        # Frees the responses of changed or removed seasons (the others are rebuilt anyway once their version changes)
+        with self._lock:
+            for key in keys:
+                self._seasons.pop(key, None)
+
+    # II. Serving ----------------------------------------------------------------------------------------------------------------
+
+    def requested_format(self):
+        # ?format, or the Accept header (JSON when there is none, None when it accepts neither format)
+        format_name = flask.request.args.get('format')
+        if format_name is not None:
+            return format_name
+        if not flask.request.accept_mimetypes:
+            return 'json'
+        accepted = flask.request.accept_mimetypes.best_match([JSON_MIMETYPE, ARROW_MIMETYPE])
+        return {mimetype: name for name, mimetype in FORMATS.items()}.get(accepted)
+
+    def count(self, resource, status):
+        with self._requests_lock:
+            self.requests[(resource, status)] += 1
+
+    def serve(self, league, season_order, resource):
+        label = 'standings/<round>' if resource.startswith('standings/') else resource
+        try:
+            self.data.season_info(league, season_order)
+        except KeyError:
+            self.count(label, 404)
+            return flask.jsonify(error = "unknown season: {} {}".format(league, season_order)), 404
+
+        format_name = self.requested_format()
+        if format_name not in FORMATS or (format_name == 'arrow' and pa is None):
+            self.count(label, 406)
+            return flask.jsonify(error = "unavailable format: " + (format_name or flask.request.headers.get('Accept', '')),
+                                 formats = [name for name in FORMATS if name == 'json' or pa is not None]), 406
+
+        representation = self.season_representations(league, season_order).get((resource, format_name))
+        if representation is None:
+            self.count(label, 404)
+            return flask.jsonify(error = "unknown resource: " + resource), 404
+
+        encoding = flask.request.accept_encodings.best_match([encoding for encoding in self.encodings
+                                                              if encoding in representation.bodies]) or 'identity'
+        return self.respond(label, representation.bodies, representation.etags, encoding, representation.mimetype)
+
+    def respond(self, label, bodies, etags, encoding, mimetype):
+        if any(etag in flask.request.if_none_match for etag in etags.values()):
+            response = flask.Response(status = 304)
+            status = 304
+        else:
+            response = flask.Response(bodies[encoding], mimetype = mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+            status = 200
+
+        response.set_etag(etags[encoding])
+        response.headers['Vary'] = 'Accept, Accept-Encoding'
+        response.cache_control.public = True
+        response.cache_control.no_cache = True          # stored, but revalidated with the ETag on every use
+        self.count(label, status)
+        return response
+
+    def serve_seasons(self):
+        # Small and read seldom: built per request, with an ETag from the data versions it lists
+        seasons = {league: [dict({field: season[field] for field in SEASON_FIELDS},
+                                 Version = self.data.cache_version(league, season['SeasonOrder']))
+                            for season in self.data.seasons(league)] for league in self.data.leagues()}
+        body = json.dumps({'leagues': seasons, 'resources': list(RESOURCES) + ['standings/<Round>'],
+                           'formats': [name for name in FORMATS if name == 'json' or pa is not None]},
+                          separators = (',', ':')).encode('utf-8')
+        etag = hashlib.sha1(CODE_VERSION.encode('utf-8') + body).hexdigest()[:20]
+        return self.respond('seasons', {'identity': body}, {'identity': etag}, 'identity', JSON_MIMETYPE)
@@ -0,0 +1,304 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+from glob import glob
+from os.path import abspath, basename, dirname, exists, getmtime, join
+
+import pandas as pd
+
+from data_access import Dataset, frame_version
+
+try:
+    import pyarrow.feather as feather
+except ImportError:                     # pyarrow is optional: without it the dashboard keeps loading the CSVs
+    feather = None
+
+
+
+# Columnar data store for the dashboard: the CSV exports in assets/ are normalized and typed once by the ingestion step
+# (python data_store.py) and written as uncompressed Feather files, partitioned by league and season, next to assets/ (not in it:
+# Dash serves assets/ publicly, and the raw partitions must not be downloadable):
+#
+#     store/index.json                                  metadata index (leagues, seasons, their rounds and content hashes)
+#     store/<league>/<SeasonOrder>/<frame>.feather      one file per frame, league and season
+#
+# The dashboard only reads the metadata index at startup and memory-maps each partition on first access, so worker
+# processes skip CSV parsing, share the mapped pages and only hold the seasons being browsed.
+
+STORE_FOLDER = 'store'
+INDEX_FILE = 'index.json'
+
+# League assigned to the frames that carry no Div column (every current export comes from the Liga NOS matches)
+DEFAULT_LEAGUE = 'P1'
+
+CATEGORICAL_COLUMNS = ['Season', 'SeasonExtended', 'Team', 'Player']
+ODDS_DECIMALS = 3
+
+
+# Normalization shared by both paths: zero-padded Season (e.g. 304 -> '0304') and SeasonExtended (e.g. '2003/04', '1994/95').
+# Both are categoricals, so the string operations only run once per distinct season instead of once per row
+def normalize_frame(df):
+    seasons = df['Season'].astype(str).str.zfill(4).astype('category')
+    categories = seasons.cat.categories
+    centuries = pd.Index(['19' if season >= '50' else '20' for season in categories.str[:2]])
+
+    df['Season'] = seasons
+    df['SeasonExtended'] = seasons.cat.rename_categories(centuries + categories.str[:2] + '/' + categories.str[2:])
+
+    return df
+
+
+# Compact dtypes: categorical labels and the smallest numeric type holding each stat column (G, ASS, A, 2A, VE, TotalPoints,
+# Position, Round, ...). Odds become float32, so they are rounded back to ODDS_DECIMALS before being shown
+def compact_frame(df):
+    for column in df.columns:
+        if column in CATEGORICAL_COLUMNS:
+            df[column] = df[column].astype('category')
+        elif pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast = 'integer')
+        elif pd.api.types.is_float_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast = 'float')
+
+    return df
+
+
+def read_csv_frame(root_path, csv_name):
+    return compact_frame(normalize_frame(pd.read_csv(join(root_path, csv_name), index_col = 0, low_memory = False)))
+
+
+def frame_name(csv_name):
+    return csv_name[:-len('.csv')]
+
+
+# Metadata index: for each league, its seasons (SeasonOrder, Season, SeasonExtended) and their first/last rounds
+def build_metadata(frames):
+    seasons = {}
+    rounds = {}
+
+    for df in frames.values():
+        if 'SeasonOrder' not in df.columns:
+            continue
+        df = df[df['SeasonOrder'].notna()]
+        leagues = df['Div'].astype(str) if 'Div' in df.columns else pd.Series(DEFAULT_LEAGUE, index = df.index)
+
+        for (league, season_order, season, extended), _ in df.groupby([leagues, df['SeasonOrder'].astype(int),
+                                                                       df['Season'].astype(str), df['SeasonExtended'].astype(str)]):
+            seasons.setdefault(league, {})[int(season_order)] = {'SeasonOrder': int(season_order),
+                                                                 'Season': season,
+                                                                 'SeasonExtended': extended}
+        if 'Round' in df.columns:
+            for (league, season_order), season_rounds in df['Round'].groupby([leagues, df['SeasonOrder'].astype(int)]):
+                key = (league, int(season_order))
+                first, last = int(season_rounds.min()), int(season_rounds.max())
+                if key in rounds:
+                    first, last = min(first, rounds[key][0]), max(last, rounds[key][1])
+                rounds[key] = (first, last)
+
+    metadata = {}
+    for league, league_seasons in seasons.items():
+        metadata[league] = []
+        for season_order in sorted(league_seasons):
+            first_round, last_round = rounds.get((league, season_order), (1, 1))
+            metadata[league].append(dict(league_seasons[season_order], FirstRound = first_round, LastRound = last_round))
+
+    return metadata
+
+
+# Splitting a frame into its (league, SeasonOrder) partitions. Frames without SeasonOrder (e.g. df_cards) get it from the metadata
+def split_frame(df, metadata):
+    leagues = df['Div'].astype(str) if 'Div' in df.columns else pd.Series(DEFAULT_LEAGUE, index = df.index)
+
+    if 'SeasonOrder' in df.columns:
+        season_orders = df['SeasonOrder']
+    else:
+        season_orders = pd.Series(float('nan'), index = df.index)
+        for league, league_seasons in metadata.items():
+            order_by_season = {season['Season']: season['SeasonOrder'] for season in league_seasons}
+            in_league = leagues == league
+            season_orders[in_league] = df.loc[in_league, 'Season'].astype(str).map(order_by_season).astype(float)
+
+    partitions = {}
+    for league, league_seasons in metadata.items():
+        in_league = df[leagues == league]
+        groups = {int(key): group for key, group in in_league.groupby(season_orders[leagues == league], observed = True)}
+        for season in league_seasons:
+            partitions[(league, season['SeasonOrder'])] = groups.get(season['SeasonOrder'], df.iloc[0:0])
+
+    return partitions
+
+
+# Content hashes of each (league, season) partition (FrameVersions, one per frame, see data_access.frame_version), so a reload
+# can tell which seasons actually changed. A season's Version combines the hashes of the frames the dashboard loads
+def add_frame_versions(metadata, partitions):
+    # partitions: {frame name: {(league, SeasonOrder): dataframe}}
+    for league, league_seasons in metadata.items():
+        for season in league_seasons:
+            season['FrameVersions'] = {name: frame_version(frame_partitions[(league, season['SeasonOrder'])])
+                                       for name, frame_partitions in partitions.items()}
+
+
+def season_version(season, names):
+    frame_versions = season.get('FrameVersions', {})
+    if not all(name in frame_versions for name in names):
+        return None
+    return hashlib.sha1(json.dumps([[name, frame_versions[name]] for name in sorted(names)]).encode('utf-8')).hexdigest()[:12]
+
+
+def partition_path(store_folder, league, season_order, name):
+    return join(store_folder, league, '{:02d}'.format(season_order), name + '.feather')
+
+
+def build_store(root_path, csv_names):
+    if feather is None:
+        raise ImportError("pyarrow is required to build the columnar data store")
+
+    frames = {frame_name(csv_name): read_csv_frame(root_path, csv_name) for csv_name in csv_names}
+    metadata = build_metadata(frames)
+    partitions = {name: split_frame(df, metadata) for name, df in frames.items()}
+    add_frame_versions(metadata, partitions)
+
+    # Building the whole store aside and swapping it in at the end, so running dashboards never map a half-written store
+    store_folder = store_path(root_path)
+    build_folder = store_folder + '.tmp'
+    shutil.rmtree(build_folder, ignore_errors = True)
+
+    for name, frame_partitions in partitions.items():
+        for (league, season_order), partition_df in frame_partitions.items():
+            path = partition_path(build_folder, league, season_order, name)
+            os.makedirs(os.path.dirname(path), exist_ok = True)
+            feather.write_feather(partition_df.reset_index(drop = True), path, compression = 'uncompressed')
+
+    with open(join(build_folder, INDEX_FILE), 'w') as index_file:
+        json.dump({'frames': list(frames), 'leagues': metadata}, index_file, indent = 1)
+
+    if exists(store_folder):
+        os.replace(store_folder, store_folder + '.old')
+    os.replace(build_folder, store_folder)
+    shutil.rmtree(store_folder + '.old', ignore_errors = True)
+
+
+def store_path(root_path):
+    # The store folder, beside the data folder (DASH/store for DASH/assets)
+    return join(dirname(abspath(root_path)), STORE_FOLDER)
+
+
+def store_is_fresh(root_path, csv_names):
+    path = join(store_path(root_path), INDEX_FILE)
+    if not exists(path):
+        return False
+
+    with open(path) as index_file:
+        stored_frames = json.load(index_file)['frames']
+
+    return all(frame_name(csv_name) in stored_frames and getmtime(path) >= getmtime(join(root_path, csv_name))
+               for csv_name in csv_names)
+
+
+def read_store_partition(root_path, names, league, season_order):
+    frames = {}
+    for name in names:
+        table = feather.read_table(partition_path(store_path(root_path), league, season_order, name), memory_map = True)
+        frames[name] = table.to_pandas(split_blocks = True)
+
+    return frames
+
+
+# Data files signature (size and mtime of the CSVs and of the store index), polled by the hot reload watcher
+def files_signature(root_path, csv_names):
+    signature = []
+    for path in [join(root_path, csv_name) for csv_name in csv_names] + [join(store_path(root_path), INDEX_FILE)]:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+
+    return tuple(signature)
+
+
+# Loader: a lazily loaded Dataset over the store when it is available and up to date with the CSVs. Otherwise (CSV fallback)
+# every frame is parsed at once and the partitions are sliced from memory
+def open_dataset(root_path, csv_names, first_season_order = 1, max_partitions = 32, derive = None):
+    names = [frame_name(csv_name) for csv_name in csv_names]
+
+    if feather is not None and store_is_fresh(root_path, csv_names):
+        with open(join(store_path(root_path), INDEX_FILE)) as index_file:
+            metadata = json.load(index_file)['leagues']
+
+        def load_partition(league, season_order):
+            return read_store_partition(root_path, names, league, season_order)
+    else:
+        frames = {name: read_csv_frame(root_path, csv_name) for name, csv_name in zip(names, csv_names)}
+        metadata = build_metadata(frames)
+        partitions = {name: split_frame(df, metadata) for name, df in frames.items()}
+        add_frame_versions(metadata, partitions)
+
+        def load_partition(league, season_order):
+            return {name: partitions[name][(league, season_order)] for name in names}
+
+    metadata = {league: [season for season in seasons if season['SeasonOrder'] >= first_season_order]
+                for league, seasons in metadata.items()}
+    for league_seasons in metadata.values():
+        for season in league_seasons:
+            season['Version'] = season_version(season, names)
+
+    return Dataset(metadata, load_partition, max_partitions = max_partitions, derive = derive)
+
+
+# Runtime updates (e.g. results ingested by the standings engine): the new rows of a partition frame are normalized and compacted
+# on their own and appended to it, with the union of both categories so the appended frame keeps its compact dtypes
+def append_rows(df, rows):
+    rows = pd.DataFrame(rows, columns = df.columns)
+    for column in df.columns:
+        if pd.api.types.is_numeric_dtype(df[column]):
+            rows[column] = pd.to_numeric(rows[column])
+    rows = compact_frame(normalize_frame(rows))
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            categories = df[column].cat.categories.union(rows[column].cat.categories)
+            df = df.assign(**{column: df[column].cat.set_categories(categories)})
+            rows[column] = rows[column].cat.set_categories(categories)
+
+    return pd.concat([df, rows], ignore_index = True)
+
+
+def write_store_partition(root_path, csv_names, league, season_order, frames):
+    # Rewrites the given frames of one (league, season) partition and its entry in the metadata index. Each file is written aside
+    # and swapped in, the index last: the hot reload watcher of every worker then picks up the season. Returns the season's new
+    # Version, as open_dataset computes it over csv_names
+    if feather is None:
+        raise ImportError("pyarrow is required to write the columnar data store")
+
+    store_folder = store_path(root_path)
+    with open(join(store_folder, INDEX_FILE)) as index_file:
+        index = json.load(index_file)
+    season = next(season for season in index['leagues'][league] if season['SeasonOrder'] == season_order)
+
+    for name, df in frames.items():
+        df = df.reset_index(drop = True)
+        path = partition_path(store_folder, league, season_order, name)
+        feather.write_feather(df, path + '.tmp', compression = 'uncompressed')
+        os.replace(path + '.tmp', path)
+        season['FrameVersions'][name] = frame_version(df)
+
+    if 'df_bcr' in frames and len(frames['df_bcr']):
+        season['FirstRound'] = int(frames['df_bcr']['Round'].min())
+        season['LastRound'] = int(frames['df_bcr']['Round'].max())
+
+    with open(join(store_folder, INDEX_FILE + '.tmp'), 'w') as index_file:
+        json.dump(index, index_file, indent = 1)
+    os.replace(join(store_folder, INDEX_FILE + '.tmp'), join(store_folder, INDEX_FILE))
+
+    return season_version(season, [frame_name(csv_name) for csv_name in csv_names])
+
+
+
+if __name__ == '__main__':
+    # Usage (from the DASH folder): python data_store.py [csv files...]
+    root_path = 'assets'
+    csv_names = sys.argv[1:] or sorted(basename(path) for path in glob(join(root_path, 'df_*.csv')))
+
+    build_store(root_path, csv_names)
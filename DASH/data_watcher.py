@@ -0,0 +1,51 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+
+# Hot reload of the data files: a daemon thread polls a cheap signature of the files (sizes and mtimes) and calls on_change
+# once a new signature has been stable for two consecutive polls, so files still being written are never loaded.
+# on_change builds the new data version aside and swaps it in, the server keeps answering with the previous one meanwhile.
+
+class DataWatcher:
+
+    def __init__(self, signature, on_change, interval = 10, current = None):
+        self.signature = signature              # function() returning a hashable signature of the data files
+        self.on_change = on_change              # function() loading and swapping in the new data
+        self.interval = interval
+        self.current = signature() if current is None else current     # signature of the loaded data (default: the files now)
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target = self._run, name = 'DataWatcher', daemon = True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self):
+        # One poll: returns True when on_change was called
+        signature = self.signature()
+        if signature == self.current:
+            self._pending = None
+            return False
+
+        if signature != self._pending:
+            self._pending = signature
+            return False
+
+        self.on_change()
+        self.current, self._pending = signature, None
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                # Keeping the current data (and the watcher) when a reload fails, e.g. on a malformed file
+                logger.exception("Data reload failed")
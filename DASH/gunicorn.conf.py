@@ -0,0 +1,43 @@
+import gc
+import multiprocessing
+import os
+
+
+
+# Production serving: app.server under gunicorn's pre-fork server, from the DASH folder:
+#     gunicorn -c gunicorn.conf.py DashApp:server
+# The app is imported once in the master (preload_app): the data index, the loaded partitions and the prewarmed callback
+# caches are then shared by every worker as copy-on-write pages, and recycled workers start warm as well.
+#
+#   LIGANOS_BIND           address to listen on (default 0.0.0.0:8050)
+#   LIGANOS_WORKERS        worker processes (default: one per core)
+#   LIGANOS_THREADS        threads per worker (default 4)
+#   LIGANOS_MAX_REQUESTS   requests after which a worker is gracefully replaced (default 5000, with 10% jitter; 0 disables it)
+#   LIGANOS_CACHE_PREWARM  defaults to 1 here: every season and round output is computed before forking
+
+os.environ['LIGANOS_PREFORK'] = '1'
+os.environ.setdefault('LIGANOS_CACHE_PREWARM', '1')
+
+bind = os.environ.get('LIGANOS_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('LIGANOS_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('LIGANOS_THREADS', 4))
+worker_class = 'gthread'
+preload_app = True
+
+# Graceful recycling: a worker is replaced after max_requests (spread by the jitter, so they do not all restart at once)
+# and in-flight requests get graceful_timeout seconds to finish
+max_requests = int(os.environ.get('LIGANOS_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+graceful_timeout = 30
+timeout = 60
+
+
+def when_ready(server):
+    # Once, in the master, after the app is preloaded and before the first worker is forked: the objects loaded so far are
+    # moved out of the garbage collector generations, so collections in the workers do not write to (and copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import DashApp
+    DashApp.start_data_watcher()
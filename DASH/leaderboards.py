@@ -0,0 +1,46 @@
+import pandas as pd
+
+
+
+# Season leaderboards, derived once per (league, season) partition when it is loaded (Dataset derive hook) instead of on
+# every request: the top-N scorers, assistants and most carded players, and the team records (best attack, best defence and
+# most undisciplined team). Each leaderboard is a small frame carrying the SeasonOrder column, so it is looked up as any frame.
+#
+#   leaderboard_scorers      top-N of df_scorers by goals (G)
+#   leaderboard_assists      top-N of df_assists by assists (ASS)
+#   leaderboard_discipline   top-N of df_player_cards by yellow cards (A), with TotalReds (VE + 2A)
+#   leaderboard_teams        one df_class row per team record, with the Record name
+#
+# Ties keep the source order (keep = 'first'), i.e. the order of the zerozero lists and of the final classification.
+
+LEADERBOARD_SIZE = 10
+
+PLAYER_LEADERBOARDS = {'leaderboard_scorers': ('df_scorers', 'G'),
+                       'leaderboard_assists': ('df_assists', 'ASS'),
+                       'leaderboard_discipline': ('df_player_cards', 'A')}
+
+# Record name: (method, df_class columns)
+TEAM_RECORDS = {'Best Attack': ('nlargest', ['GoalsScored']),
+                'Best Defence': ('nsmallest', ['GoalsConceded']),
+                'Most Undisciplined': ('nlargest', ['VE', '2A', 'A'])}
+
+
+def season_leaderboards(frames, n = LEADERBOARD_SIZE):
+    leaderboards = {}
+
+    for name, (frame, column) in PLAYER_LEADERBOARDS.items():
+        if frame in frames:
+            top = frames[frame].nlargest(n, column, keep = 'first').reset_index(drop = True)
+            leaderboards[name] = top.assign(Rank = range(1, len(top) + 1))
+
+    if 'leaderboard_discipline' in leaderboards:
+        discipline = leaderboards['leaderboard_discipline']
+        discipline['TotalReds'] = discipline['VE'] + discipline['2A']
+
+    if 'df_class' in frames:
+        df_class = frames['df_class']
+        leaderboards['leaderboard_teams'] = pd.concat([getattr(df_class, method)(1, columns, keep = 'first').assign(Record = record)
+                                                       for record, (method, columns) in TEAM_RECORDS.items()],
+                                                      ignore_index = True)
+
+    return leaderboards
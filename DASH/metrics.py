@@ -0,0 +1,158 @@
+import cProfile
+import itertools
+import logging
+import os
+import time
+from bisect import bisect_left
+from os.path import join
+from threading import Lock
+
+import flask
+
+from payloads import callback_name
+
+
+
+# Lightweight instrumentation of the dashboard callbacks: request latency histograms per callback, per-stage timers inside
+# the compute functions, exported in the Prometheus text format on /metrics. Requests slower than a threshold can
+# optionally be profiled with cProfile, one .prof file per slow request (open with python -m pstats or snakeviz).
+
+logger = logging.getLogger('DashApp.metrics')
+
+# Histogram upper bounds, in seconds: stages take well under a millisecond when the data is loaded, cold requests seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+
+    def __init__(self, buckets = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)      # per bucket (the last one is +Inf), cumulated when exported
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            cumulative += count
+            yield name + '_bucket', dict(labels, le = str(bound)), cumulative
+        yield name + '_sum', labels, self.sum
+        yield name + '_count', labels, self.count
+
+
+class Metrics:
+
+    def __init__(self):
+        self._histograms = {}       # name -> {labels (sorted tuple): Histogram}
+        self._buckets = {}          # name -> histogram upper bounds
+        self._help = {}
+        self._collectors = []
+        self._lock = Lock()
+
+    def histogram(self, name, help_text, buckets = LATENCY_BUCKETS):
+        self._help[name] = help_text
+        self._buckets[name] = buckets
+        self._histograms.setdefault(name, {})
+
+    def observe(self, name, labels, value):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histograms = self._histograms[name]
+            if key not in histograms:
+                histograms[key] = Histogram(self._buckets[name])
+            histograms[key].observe(value)
+
+    def collector(self, function):
+        # function() returning [(name, type, help, [(labels, value), ...]), ...], evaluated on every export
+        # (counters and gauges kept elsewhere, e.g. the outputs caches hits)
+        self._collectors.append(function)
+        return function
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, histograms in self._histograms.items():
+                lines += ['# HELP {} {}'.format(name, self._help[name]), '# TYPE {} histogram'.format(name)]
+                for key, histogram in histograms.items():
+                    lines += [sample_line(*sample) for sample in histogram.samples(name, dict(key))]
+
+        for function in self._collectors:
+            for name, metric_type, help_text, samples in function():
+                lines += ['# HELP {} {}'.format(name, help_text), '# TYPE {} {}'.format(name, metric_type)]
+                lines += [sample_line(name, labels, value) for labels, value in samples]
+
+        return '\n'.join(lines) + '\n'
+
+
+def sample_line(name, labels, value):
+    if not labels:
+        return '{} {}'.format(name, value)
+    label_string = ','.join('{}="{}"'.format(label, str(label_value).replace('\\', '\\\\').replace('"', '\\"'))
+                            for label, label_value in labels.items())
+    return '{}{{{}}} {}'.format(name, label_string, value)
+
+
+class StageTimer:
+
+    # Per-stage timers of a compute function: lap(stage) records the time since the previous lap (or since the start)
+    def __init__(self, metrics, function):
+        self.metrics = metrics
+        self.function = function
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.metrics.observe('liganos_stage_duration_seconds', {'function': self.function, 'stage': stage}, now - self._last)
+        self._last = now
+
+
+def instrument_callbacks(app, metrics, profile_threshold = 0, profile_folder = 'profiles'):
+    # Request latency of every _dash-update-component call, by callback. Must be called before enable_compression:
+    # after_request hooks run in reverse order of registration, so the measured time includes serialization and compression.
+    # profile_threshold: seconds above which a request profile is saved to profile_folder (0 disables profiling, which
+    # otherwise runs on every callback request, as the time is only known at the end)
+    endpoint = app.config.routes_pathname_prefix + '_dash-update-component'
+    profile_numbers = itertools.count(1)
+
+    metrics.histogram('liganos_callback_duration_seconds', 'Callback request latency, by callback')
+    metrics.histogram('liganos_stage_duration_seconds', 'Duration of each stage of the callbacks compute functions')
+
+    @app.server.before_request
+    def _start_timer():
+        if flask.request.path == endpoint:
+            flask.g.callback_started = time.perf_counter()
+            if profile_threshold:
+                flask.g.callback_profile = cProfile.Profile()
+                flask.g.callback_profile.enable()
+
+    @app.server.after_request
+    def _observe_duration(response):
+        if 'callback_started' not in flask.g:
+            return response
+
+        elapsed = time.perf_counter() - flask.g.callback_started
+        callback = callback_name(app, flask.request.get_json(silent = True) or {})
+        metrics.observe('liganos_callback_duration_seconds', {'callback': callback}, elapsed)
+
+        profile = flask.g.pop('callback_profile', None)
+        if profile is not None:
+            profile.disable()
+            if elapsed >= profile_threshold:
+                os.makedirs(profile_folder, exist_ok = True)
+                path = join(profile_folder, '{}-{}-{}-{:.0f}ms.prof'.format(callback, time.strftime('%Y%m%dT%H%M%S'),
+                                                                            next(profile_numbers), elapsed * 1e3))
+                profile.dump_stats(path)
+                logger.warning("Slow callback %s (%.0f ms), profile saved to %s", callback, elapsed * 1e3, path)
+
+        return response
+
+    @app.server.route('/metrics')
+    def _metrics():
+        return flask.Response(metrics.render(), content_type = CONTENT_TYPE)
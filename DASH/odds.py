@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+
+from data_access import frame_version, partition
+
+
+
+# Betting odds analytics over the whole match history (df_liganos.csv): the 1X2 odds of every bookmaker for every match are laid
+# out once as a (matches x bookmakers x outcomes) array, so implied probabilities, overround removal, favourites and flat-stake
+# returns are single NumPy passes over all the matches, aggregated per (league, season, bookmaker[, team or probability
+# bucket]) with np.bincount. The results are then partitioned once, so each dashboard view is a dictionary lookup.
+#
+#   bookmakers    per season and bookmaker: matches, average margin (overround), favourite win rate, Brier score and the ROI
+#                 of backing the favourite, the underdog, or every home win / draw / away win
+#   calibration   per season, bookmaker and CALIBRATION_BUCKETS bucket of fair probability: outcomes, mean fair probability and
+#                 observed frequency (and the same over every season of the league)
+#   teams         per season, bookmaker and team: matches, wins, expected wins (sum of fair probabilities) and the ROI of
+#                 backing the team in each of its matches
+#
+# Fair probabilities remove the overround proportionally (implied probability / sum of the three). ROI is the profit of flat
+# one-unit stakes over the stakes. A bookmaker only counts for the matches where it quoted all three outcomes.
+
+ODDS_CSV = 'df_liganos.csv'
+
+MATCH_COLUMNS = ['Div', 'SeasonOrder', 'HomeTeam', 'AwayTeam', 'Res']
+OUTCOMES = ['H', 'D', 'A']
+
+# 1X2 odds columns prefix (<prefix>H, <prefix>D and <prefix>A): bookmaker. Closing odds have prefixes of their own
+BOOKMAKERS = {'B365': 'Bet365',
+              'BW': 'Bet&Win',
+              'IW': 'Interwetten',
+              'P': 'Pinnacle',
+              'WH': 'William Hill',
+              'VC': 'VC Bet',
+              'LB': 'Ladbrokes',
+              'SJ': 'Stan James',
+              'GB': 'Gamebookers',
+              'BS': 'Blue Square',
+              'SB': 'Sportingbet',
+              'SY': 'Stanleybet',
+              'Max': 'Market Maximum',
+              'Avg': 'Market Average',
+              'BbMx': 'Betbrain Maximum',
+              'BbAv': 'Betbrain Average',
+              'B365C': 'Bet365 (closing)',
+              'BWC': 'Bet&Win (closing)',
+              'IWC': 'Interwetten (closing)',
+              'PSC': 'Pinnacle (closing)',
+              'WHC': 'William Hill (closing)',
+              'VCC': 'VC Bet (closing)',
+              'MaxC': 'Market Maximum (closing)',
+              'AvgC': 'Market Average (closing)'}
+
+CALIBRATION_BUCKETS = 10
+
+
+def read_matches(path):
+    # Only the match keys and the 1X2 odds, out of the ~150 columns
+    odds_columns = {prefix + outcome for prefix in BOOKMAKERS for outcome in OUTCOMES}
+    return pd.read_csv(path, usecols = lambda column: column in MATCH_COLUMNS or column in odds_columns, low_memory = False)
+
+
+class OddsAnalytics:
+
+    def __init__(self, matches):
+        matches = matches[matches['Res'].isin(OUTCOMES) & matches['SeasonOrder'].notna()].reset_index(drop = True)
+        self.version = frame_version(matches)
+        self.books = [prefix for prefix in BOOKMAKERS if all(prefix + outcome in matches.columns for outcome in OUTCOMES)]
+
+        season_codes, seasons = pd.MultiIndex.from_arrays([matches['Div'].astype(str),
+                                                           matches['SeasonOrder'].astype(int)]).factorize(sort = True)
+        team_codes, teams = pd.factorize(pd.concat([matches['HomeTeam'], matches['AwayTeam']], ignore_index = True))
+        n_matches, n_seasons, n_books, n_teams = len(matches), len(seasons), len(self.books), len(teams)
+
+        # I. Per match and bookmaker ---------------------------------------------------------------------------------------------
+
+        odds = matches[[prefix + outcome for prefix in self.books for outcome in OUTCOMES]].to_numpy(dtype = 'float64') \
+                                                                                         .reshape(n_matches, n_books, 3)
+        valid = (odds > 1).all(axis = 2)                                    # (matches, bookmakers), False on missing odds
+        odds = np.where(valid[:, :, None], odds, np.nan)
+
+        implied = 1 / odds
+        booksum = implied.sum(axis = 2)
+        fair = implied / booksum[:, :, None]
+
+        result = pd.Categorical(matches['Res'], categories = OUTCOMES).codes
+        won = np.arange(3) == result[:, None, None]                          # (matches, 1, outcomes)
+        profit = np.where(won, odds - 1, -1.0)
+
+        # Favourite and underdog: the shortest and longest odds (ties go to the home win, then the draw)
+        favourite = np.argmax(np.where(valid[:, :, None], fair, -1.0), axis = 2)
+        underdog = np.argmin(np.where(valid[:, :, None], fair, 2.0), axis = 2)
+        favourite_won = favourite == result[:, None]
+        favourite_profit = np.take_along_axis(profit, favourite[:, :, None], axis = 2)[:, :, 0]
+        underdog_profit = np.take_along_axis(profit, underdog[:, :, None], axis = 2)[:, :, 0]
+        brier = ((fair - won) ** 2).sum(axis = 2)
+
+        # II. Per season and bookmaker -------------------------------------------------------------------------------------------
+
+        season_books = season_codes[:, None] * n_books + np.arange(n_books)
+        keys = season_books[valid]
+
+        def sums(values):
+            return np.bincount(keys, weights = values[valid], minlength = n_seasons * n_books)
+
+        count = np.bincount(keys, minlength = n_seasons * n_books)
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            bookmakers = pd.DataFrame({'Matches': count,
+                                       'Margin': sums(booksum - 1) / count,
+                                       'FavouriteWins': sums(favourite_won) / count,
+                                       'FavouriteROI': sums(favourite_profit) / count,
+                                       'UnderdogROI': sums(underdog_profit) / count,
+                                       'HomeROI': sums(profit[:, :, 0]) / count,
+                                       'DrawROI': sums(profit[:, :, 1]) / count,
+                                       'AwayROI': sums(profit[:, :, 2]) / count,
+                                       'Brier': sums(brier) / count})
+        bookmakers = self.labelled(bookmakers, seasons, [n_seasons, n_books])
+
+        # III. Calibration: per season, bookmaker and fair probability bucket (the three outcomes of every match) ---------------
+
+        buckets = np.minimum((np.nan_to_num(fair) * CALIBRATION_BUCKETS).astype(int), CALIBRATION_BUCKETS - 1)
+        keys = ((season_books[:, :, None] * CALIBRATION_BUCKETS + buckets)[valid]).ravel()
+        size = n_seasons * n_books * CALIBRATION_BUCKETS
+
+        calibration = pd.DataFrame({'Outcomes': np.bincount(keys, minlength = size),
+                                    'PredictedSum': np.bincount(keys, weights = fair[valid].ravel(), minlength = size),
+                                    'ObservedSum': np.bincount(keys, weights = np.broadcast_to(won, fair.shape)[valid].ravel(),
+                                                               minlength = size)})
+        calibration = self.labelled(calibration, seasons, [n_seasons, n_books, CALIBRATION_BUCKETS],
+                                   ('Bucket', np.arange(CALIBRATION_BUCKETS)))
+        league_calibration = calibration.groupby(['League', 'Bookmaker', 'Bucket'], sort = False, as_index = False) \
+                                        [['Outcomes', 'PredictedSum', 'ObservedSum']].sum()
+
+        # IV. Per season, bookmaker and team (each match counted once for the home and once for the away team) -----------------
+
+        side_valid = np.concatenate([valid, valid])
+        side_won = np.concatenate([result == 0, result == 2])[:, None]
+        keys = ((np.concatenate([season_books, season_books]) * n_teams + team_codes[:, None])[side_valid])
+        size = n_seasons * n_books * n_teams
+
+        def side_sums(values):
+            return np.bincount(keys, weights = np.broadcast_to(values, side_valid.shape)[side_valid], minlength = size)
+
+        team_matches = np.bincount(keys, minlength = size)
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            team_stats = pd.DataFrame({'Matches': team_matches,
+                                       'Wins': side_sums(side_won),
+                                       'ExpectedWins': side_sums(np.concatenate([fair[:, :, 0], fair[:, :, 2]])),
+                                       'ROI': side_sums(np.concatenate([profit[:, :, 0], profit[:, :, 2]])) / team_matches})
+        team_stats = self.labelled(team_stats, seasons, [n_seasons, n_books, n_teams], ('Team', teams))
+        team_stats['Wins'] = team_stats['Wins'].astype(int)
+
+        # V. Partitions: one lookup per view ------------------------------------------------------------------------------------
+
+        self._partitions = {'bookmakers': partition(bookmakers, ['League', 'SeasonOrder']),
+                            'history': partition(bookmakers, ['League', 'Bookmaker']),
+                            'calibration': partition(with_frequencies(calibration), ['League', 'SeasonOrder', 'Bookmaker']),
+                            'league_calibration': partition(with_frequencies(league_calibration), ['League', 'Bookmaker']),
+                            'teams': partition(team_stats, ['League', 'SeasonOrder', 'Bookmaker'])}
+        self._empty = {'bookmakers': bookmakers.iloc[0:0], 'history': bookmakers.iloc[0:0],
+                       'calibration': with_frequencies(calibration.iloc[0:0]),
+                       'league_calibration': with_frequencies(league_calibration.iloc[0:0]),
+                       'teams': team_stats.iloc[0:0]}
+
+    def labelled(self, df, seasons, shape, level = None):
+        # Labels of the flat (season, bookmaker[, level]) bincount positions, keeping the ones with matches (the first column).
+        # level: (column name, labels) of a third level, e.g. the probability buckets or the teams
+        index = np.unravel_index(np.arange(len(df)), shape)
+        labels = pd.DataFrame({'League': seasons.get_level_values(0)[index[0]],
+                               'SeasonOrder': seasons.get_level_values(1)[index[0]],
+                               'Bookmaker': np.array(self.books)[index[1]]})
+        if level is not None:
+            labels[level[0]] = np.asarray(level[1])[index[2]]
+
+        df = pd.concat([labels, df], axis = 1)
+        df = df[df[df.columns[len(labels.columns)]] > 0].reset_index(drop = True)
+        df.insert(3, 'Name', df['Bookmaker'].map(BOOKMAKERS))
+        return df
+
+    def lookup(self, name, *key):
+        return self._partitions[name].get(key, self._empty[name])
+
+    def season_bookmakers(self, league, season_order):
+        return self.lookup('bookmakers', league, season_order)
+
+    def season_calibration(self, league, season_order, bookmaker):
+        return self.lookup('calibration', league, season_order, bookmaker)
+
+    def season_teams(self, league, season_order, bookmaker):
+        return self.lookup('teams', league, season_order, bookmaker)
+
+    def bookmaker_history(self, league, bookmaker):
+        return self.lookup('history', league, bookmaker)
+
+    def league_calibration(self, league, bookmaker):
+        return self.lookup('league_calibration', league, bookmaker)
+
+
+def with_frequencies(df):
+    return df.assign(Predicted = df['PredictedSum'] / df['Outcomes'], Observed = df['ObservedSum'] / df['Outcomes'])
@@ -0,0 +1,100 @@
+import json
+import logging
+from collections import defaultdict
+from threading import Lock
+
+import flask
+from flask_compress import Compress
+
+
+
+# Callback response payloads: compression of the responses (brotli when the browser accepts it, gzip otherwise) and
+# per-output byte counters, logged on every callback invocation so the outputs dominating the bandwidth stand out. Sizing the
+# outputs takes a JSON parse of the response and a dump per output: with sample_every > 1, only one response in every
+# sample_every is sized and logged (the output counters are then estimates, the sampled sizes scaled by sample_every).
+# With a Metrics instance, the response size of every invocation and the sampled output sizes are also exported as
+# histograms on /metrics.
+
+logger = logging.getLogger('DashApp.payloads')
+
+COMPRESS_MIN_SIZE = 500     # bytes: smaller responses (e.g. a slider title) are not worth the compression
+COMPRESS_BR_LEVEL = 4       # brotli quality 11 (the library default) costs tens of ms on a season response
+COMPRESS_LEVEL = 6
+
+LOGGED_OUTPUTS = 5          # largest outputs listed in each callback log line (all of them are counted)
+
+# Histogram upper bounds, in bytes (uncompressed): a slider title takes a few bytes, a season's tables and charts kilobytes
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def enable_compression(app, algorithms):
+    # Dash sets flask-compress up with gzip only, so the app is created with compress = False and compressed here instead.
+    # algorithms: in order of preference, e.g. ['br', 'gzip'] (an empty list leaves the responses uncompressed)
+    if not algorithms:
+        return None
+
+    app.server.config.update(COMPRESS_ALGORITHM = algorithms,
+                             COMPRESS_BR_LEVEL = COMPRESS_BR_LEVEL,
+                             COMPRESS_LEVEL = COMPRESS_LEVEL,
+                             COMPRESS_MIN_SIZE = COMPRESS_MIN_SIZE)
+    return Compress(app.server)
+
+
+class PayloadStats:
+
+    def __init__(self, sample_every = 1, metrics = None):
+        # sample_every: one callback response in every sample_every is sized per output (1: every one, 0: none, only the
+        # invocations and response sizes are counted). metrics: a metrics.Metrics the sizes are exported to
+        self.sample_every = sample_every
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.histogram('liganos_response_size_bytes', 'Callback response size before compression, by callback', SIZE_BUCKETS)
+            metrics.histogram('liganos_output_size_bytes', 'Callback output size before compression (sampled responses)', SIZE_BUCKETS)
+        self.calls = defaultdict(int)       # callback name -> invocations
+        self.bytes = defaultdict(int)       # output ('component.property') -> bytes sent, uncompressed (estimated)
+        self._responses = 0
+        self._lock = Lock()
+
+    def attach(self, app):
+        # Must be called after enable_compression: after_request hooks run in reverse order of registration,
+        # so this one sees the response body before it is compressed
+        endpoint = app.config.routes_pathname_prefix + '_dash-update-component'
+
+        @app.server.after_request
+        def _count_payload(response):
+            if flask.request.path == endpoint and response.status_code == 200 and not response.is_streamed:
+                self.record(callback_name(app, flask.request.get_json(silent = True) or {}), response)
+            return response
+
+    def record(self, callback, response):
+        body = response.get_data()
+        with self._lock:
+            self.calls[callback] += 1
+            self._responses += 1
+            sampled = self.sample_every > 0 and self._responses % self.sample_every == 0
+        if self.metrics is not None:
+            self.metrics.observe('liganos_response_size_bytes', {'callback': callback}, len(body))
+        if not sampled:
+            return
+
+        outputs = {component + '.' + prop: len(json.dumps(value))
+                   for component, props in json.loads(body).get('response', {}).items() for prop, value in props.items()}
+
+        with self._lock:
+            for output, size in outputs.items():
+                self.bytes[output] += size * self.sample_every
+        if self.metrics is not None:
+            for output, size in outputs.items():
+                self.metrics.observe('liganos_output_size_bytes', {'output': output}, size)
+
+        largest = sorted(outputs.items(), key = lambda item: -item[1])[:LOGGED_OUTPUTS]
+        logger.info("%s: %d bytes (%s)", callback, len(body), ', '.join('{} {}'.format(output, size) for output, size in largest))
+
+    def report(self):
+        with self._lock:
+            return {'calls': dict(self.calls), 'bytes': dict(self.bytes)}
+
+
+def callback_name(app, request_body):
+    callback = app.callback_map.get(request_body.get('output'), {}).get('callback')
+    return getattr(callback, '__name__', request_body.get('output', '?'))
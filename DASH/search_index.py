@@ -0,0 +1,210 @@
+import hashlib
+import json
+import re
+import sys
+import time
+import unicodedata
+from bisect import bisect_left
+
+import pandas as pd
+
+
+
+# Cross-season search over players and teams: an in-memory inverted index of name tokens, built over the player and team rows
+# of every season (derived once from their frames, which are not kept), next to each name's precomputed profile. A reload or
+# an ingestion only derives the rows of the seasons it changed, and the index is rebuilt from the kept rows of the others.
+#
+#   keys        names are normalized to accent and case-insensitive keys ('V. Guimarães' -> 'v guimaraes'), split in tokens
+#   tokens      one sorted array of (token, name) entries: a query token matches the slice of tokens it prefixes (two bisects),
+#               and a multi-word query the names matching every one of its tokens (e.g. 'v gui' -> V. Guimarães)
+#   profiles    per name, the career totals and the season-by-season rows, assembled here so a lookup is a dictionary get
+#
+# Player profiles come from the season top lists (df_scorers, df_assists, df_player_cards): a season where a player made none of
+# them is not part of their history. Players are told apart by name only, as in the source lists.
+
+SEARCH_FRAMES = ['df_class', 'df_scorers', 'df_assists', 'df_player_cards']
+SEARCH_RESULTS = 10
+
+KINDS = ['Team', 'Player']
+
+# Player stats: frame -> {column: stat}. Games (J) is the highest count of the lists the player made in the season
+PLAYER_STATS = {'df_scorers': {'J': 'Games', 'G': 'Goals', 'PEN': 'Penalties'},
+                'df_assists': {'J': 'Games', 'ASS': 'Assists'},
+                'df_player_cards': {'J': 'Games', 'A': 'Yellow', '2A': 'SecondYellow', 'VE': 'Red'}}
+PLAYER_TOTALS = ['Games', 'Goals', 'Penalties', 'Assists', 'Yellow', 'SecondYellow', 'Red']
+
+TEAM_STATS = ['Position', 'Games', 'Won', 'Drawn', 'Lost', 'Points', 'GoalsScored', 'GoalsConceded']
+TEAM_TOTALS = ['Games', 'Won', 'Drawn', 'Lost', 'Points', 'GoalsScored', 'GoalsConceded']
+
+
+def normalize(text):
+    # Accents dropped (NFKD splits them off the letters), case folded and punctuation turned into spaces
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(character for character in text if not unicodedata.combining(character)).casefold()
+    return ' '.join(re.sub(r'[^\w]+', ' ', text).split())
+
+
+def stacked(season_frames, name, columns):
+    # One frame over every season (with its League), the labels as plain strings
+    parts = [frames[name][columns].assign(League = league) for (league, _), frames in season_frames.items()
+             if name in frames and len(frames[name])]
+    if not parts:
+        return pd.DataFrame(columns = columns + ['League'])
+
+    df = pd.concat(parts, ignore_index = True)
+    return df.astype({column: str for column in ['Player', 'Team', 'SeasonExtended'] if column in columns})
+
+
+def season_rows(season_frames):
+    # season_frames: {(league, season_order): {frame name: dataframe}}. Returns the player and team season rows of all of them
+    keys = ['League', 'SeasonOrder', 'SeasonExtended', 'Player', 'Team']
+    df_players = pd.concat([stacked(season_frames, name, keys[1:] + list(columns)).rename(columns = columns)
+                            for name, columns in PLAYER_STATS.items()], ignore_index = True)
+    df_players = df_players.groupby(keys, sort = False, as_index = False).max(min_count = 1) \
+                           .reindex(columns = keys + PLAYER_TOTALS) \
+                           .astype(dict({column: 'Int64' for column in PLAYER_TOTALS}, SeasonOrder = int))
+
+    # Positions: the order of each season's final classification
+    df_teams = stacked(season_frames, 'df_class', ['SeasonOrder', 'SeasonExtended', 'Team'] + TEAM_STATS[1:])
+    df_teams.insert(3, 'Position', df_teams.groupby(['League', 'SeasonOrder'], sort = False).cumcount() + 1)
+
+    return df_players, df_teams[keys[:3] + ['Team'] + TEAM_STATS].astype({'SeasonOrder': int})
+
+
+def records(df):
+    # JSON-ready rows: missing stats (e.g. assists before 2004/05) become None
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def build_profiles(kind, df, totals, career):
+    # One profile per name of df (season rows, ordered by season): career totals (None when every season misses the stat) and
+    # career fields ({field: (column, aggregation)}), and the season rows. Aggregated at once over every name
+    grouped = df.groupby(kind, sort = False)
+    df_career = pd.concat([grouped[totals].sum(min_count = 1), grouped.agg(**career)], axis = 1)
+
+    seasons = {}
+    for row in records(df):
+        seasons.setdefault(row.pop(kind), []).append(row)
+
+    return {(kind, name): {'Kind': kind, 'Name': name, 'Career': row, 'Seasons': seasons[name]}
+            for name, row in zip(df_career.index, records(df_career.astype({column: 'Int64' for column in totals})))}
+
+
+def rows_by_season(season_frames):
+    # {(league, season_order): (player rows, team rows)} of the given seasons, derived at once over all of them
+    df_players, df_teams = season_rows(season_frames)
+    players = dict(iter(df_players.groupby(['League', 'SeasonOrder'], sort = False)))
+    teams = dict(iter(df_teams.groupby(['League', 'SeasonOrder'], sort = False)))
+    return {key: (players.get(key, df_players.iloc[0:0]), teams.get(key, df_teams.iloc[0:0])) for key in season_frames}
+
+
+class SearchIndex:
+
+    def __init__(self, rows, versions = None):
+        # rows: {(league, season_order): (player rows, team rows)} (see rows_by_season);
+        # versions: {(league, season_order): content hash} of the same seasons, making up the index version
+        self.season_rows = dict(rows)
+        self.versions = dict(versions or {})
+        self.version = hashlib.sha1(json.dumps(sorted([list(key) + [self.versions.get(key)] for key in self.season_rows]))
+                                    .encode('utf-8')).hexdigest()[:12]
+
+        # Every season's rows, ordered by season
+        ordered = [self.season_rows[key] for key in sorted(self.season_rows)]
+        df_players = pd.concat([players for players, _ in ordered], ignore_index = True)
+        df_teams = pd.concat([teams for _, teams in ordered], ignore_index = True)
+
+        # I. Profiles --------------------------------------------------------------------------------------------------------------
+
+        # Top scorer of each team-season (the first of the team in the season's scorers list, ordered by goals)
+        top_scorers = df_players[df_players['Goals'].notna()].sort_values('Goals', ascending = False, kind = 'stable') \
+                                                             .drop_duplicates(['League', 'SeasonOrder', 'Team'])
+        df_teams = df_teams.merge(top_scorers[['League', 'SeasonOrder', 'Team', 'Player', 'Goals']]
+                                  .rename(columns = {'Player': 'TopScorer', 'Goals': 'TopScorerGoals'}),
+                                  on = ['League', 'SeasonOrder', 'Team'], how = 'left')
+        df_teams['TopScorerGoals'] = df_teams['TopScorerGoals'].astype('Int64')
+
+        self.profiles = build_profiles('Team', df_teams, TEAM_TOTALS,
+                                       {'Seasons': ('SeasonOrder', 'size'),
+                                        'First': ('SeasonExtended', 'first'),
+                                        'Last': ('SeasonExtended', 'last'),
+                                        'Titles': ('Position', lambda positions: int((positions == 1).sum())),
+                                        'BestPosition': ('Position', 'min')})
+        self.profiles.update(build_profiles('Player', df_players, PLAYER_TOTALS,
+                                            {'Seasons': ('SeasonOrder', 'nunique'),
+                                             'First': ('SeasonExtended', 'first'),
+                                             'Last': ('SeasonExtended', 'last'),
+                                             'Teams': ('Team', lambda teams: list(dict.fromkeys(teams)))}))
+
+        # II. Inverted index: every token of every name, sorted once -------------------------------------------------------------
+
+        self.entries = sorted(self.profiles, key = lambda entry: (-self.profiles[entry]['Career']['Seasons'], entry[1]))
+        self.keys = [normalize(name) for _, name in self.entries]
+
+        postings = sorted((token, position) for position, key in enumerate(self.keys) for token in set(key.split()))
+        self._tokens = [token for token, _ in postings]
+        self._positions = [position for _, position in postings]
+
+    @classmethod
+    def from_frames(cls, season_frames, versions = None):
+        # season_frames: {(league, season_order): {frame name: dataframe}} (the SEARCH_FRAMES of each season)
+        return cls(rows_by_season(season_frames), versions)
+
+    def updated(self, season_frames, versions = None, removed = ()):
+        # A new index with the given seasons replaced (or added) and the removed ones left out: only the given seasons' rows
+        # are derived, the other seasons' rows are reused
+        if not season_frames and not removed:
+            return self
+
+        kept_rows = {key: rows for key, rows in self.season_rows.items() if key not in removed}
+        kept_versions = {key: version for key, version in self.versions.items() if key not in removed}
+        kept_rows.update(rows_by_season(season_frames))
+        kept_versions.update(versions or {})
+        return SearchIndex(kept_rows, kept_versions)
+
+    def matching(self, token):
+        # Positions of the names with a token starting with the given one: the tokens slice [token, token + highest character)
+        start = bisect_left(self._tokens, token)
+        end = bisect_left(self._tokens, token + '\U0010ffff', start)
+        return set(self._positions[start:end])
+
+    def search(self, query, kinds = KINDS, n = SEARCH_RESULTS):
+        # Names matching every token of the query, those starting with the whole query first, then by seasons played
+        query = normalize(query)
+        if not query:
+            return []
+
+        tokens = query.split()
+        positions = self.matching(tokens[0])
+        for token in tokens[1:]:
+            positions &= self.matching(token)
+
+        ranked = sorted(positions, key = lambda position: (not self.keys[position].startswith(query), position))
+        return [{'Kind': self.entries[position][0], 'Name': self.entries[position][1],
+                 'Seasons': self.profiles[self.entries[position]]['Career']['Seasons']}
+                for position in ranked if self.entries[position][0] in kinds][:n]
+
+    def profile(self, kind, name):
+        return self.profiles.get((kind, name))
+
+
+def dataset_search_index(data):
+    # Index over every season of a Dataset (their partitions are read without being kept loaded, one at a time)
+    keys = data.keys()
+    rows = {}
+    for key in keys:
+        rows.update(rows_by_season({key: data.partition_frames(*key)}))
+    return SearchIndex(rows, {key: data.cache_version(*key) for key in keys})
+
+
+
+if __name__ == '__main__':
+    # Usage (from the DASH folder): python search_index.py <query>
+    from data_store import open_dataset
+
+    started = time.perf_counter()
+    index = dataset_search_index(open_dataset('assets', [name + '.csv' for name in SEARCH_FRAMES]))
+    print("Indexed {} names in {:.0f} ms".format(len(index.profiles), (time.perf_counter() - started) * 1000))
+
+    for result in index.search(' '.join(sys.argv[1:])):
+        career = index.profile(result['Kind'], result['Name'])['Career']
+        print("{:<8}{:<32}{:>3} seasons  {} - {}".format(result['Kind'], result['Name'], career['Seasons'], career['First'], career['Last']))
@@ -0,0 +1,286 @@
+import re
+import sys
+import time
+from bisect import insort
+from os.path import join
+
+import numpy as np
+import pandas as pd
+
+
+
+# Incremental standings engine: match results (rows shaped like df_liganos) are ingested one at a time or in batches, and the
+# cumulative points, positions and card counts are updated in place instead of rebuilding the whole season.
+# One engine holds one season. Cumulative standings are kept per round, so adding the latest round only computes that
+# round's snapshot from the previous one (O(teams) plus sorting its teams); a late result for an earlier round
+# (a postponed match) recomputes the snapshots from that round onwards.
+#
+# history_frames builds the same frames for the whole history at once (the ETL export): every season is reshaped to
+# team-wise rows together and the cumulative points, positions and final tables come from grouped operations, instead of
+# filtering df_liganos again for every season and frame.
+
+# Tiebreaker Criteria: 1. Points, 2. Goals Difference, 3. GoalsScored
+GAMES, WON, DRAWN, LOST, POINTS, GOALS_SCORED, GOALS_CONCEDED = range(7)
+
+# df_games 'Match' strings, e.g. "Famalicão 1 - 5 SL Benfica"
+MATCH_PATTERN = re.compile(r'^(?P<HomeTeam>.+) (?P<HG>\d+) - (?P<AG>\d+) (?P<AwayTeam>.+)$')
+
+
+def team_result(goals_scored, goals_conceded):
+    if goals_scored > goals_conceded:
+        return (1, 1, 0, 0, 3, goals_scored, goals_conceded)
+    if goals_scored == goals_conceded:
+        return (1, 0, 1, 0, 1, goals_scored, goals_conceded)
+    return (1, 0, 0, 1, 0, goals_scored, goals_conceded)
+
+
+def add_records(record, other):
+    return tuple(a + b for a, b in zip(record, other))
+
+
+def rank(snapshot):
+    return sorted(snapshot, key = lambda team: (-snapshot[team][POINTS],
+                                                -(snapshot[team][GOALS_SCORED] - snapshot[team][GOALS_CONCEDED]),
+                                                -snapshot[team][GOALS_SCORED],
+                                                team))
+
+
+class StandingsEngine:
+
+    def __init__(self, season, season_order):
+        self.season = season
+        self.season_order = season_order
+        self.games = []                     # df_games-shaped rows
+        self.cards = {}                     # team -> [A, 2A, VE]
+        self._games_played = {}
+        self._rounds = []                   # sorted rounds with at least one result
+        self._round_results = {}            # round -> {team: record}
+        self._snapshots = {}                # round -> {team: cumulative record}, valid for the first _valid rounds
+        self._round_rows = {}               # round -> df_bcr-shaped rows of that snapshot
+        self._valid = 0
+
+    def set_cards(self, df_cards):
+        # Starting card counts (e.g. the zerozero A/2A/VE columns of df_class), added to by the ingested matches
+        for team, yellows, second_yellows, reds in df_cards[['Team', 'A', '2A', 'VE']].itertuples(index = False, name = None):
+            self.cards[str(team)] = [int(yellows), int(second_yellows), int(reds)]
+
+    def add_match(self, home_team, away_team, home_goals, away_goals, game_round = None, date = None,
+                  odds = (None, None, None), cards = (0, 0, 0, 0)):
+        home_team, away_team = str(home_team), str(away_team)
+        home_goals, away_goals = int(home_goals), int(away_goals)
+
+        # Without an explicit round, a match belongs to the round after the last one either team played
+        if game_round is None or pd.isna(game_round):
+            game_round = max(self._games_played.get(home_team, 0), self._games_played.get(away_team, 0)) + 1
+        game_round = int(game_round)
+
+        for team, scored, conceded in [(home_team, home_goals, away_goals), (away_team, away_goals, home_goals)]:
+            self._games_played[team] = self._games_played.get(team, 0) + 1
+            results = self._round_results.setdefault(game_round, {})
+            results[team] = add_records(results.get(team, (0,) * 7), team_result(scored, conceded))
+
+        if game_round not in self._rounds:
+            insort(self._rounds, game_round)
+        self._valid = min(self._valid, self._rounds.index(game_round))
+
+        # Yellow cards count as A and red cards as VE (match data does not tell second yellows apart)
+        home_yellows, away_yellows, home_reds, away_reds = [0 if pd.isna(card) else int(card) for card in cards]
+        for team, yellows, reds in [(home_team, home_yellows, home_reds), (away_team, away_yellows, away_reds)]:
+            team_cards = self.cards.setdefault(team, [0, 0, 0])
+            team_cards[0] += yellows
+            team_cards[2] += reds
+
+        self.games.append({'Season': self.season,
+                           'SeasonOrder': self.season_order,
+                           'Round': game_round,
+                           'Date': date,
+                           'Match': home_team + " " + str(home_goals) + " - " + str(away_goals) + " " + away_team,
+                           'B365H': odds[0],
+                           'B365D': odds[1],
+                           'B365A': odds[2]})
+
+        return game_round
+
+    def add_matches(self, df):
+        # df rows shaped like df_liganos: HomeTeam, AwayTeam, HG, AG and optionally Round, Date, B365H/D/A, HY, AY, HR, AR.
+        # Returns the round of each match
+        columns = set(df.columns)
+        optional = lambda row, column: getattr(row, column) if column in columns else None
+
+        return [self.add_match(row.HomeTeam, row.AwayTeam, row.HG, row.AG,
+                               game_round = optional(row, 'Round'),
+                               date = optional(row, 'Date'),
+                               odds = (optional(row, 'B365H'), optional(row, 'B365D'), optional(row, 'B365A')),
+                               cards = tuple(optional(row, column) or 0 for column in ['HY', 'AY', 'HR', 'AR']))
+                for row in df.itertuples(index = False)]
+
+    def add_games(self, df_games):
+        # Seeding from df_games rows (the scores are parsed back from the 'Match' strings)
+        matches = df_games['Match'].astype(str).str.extract(MATCH_PATTERN)
+        matches[['Round', 'Date', 'B365H', 'B365D', 'B365A']] = df_games[['Round', 'Date', 'B365H', 'B365D', 'B365A']].values
+        self.add_matches(matches)
+
+    @property
+    def last_round(self):
+        return self._rounds[-1] if self._rounds else 0
+
+    def rounds_from(self, game_round):
+        return [current_round for current_round in self._rounds if current_round >= game_round]
+
+    def snapshot(self, game_round):
+        # Cumulative records after game_round, computed incrementally from the last valid snapshot
+        index = self._rounds.index(game_round)
+
+        while self._valid <= index:
+            current_round = self._rounds[self._valid]
+            current = dict(self._snapshots[self._rounds[self._valid - 1]]) if self._valid else {}
+            for team, record in self._round_results[current_round].items():
+                current[team] = add_records(current.get(team, (0,) * 7), record)
+
+            self._snapshots[current_round] = current
+            self._round_rows[current_round] = [{'Season': self.season,
+                                                'SeasonOrder': self.season_order,
+                                                'Team': team,
+                                                'Round': current_round,
+                                                'TotalPoints': current[team][POINTS],
+                                                'Position': position} for position, team in enumerate(rank(current), 1)]
+            self._valid += 1
+
+        return self._snapshots[game_round]
+
+    def round_standings(self, game_round):
+        # df_bcr-shaped rows: every team that has played by game_round, by position
+        self.snapshot(game_round)
+        return self._round_rows[game_round]
+
+    def standings(self):
+        # df_class-shaped rows: the classification after the last round
+        snapshot = self.snapshot(self.last_round) if self._rounds else {}
+        rows = []
+        for team in rank(snapshot):
+            record = snapshot[team]
+            team_cards = self.cards.get(team, [0, 0, 0])
+            rows.append({'Season': self.season,
+                         'Team': team,
+                         'Games': record[GAMES],
+                         'Won': record[WON],
+                         'Drawn': record[DRAWN],
+                         'Lost': record[LOST],
+                         'Points': record[POINTS],
+                         'GoalsScored': record[GOALS_SCORED],
+                         'GoalsConceded': record[GOALS_CONCEDED],
+                         'GoalsDifference': record[GOALS_SCORED] - record[GOALS_CONCEDED],
+                         'A': team_cards[0],
+                         '2A': team_cards[1],
+                         'VE': team_cards[2],
+                         'SeasonOrder': self.season_order})
+        return rows
+
+    def frames(self):
+        # The season's df_class, df_bcr and df_games
+        df_bcr = [row for game_round in self._rounds for row in self.round_standings(game_round)]
+        df_games = sorted(self.games, key = lambda game: game['Round'])
+
+        return {'df_class': pd.DataFrame(self.standings()),
+                'df_bcr': pd.DataFrame(df_bcr),
+                'df_games': pd.DataFrame(df_games)}
+
+
+
+def history_frames(df_liganos, df_rounds, df_cards):
+    # df_liganos: results of every season (Season, SeasonOrder, Date, HomeTeam, AwayTeam, HG, AG, B365H/D/A)
+    # df_rounds: round of every game (Season, Round, HomeTeam, AwayTeam), df_cards: team cards (Season, Team, A, 2A, VE)
+    # Seasons as zero-padded labels (e.g. 910 -> '0910'), whatever the type they were read with
+    games = df_liganos[['Season', 'SeasonOrder', 'Date', 'HomeTeam', 'AwayTeam', 'HG', 'AG', 'B365H', 'B365D', 'B365A']].copy()
+    games['Season'] = games['Season'].astype(str).str.zfill(4)
+    games['HG'] = games['HG'].astype(int)
+    games['AG'] = games['AG'].astype(int)
+
+    # Fetching each game's round
+    rounds = df_rounds[['Season', 'Round', 'HomeTeam', 'AwayTeam']].assign(Season = df_rounds['Season'].astype(str).str.zfill(4))
+    games = games.merge(rounds, on = ['Season', 'HomeTeam', 'AwayTeam'], how = 'left')
+    games['GameID'] = games.groupby('SeasonOrder', sort = False).cumcount()
+
+    games['Match'] = games['HomeTeam'] + " " + games['HG'].astype(str) + " - " + games['AG'].astype(str) + " " + games['AwayTeam']
+    df_games = games[['Season', 'SeasonOrder', 'Round', 'Date', 'Match', 'B365H', 'B365D', 'B365A']]
+
+    # Team-wise rows: every game twice, home side first, in round order within each season
+    n = len(games)
+    home_goals, away_goals = games['HG'].to_numpy(), games['AG'].to_numpy()
+    home_points = np.select([home_goals > away_goals, home_goals == away_goals], [3, 1], 0)
+    away_points = np.select([away_goals > home_goals, away_goals == home_goals], [3, 1], 0)
+
+    teamwise = pd.DataFrame({'Season': np.tile(games['Season'].to_numpy(), 2),
+                             'SeasonOrder': np.tile(games['SeasonOrder'].to_numpy(), 2),
+                             'SeasonIndex': np.tile(pd.factorize(games['SeasonOrder'])[0], 2),
+                             'GameID': np.tile(games['GameID'].to_numpy(), 2),
+                             'Round': np.tile(games['Round'].to_numpy(), 2),
+                             'Premises': np.repeat([0, 1], n),
+                             'Team': np.concatenate([games['HomeTeam'].to_numpy(), games['AwayTeam'].to_numpy()]),
+                             'GoalsScored': np.concatenate([home_goals, away_goals]),
+                             'GoalsConceded': np.concatenate([away_goals, home_goals]),
+                             'Points': np.concatenate([home_points, away_points])})
+    teamwise = teamwise.sort_values(['SeasonIndex', 'Round', 'GameID', 'Premises'], kind = 'mergesort').reset_index(drop = True)
+    teamwise['Won'] = (teamwise['Points'] == 3).astype(int)
+    teamwise['Drawn'] = (teamwise['Points'] == 1).astype(int)
+    teamwise['Lost'] = (teamwise['Points'] == 0).astype(int)
+
+    # Cumulative points (and goals, for the tiebreakers) of every team after each of its games
+    by_team = teamwise.groupby(['SeasonOrder', 'Team'], sort = False)
+    teamwise['TotalPoints'] = by_team['Points'].cumsum()
+    teamwise['TotalGoalsDifference'] = by_team['GoalsScored'].cumsum() - by_team['GoalsConceded'].cumsum()
+    teamwise['TotalGoalsScored'] = by_team['GoalsScored'].cumsum()
+
+    # Round classifications, as the engine's snapshots: after each round with results, one row per team that has played by then
+    # (its totals after its last game up to that round, carried over the rounds it did not play), ranked with the final table
+    # tiebreakers
+    totals = ['TotalPoints', 'TotalGoalsDifference', 'TotalGoalsScored']
+    played = teamwise.drop_duplicates(['SeasonOrder', 'Team', 'Round'], keep = 'last')
+    df_bcr = played[['SeasonIndex', 'Season', 'SeasonOrder', 'Round']].drop_duplicates() \
+                 .merge(played[['SeasonOrder', 'Team']].drop_duplicates(), on = 'SeasonOrder') \
+                 .merge(played[['SeasonOrder', 'Team', 'Round'] + totals], on = ['SeasonOrder', 'Team', 'Round'], how = 'left') \
+                 .sort_values(['SeasonIndex', 'Team', 'Round'], kind = 'mergesort')
+    df_bcr[totals] = df_bcr.groupby(['SeasonOrder', 'Team'], sort = False)[totals].ffill()
+    df_bcr = df_bcr.dropna(subset = totals).astype({column: int for column in totals})
+    df_bcr = df_bcr.sort_values(['SeasonIndex', 'Round', 'TotalPoints', 'TotalGoalsDifference', 'TotalGoalsScored', 'Team'],
+                                ascending = [True, True, False, False, False, True], kind = 'mergesort')
+    df_bcr['Position'] = df_bcr.groupby(['SeasonOrder', 'Round'], sort = False).cumcount() + 1
+    df_bcr = df_bcr[['Season', 'SeasonOrder', 'Team', 'Round', 'TotalPoints', 'Position']].reset_index(drop = True)
+
+    # Final classifications. Tiebreaker Criteria: 1. Points, 2. Goals Difference, 3. GoalsScored
+    df_class = by_team.agg(SeasonIndex = ('SeasonIndex', 'first'),
+                           Season = ('Season', 'first'),
+                           Games = ('Round', 'max'),
+                           Won = ('Won', 'sum'),
+                           Drawn = ('Drawn', 'sum'),
+                           Lost = ('Lost', 'sum'),
+                           Points = ('Points', 'sum'),
+                           GoalsScored = ('GoalsScored', 'sum'),
+                           GoalsConceded = ('GoalsConceded', 'sum')).reset_index()
+    df_class['GoalsDifference'] = df_class['GoalsScored'] - df_class['GoalsConceded']
+    df_class = df_class.sort_values(['SeasonIndex', 'Points', 'GoalsDifference', 'GoalsScored', 'Team'],
+                                    ascending = [True, False, False, False, True], kind = 'mergesort')
+
+    cards = df_cards[['Season', 'Team', 'A', '2A', 'VE']].assign(Season = df_cards['Season'].astype(str).str.zfill(4))
+    df_class = df_class.merge(cards, on = ['Team', 'Season'], how = 'left')
+    df_class = df_class[['Season', 'Team', 'Games', 'Won', 'Drawn', 'Lost', 'Points', 'GoalsScored', 'GoalsConceded',
+                         'GoalsDifference', 'A', '2A', 'VE', 'SeasonOrder']]
+
+    return {'df_class': df_class, 'df_bcr': df_bcr, 'df_games': df_games}
+
+
+
+if __name__ == '__main__':
+    # Usage (from the DASH folder): python standings.py
+    # Rebuilds df_class.csv, df_bcr.csv and df_games.csv in assets/ from df_liganos.csv, df_rounds.csv and df_cards.csv
+    root_path = sys.argv[1] if len(sys.argv) > 1 else 'assets'
+    start = time.time()
+
+    frames = history_frames(pd.read_csv(join(root_path, 'df_liganos.csv'), index_col = 0, low_memory = False),
+                            pd.read_csv(join(root_path, 'df_rounds.csv'), index_col = 0),
+                            pd.read_csv(join(root_path, 'df_cards.csv'), index_col = 0))
+    # With the line endings of the notebook exports (written on Windows), so only the rows that changed show in a diff
+    for name, df in frames.items():
+        df.to_csv(join(root_path, name + '.csv'), lineterminator = '\r\n')
+
+    print("Built {} in {:.2f}s".format(', '.join(frames), time.time() - start))
@@ -0,0 +1,77 @@
+import gzip
+import hashlib
+import json
+from os.path import join
+
+import flask
+import plotly
+
+
+
+# Static delivery helpers: fingerprinted asset URLs with long-lived cache headers, and the app layout served as a
+# prebuilt, gzip-compressed response instead of being serialized again on every page load.
+
+ASSETS_MAX_AGE = 365 * 24 * 3600      # fingerprinted assets never change under the same URL
+FINGERPRINT_PARAMETER = 'v'
+
+# URL parameters that change with the asset's content: ours (asset_url), and the modification time Dash appends to the
+# stylesheets and scripts it links from the assets folder itself (e.g. /assets/clientside.js?m=1612345678.0)
+FINGERPRINT_PARAMETERS = [FINGERPRINT_PARAMETER, 'm']
+
+
+def fingerprint(path):
+    with open(path, 'rb') as asset_file:
+        return hashlib.sha1(asset_file.read()).hexdigest()[:12]
+
+
+def asset_url(app, path):
+    return app.get_asset_url(path) + '?' + FINGERPRINT_PARAMETER + '=' + fingerprint(join(app.config.assets_folder, path))
+
+
+def add_asset_cache_headers(app):
+    assets_prefix = app.config.routes_pathname_prefix + app.config.assets_url_path.lstrip('/') + '/'
+
+    @app.server.after_request
+    def _asset_cache_headers(response):
+        if flask.request.path.startswith(assets_prefix) and response.status_code == 200:
+            if any(parameter in flask.request.args for parameter in FINGERPRINT_PARAMETERS):
+                response.cache_control.public = True
+                response.cache_control.max_age = ASSETS_MAX_AGE
+                response.cache_control.immutable = True
+                response.cache_control.no_cache = None
+        return response
+
+
+class PrebuiltLayout:
+
+    def __init__(self, app):
+        self.app = app
+        self.refresh()
+
+        # Replacing Dash's own view, which json-encodes the layout on every request
+        endpoint = app.config.routes_pathname_prefix + '_dash-layout'
+        app.server.view_functions[endpoint] = self.serve
+
+    def refresh(self):
+        # To be called whenever app.layout is replaced
+        self.body = json.dumps(self.app.layout, cls = plotly.utils.PlotlyJSONEncoder).encode('utf-8')
+        self.body_gzip = gzip.compress(self.body, compresslevel = 9)
+        self.etag = hashlib.sha1(self.body).hexdigest()
+
+    def serve(self):
+        # gzip only when accepted with a q-value above 0 (best_match leaves out an encoding refused with gzip;q=0). Each body has
+        # its own strong ETag, and a 304 carries the same validator and cache headers as the full response
+        gzipped = flask.request.accept_encodings.best_match(['gzip']) == 'gzip'
+        etag = self.etag + '-gzip' if gzipped else self.etag
+
+        if etag in flask.request.if_none_match:
+            response = flask.Response(status = 304)
+        else:
+            response = flask.Response(self.body_gzip if gzipped else self.body, mimetype = 'application/json')
+            if gzipped:
+                response.headers['Content-Encoding'] = 'gzip'
+
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.cache_control.no_cache = True          # stored, but revalidated with the ETag on every page load
+        return response
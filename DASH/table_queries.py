@@ -0,0 +1,86 @@
+import math
+import re
+
+import pandas as pd
+
+
+
+# Server-side paging, sorting and filtering for the DataTables in custom mode (page_action, sort_action and
+# filter_action = 'custom'): the table sends its page, sort_by and filter_query, and the callback answers with the rows of
+# the visible page only, whatever the size of the underlying frame.
+
+# DataTable filter query operators (e.g. '{Team} contains "Porto" && {Points} >= 70'): symbol -> operator name
+RELATIONAL_OPERATORS = ('eq', 'ne', 'lt', 'le', 'gt', 'ge')
+FILTER_SYMBOLS = {'>=': 'ge', '<=': 'le', '<': 'lt', '>': 'gt', '!=': 'ne', '=': 'eq'}
+
+# A filter part: the {column}, the operator right after it (symbols longest first, so that '>=' is not read as '>'; word
+# operators followed by a space; the case prefix of the DataTable operators, e.g. 'icontains' or 's=', is left out) and the
+# rest as the operand, so operator tokens inside the operand are never split on
+FILTER_PART = re.compile(r'\s*\{(?P<name>[^}]*)\}\s*[is]?'
+                         r'(?P<operator>>=|<=|!=|<|>|=|(?:ge|le|lt|gt|ne|eq|contains|datestartswith)(?=\s))'
+                         r'\s*(?P<value>.*?)\s*$', re.S)
+
+
+def split_filter_part(filter_part):
+    match = FILTER_PART.match(filter_part)
+    if match is None:
+        return None, None, None
+
+    # The operand is kept as written (without its quotes): filter_frame only reads it as a number for numeric columns
+    value = match.group('value')
+    if len(value) > 1 and value[0] == value[-1] and value[0] in ("'", '"', '`'):
+        value = value[1: -1].replace('\\' + value[0], value[0])
+
+    return match.group('name'), FILTER_SYMBOLS.get(match.group('operator'), match.group('operator')), value
+
+
+def filter_frame(df, filter_query):
+    for filter_part in (filter_query or '').split(' && '):
+        name, operator, value = split_filter_part(filter_part)
+        if name not in df.columns:
+            continue
+
+        column = df[name]
+        if operator in RELATIONAL_OPERATORS:
+            if pd.api.types.is_numeric_dtype(column):
+                # An operand that is not a number (e.g. '{Points} > abc', typed halfway) leaves the filter part out
+                value = pd.to_numeric(value, errors = 'coerce')
+                if pd.isna(value):
+                    continue
+            else:
+                column = column.astype(str)
+            df = df.loc[getattr(column, operator)(value)]
+        elif operator == 'contains':
+            df = df.loc[column.astype(str).str.contains(value, case = False, regex = False)]
+        elif operator == 'datestartswith':
+            df = df.loc[column.astype(str).str.startswith(value)]
+
+    return df
+
+
+def sort_frame(df, sort_by):
+    sort_by = [column for column in (sort_by or []) if column['column_id'] in df.columns]
+    if not sort_by:
+        return df
+
+    return df.sort_values([column['column_id'] for column in sort_by],
+                          ascending = [column['direction'] == 'asc' for column in sort_by],
+                          kind = 'mergesort')
+
+
+def requested_page(page_current, triggered, reset_inputs):
+    # The requested page, or the first one when one of reset_inputs ('component.property') is among the triggered inputs
+    # of the callback (dash.callback_context.triggered: [{'prop_id': 'component.property', ...}])
+    return 0 if {trigger['prop_id'] for trigger in triggered} & set(reset_inputs) else page_current
+
+
+def query_page(df, page_current, page_size, sort_by = None, filter_query = None):
+    # Returns the rows of the requested page (as records) and the number of pages. A page past the end (e.g. after a
+    # narrower filter) is moved back to the last one
+    df = sort_frame(filter_frame(df, filter_query), sort_by)
+
+    page_count = max(1, math.ceil(len(df) / page_size))
+    page_current = min(page_current or 0, page_count - 1)
+
+    rows = df.iloc[page_current * page_size: (page_current + 1) * page_size]
+    return rows.to_dict('records'), page_count, page_current
@@ -0,0 +1,369 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+from os.path import abspath, dirname, exists, join
+
+import numpy as np
+import pandas as pd
+
+from data_access import partition
+from data_store import DEFAULT_LEAGUE, files_signature, read_csv_frame
+
+logger = logging.getLogger(__name__)
+
+
+
+# Team profiles: every team-season is described by a feature vector (per game rates from df_class and from the df_liganos
+# match stats), the features are standardized and clustered with k-means into CLUSTERS profiles, and the SIMILAR_TEAMS
+# nearest team-seasons of other seasons are listed for each one ("similar teams across eras").
+#
+# This is a batch step (python team_profiles.py, after the data is refreshed): the fit is keyed by a hash of the size and
+# modification time of its input CSVs (their files signature, as the hot reload watcher sees them) and of the clustering
+# settings, and persisted beside the data folder, under team_profiles/<version>/
+#
+#     model.json         features, standardization, centroids and profile descriptions
+#     assignments.csv    one row per team-season: its features, profile and distance to the profile centroid
+#     similar.csv        the SIMILAR_TEAMS most similar team-seasons of each team-season
+#
+# so a data version is fitted once, and the dashboard only ever loads the results and looks them up, without reading the CSVs
+# (without them, at startup or after a reload, the similar teams view stays empty until the batch step runs).
+#
+# Older seasons lack some features (half-time goals before 1998/99, shots, corners and fouls before 2017/18): distances only
+# use the features both sides have, scaled up to all the features, and centroids average the observed values (k-means with
+# partial distances). The fit is plain NumPy with a seeded k-means++ initialization, so it is reproducible.
+
+PROFILES_FOLDER = 'team_profiles'
+CLASS_CSV = 'df_class.csv'
+MATCHES_CSV = 'df_liganos.csv'
+
+# Feature: description (used for the profile descriptions)
+FEATURES = {'PointsPerGame': "points per game",
+            'WinRate': "wins",
+            'DrawRate': "draws",
+            'GoalsScoredPerGame': "goals scored",
+            'GoalsConcededPerGame': "goals conceded",
+            'HomePointsShare': "points won at home",
+            'FirstHalfGoalsShare': "first half goals",
+            'YellowCardsPerGame': "yellow cards",
+            'RedCardsPerGame': "red cards",
+            'ShotsPerGame': "shots",
+            'ShotsOnTargetRate': "shots on target",
+            'CornersPerGame': "corners",
+            'FoulsPerGame': "fouls"}
+
+# Match stats: df_liganos home and away columns
+MATCH_STATS = {'Goals': ('HG', 'AG'),
+               'FirstHalfGoals': ('HTHG', 'HTAG'),
+               'Shots': ('HS', 'AS'),
+               'ShotsOnTarget': ('HST', 'AST'),
+               'Corners': ('HC', 'AC'),
+               'Fouls': ('HF', 'AF')}
+
+CLUSTERS = 6
+SEED = 0
+KEEP_VERSIONS = 3                       # persisted fits kept, the most recent ones
+N_INIT = 10
+MAX_ITER = 100
+SIMILAR_TEAMS = 10
+DISTANCE_BLOCK = 256                    # team-seasons whose distances to every other one are computed at once
+
+
+def read_inputs(root_path):
+    df_class = read_csv_frame(root_path, CLASS_CSV)
+    columns = {'Div', 'SeasonOrder', 'HomeTeam', 'AwayTeam', 'Res'} | {column for pair in MATCH_STATS.values() for column in pair}
+    df_matches = pd.read_csv(join(root_path, MATCHES_CSV), usecols = lambda column: column in columns, low_memory = False)
+    return df_class, df_matches
+
+
+# I. FEATURES ---------------------------------------------------------------------------------------------------------------------
+
+def match_totals(df_matches):
+    # Team-wise rows (one per team and match, home rows first), summed per (league, season, team). Stats missing from every
+    # match of a team-season stay missing (min_count = 1), and each stat is averaged over the matches that have it
+    df_matches = df_matches[df_matches['Res'].isin(['H', 'D', 'A']) & df_matches['SeasonOrder'].notna()]
+    leagues = df_matches['Div'].astype(str) if 'Div' in df_matches.columns else pd.Series(DEFAULT_LEAGUE, index = df_matches.index)
+
+    sides = []
+    for team, won, stats, is_home in [('HomeTeam', 'H', 0, True), ('AwayTeam', 'A', 1, False)]:
+        side = pd.DataFrame({'League': leagues,
+                             'SeasonOrder': df_matches['SeasonOrder'].astype(int),
+                             'Team': df_matches[team].astype(str),
+                             'HomePoints': np.where(df_matches['Res'] == won, 3, np.where(df_matches['Res'] == 'D', 1, 0)) * is_home})
+        for stat, columns in MATCH_STATS.items():
+            side[stat] = df_matches[columns[stats]]
+        sides.append(side)
+
+    grouped = pd.concat(sides, ignore_index = True).groupby(['League', 'SeasonOrder', 'Team'], sort = False)
+    totals = grouped.sum(min_count = 1)
+    matches = grouped[list(MATCH_STATS)].count().add_suffix('Matches')
+    return totals.join(matches)
+
+
+def team_season_features(df_class, df_matches):
+    df_class = df_class[df_class['SeasonOrder'].notna()]
+    leagues = df_class['Div'].astype(str) if 'Div' in df_class.columns else pd.Series(DEFAULT_LEAGUE, index = df_class.index)
+    games = df_class['Games'].astype(float)
+
+    # df_class rows are in classification order within each season
+    teams = pd.DataFrame({'League': leagues,
+                          'SeasonOrder': df_class['SeasonOrder'].astype(int),
+                          'SeasonExtended': df_class['SeasonExtended'].astype(str),
+                          'Team': df_class['Team'].astype(str),
+                          'Position': df_class.groupby([leagues, 'SeasonOrder'], sort = False).cumcount() + 1,
+                          'Points': df_class['Points'].astype(int),
+                          'PointsPerGame': df_class['Points'] / games,
+                          'WinRate': df_class['Won'] / games,
+                          'DrawRate': df_class['Drawn'] / games,
+                          'GoalsScoredPerGame': df_class['GoalsScored'] / games,
+                          'GoalsConcededPerGame': df_class['GoalsConceded'] / games,
+                          'YellowCardsPerGame': df_class['A'] / games,
+                          'RedCardsPerGame': (df_class['2A'] + df_class['VE']) / games}).reset_index(drop = True)
+
+    # Aligned with the df_class rows (teams without matches get missing match features)
+    totals = match_totals(df_matches).reindex(pd.MultiIndex.from_frame(teams[['League', 'SeasonOrder', 'Team']])) \
+                                     .reset_index(drop = True)
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        teams['HomePointsShare'] = totals['HomePoints'] / teams['Points'].where(teams['Points'] > 0)
+        teams['FirstHalfGoalsShare'] = totals['FirstHalfGoals'] / totals['Goals'].where(totals['FirstHalfGoalsMatches'] > 0)
+        teams['ShotsPerGame'] = totals['Shots'] / totals['ShotsMatches']
+        teams['ShotsOnTargetRate'] = totals['ShotsOnTarget'] / totals['Shots']
+        teams['CornersPerGame'] = totals['Corners'] / totals['CornersMatches']
+        teams['FoulsPerGame'] = totals['Fouls'] / totals['FoulsMatches']
+
+    teams[list(FEATURES)] = teams[list(FEATURES)].replace([np.inf, -np.inf], np.nan).astype('float64')
+    return teams
+
+
+def profiles_version(root_path, clusters, seed):
+    # Sizes and modification times of the input CSVs (not their paths, so the batch step and the dashboard agree whatever
+    # root path they use, nor the data store index, which the fit does not read)
+    inputs = [entry[1:] for entry in files_signature(root_path, [CLASS_CSV, MATCHES_CSV])[:-1]]
+    settings = json.dumps([inputs, list(FEATURES), clusters, seed, N_INIT, MAX_ITER, SIMILAR_TEAMS])
+    return hashlib.sha1(settings.encode('utf-8')).hexdigest()[:12]
+
+
+# II. CLUSTERING ------------------------------------------------------------------------------------------------------------------
+
+def partial_distances(X, observed, centroids):
+    # Squared distances (rows x centroids) over the observed features of each row, scaled up to all the features
+    differences = np.where(observed[:, None, :], X[:, None, :] - centroids[None, :, :], 0.0)
+    return (differences ** 2).sum(axis = 2) * X.shape[1] / np.maximum(observed.sum(axis = 1), 1)[:, None]
+
+
+def kmeans(X, clusters, seed = SEED, n_init = N_INIT, max_iter = MAX_ITER):
+    # X: standardized features (NaN where missing, i.e. at the mean once imputed). Returns (inertia, centroids, labels) of the
+    # best of n_init k-means++ initializations
+    observed = ~np.isnan(X)
+    X = np.where(observed, X, 0.0)
+    rng = np.random.RandomState(seed)
+    best = None
+
+    for _ in range(n_init):
+        centroids = X[[rng.randint(len(X))]]
+        for _ in range(1, clusters):
+            # Uniform choice when every row is already a centroid (e.g. fewer distinct rows than clusters)
+            weights = partial_distances(X, observed, centroids).min(axis = 1)
+            p = weights / weights.sum() if weights.sum() > 0 else None
+            centroids = np.vstack([centroids, X[rng.choice(len(X), p = p)]])
+
+        for _ in range(max_iter):
+            labels = partial_distances(X, observed, centroids).argmin(axis = 1)
+            members = (labels[:, None] == np.arange(clusters)).astype('float64')
+            counts = members.T @ observed
+            updated = np.where(counts > 0, (members.T @ X) / np.maximum(counts, 1), 0.0)
+            if np.allclose(updated, centroids):
+                break
+            centroids = updated
+
+        distances = partial_distances(X, observed, centroids)
+        labels = distances.argmin(axis = 1)
+        inertia = distances[np.arange(len(X)), labels].sum()
+        if best is None or inertia < best[0]:
+            best = (inertia, centroids, labels)
+
+    return best
+
+
+def describe(centroids, coverages, n_features = 2):
+    # One description per profile: the features that set it apart the most, e.g. "many goals scored, few goals conceded", among
+    # the ones observed for most of its team-seasons. Profiles sharing a description (the same features, in any order) get their
+    # next features until they differ, and are numbered when they only differ on features few of their team-seasons have
+    terms = []
+    for centroid, coverage in zip(centroids, coverages):
+        ranked = [i for i in np.argsort(-np.abs(centroid), kind = 'stable') if coverage[i] >= 0.5]
+        terms.append([("many " if centroid[i] > 0 else "few ") + list(FEATURES.values())[i] for i in ranked])
+
+    lengths = [n_features] * len(terms)
+    while True:
+        described = [frozenset(profile_terms[:length]) for profile_terms, length in zip(terms, lengths)]
+        shared = [i for i, features in enumerate(described) if described.count(features) > 1 and lengths[i] < len(terms[i])]
+        if not shared:
+            break
+        for i in shared:
+            lengths[i] += 1
+
+    return [", ".join(profile_terms[:length]) + ("" if described.count(features) == 1 else " (profile {})".format(i + 1))
+            for i, (profile_terms, length, features) in enumerate(zip(terms, lengths, described))]
+
+
+def fit_profiles(teams, clusters = CLUSTERS, seed = SEED):
+    values = teams[list(FEATURES)].to_numpy()
+    means = np.nanmean(values, axis = 0)
+    scales = np.nanstd(values, axis = 0)
+    scales[~(scales > 0)] = 1.0
+    X = (values - means) / scales
+    observed = ~np.isnan(X)
+
+    inertia, centroids, labels = kmeans(X, clusters, seed)
+
+    # Profiles are numbered by points per game (Profile 1 is the strongest), so the numbering does not depend on the seeding
+    order = np.argsort(-centroids[:, list(FEATURES).index('PointsPerGame')], kind = 'stable')
+    centroids = centroids[order]
+    labels = np.argsort(order)[labels]
+
+    assignments = teams.assign(Profile = labels + 1,
+                               CentroidDistance = np.sqrt(partial_distances(X, observed, centroids)[np.arange(len(X)), labels]))
+
+    # Most similar team-seasons of other seasons (the same club in another season included)
+    nearest, nearest_distances = nearest_team_seasons(X, observed, teams['League'].values, teams['SeasonOrder'].values)
+
+    descriptions = describe(centroids, [observed[labels == i].mean(axis = 0) for i in range(len(centroids))])
+
+    rows = np.repeat(np.arange(len(X)), nearest.shape[1])
+    similar = pd.DataFrame({'League': teams['League'].values[rows],
+                            'SeasonOrder': teams['SeasonOrder'].values[rows],
+                            'Team': teams['Team'].values[rows],
+                            'Rank': np.tile(np.arange(1, nearest.shape[1] + 1), len(X))})
+    for column in ['SeasonOrder', 'SeasonExtended', 'Team', 'Position', 'Points']:
+        similar['Similar' + column] = assignments[column].values[nearest.ravel()]
+    similar['SimilarProfile'] = labels[nearest.ravel()] + 1
+    similar['Distance'] = nearest_distances.ravel()
+
+    model = {'features': list(FEATURES),
+             'means': means.tolist(),
+             'scales': scales.tolist(),
+             'centroids': centroids.tolist(),
+             'profiles': [{'Profile': i + 1,
+                           'Description': descriptions[i],
+                           'Teams': int((labels == i).sum())}
+                          for i in range(len(centroids))],
+             'clusters': clusters,
+             'seed': seed,
+             'inertia': float(inertia)}
+
+    return model, assignments, similar[np.isfinite(similar['Distance'])].reset_index(drop = True)
+
+
+def pairwise_distances(X, observed, rows):
+    # Distances of the given rows to every row, over the features both have observed (scaled up to all the features)
+    both = observed[rows, None, :] & observed[None, :, :]
+    X = np.where(observed, X, 0.0)
+    differences = np.where(both, X[rows, None, :] - X[None, :, :], 0.0)
+    return np.sqrt((differences ** 2).sum(axis = 2) * X.shape[1] / np.maximum(both.sum(axis = 2), 1))
+
+
+def nearest_team_seasons(X, observed, leagues, season_orders, n = SIMILAR_TEAMS):
+    # The n nearest rows of other seasons to each row, and their distances (inf when there are fewer). Computed a block of
+    # rows at a time, so memory grows with DISTANCE_BLOCK x rows x features rather than rows x rows x features
+    n = min(n, len(X))
+    nearest = np.zeros((len(X), n), dtype = int)
+    distances = np.zeros((len(X), n))
+    for start in range(0, len(X), DISTANCE_BLOCK):
+        rows = np.arange(start, min(start + DISTANCE_BLOCK, len(X)))
+        block = pairwise_distances(X, observed, rows)
+        block[(leagues[rows, None] == leagues) & (season_orders[rows, None] == season_orders)] = np.inf
+        nearest[rows] = np.argsort(block, axis = 1, kind = 'stable')[:, :n]
+        distances[rows] = np.take_along_axis(block, nearest[rows], axis = 1)
+    return nearest, distances
+
+
+# III. PERSISTED RESULTS ------------------------------------------------------------------------------------------------------------
+
+class TeamProfiles:
+
+    def __init__(self, version, model, assignments, similar):
+        self.version = version
+        self.model = model
+        self.profiles = {profile['Profile']: profile for profile in model['profiles']}
+        self._empty = {'assignments': assignments.iloc[0:0], 'similar': similar.iloc[0:0]}
+        self._partitions = {'assignments': partition(assignments, ['League', 'SeasonOrder']),
+                            'similar': partition(similar, ['League', 'SeasonOrder', 'Team'])}
+
+    def season_teams(self, league, season_order):
+        return self._partitions['assignments'].get((league, season_order), self._empty['assignments'])
+
+    def similar_teams(self, league, season_order, team):
+        return self._partitions['similar'].get((league, season_order, team), self._empty['similar'])
+
+    def standardized(self, df):
+        # Features of team-seasons in standard deviations from the mean of every team-season
+        return (df[self.model['features']] - self.model['means']) / self.model['scales']
+
+    def save(self, folder):
+        # Written aside and swapped in, so a concurrent reader never loads a half-written fit
+        build_folder = folder + '.tmp'
+        shutil.rmtree(build_folder, ignore_errors = True)
+        os.makedirs(build_folder)
+        with open(join(build_folder, 'model.json'), 'w') as model_file:
+            json.dump(dict(self.model, version = self.version), model_file, indent = 1)
+        pd.concat(self._partitions['assignments'].values()).to_csv(join(build_folder, 'assignments.csv'), index = False)
+        pd.concat(list(self._partitions['similar'].values()) or [self._empty['similar']]) \
+          .to_csv(join(build_folder, 'similar.csv'), index = False)
+
+        shutil.rmtree(folder, ignore_errors = True)
+        os.replace(build_folder, folder)
+
+    @classmethod
+    def load(cls, folder):
+        with open(join(folder, 'model.json')) as model_file:
+            model = json.load(model_file)
+        read = lambda name: pd.read_csv(join(folder, name), dtype = {'League': str, 'Team': str, 'SimilarTeam': str,
+                                                                     'SeasonExtended': str, 'SimilarSeasonExtended': str})
+        return cls(model['version'], model, read('assignments.csv'), read('similar.csv'))
+
+
+def profiles_path(root_path):
+    # The fits folder, beside the data folder (DASH/team_profiles for DASH/assets)
+    return join(dirname(abspath(root_path)), PROFILES_FOLDER)
+
+
+def open_profiles(root_path, clusters = CLUSTERS, seed = SEED):
+    # The persisted fit of the current data version, or None when the batch step has not fitted it yet
+    version = profiles_version(root_path, clusters, seed)
+    folder = join(profiles_path(root_path), version)
+    if not exists(join(folder, 'model.json')):
+        logger.warning("No team profiles fitted for version %s: run python team_profiles.py", version)
+        return None
+    return TeamProfiles.load(folder)
+
+
+def fit_and_save(root_path, clusters = CLUSTERS, seed = SEED):
+    # Batch step: fits the current data version (unless it already is) and keeps the KEEP_VERSIONS most recent fits
+    version = profiles_version(root_path, clusters, seed)
+    folder = join(profiles_path(root_path), version)
+
+    if exists(join(folder, 'model.json')):
+        return TeamProfiles.load(folder)
+
+    teams = team_season_features(*read_inputs(root_path))
+    profiles = TeamProfiles(version, *fit_profiles(teams, clusters, seed))
+    profiles.save(folder)
+
+    versions = sorted((join(profiles_path(root_path), name) for name in os.listdir(profiles_path(root_path))),
+                      key = os.path.getmtime, reverse = True)
+    for old_folder in versions[KEEP_VERSIONS:]:
+        shutil.rmtree(old_folder, ignore_errors = True)
+    logger.info("Fitted %d team profiles over %d team-seasons (version %s)", clusters, len(teams), version)
+    return profiles
+
+
+
+if __name__ == '__main__':
+    # Usage (from the DASH folder): python team_profiles.py [clusters]
+    logging.basicConfig(level = logging.INFO)
+    profiles = fit_and_save('assets', clusters = int(sys.argv[1]) if len(sys.argv) > 1 else CLUSTERS)
+    for profile in profiles.model['profiles']:
+        print("Profile {Profile}: {Teams} team-seasons, {Description}".format(**profile))
@@ -0,0 +1,6 @@
+# Standalone ingestion package for the ETL scraping steps (python -m ingestion --help)
+from .checkpoint import Checkpoint
+from .fetcher import FetchError, Fetcher, ResponseCache
+from .parsers import RoundGame, SeasonFile, parse_football_data_index, parse_futebol365_round, parse_zerozero_stats
+from .pipeline import run
+from .sources import Job, football_data_index_job, futebol365_round_jobs, zerozero_stats_jobs
@@ -0,0 +1,89 @@
+import argparse
+import logging
+from os.path import join
+
+import pandas as pd
+
+from .checkpoint import Checkpoint
+from .fetcher import Fetcher
+from .fixtures import FixtureServer, build_fixtures
+from .parsers import PARSERS
+from .pipeline import run
+from .sources import FUTEBOL365_ROOT, ZEROZERO_ROOT, ZEROZERO_STATS, futebol365_round_jobs, zerozero_stats_jobs
+
+
+
+# Usage (from the repository root):
+#   python -m ingestion futebol365 --seasons 1994-2020     round fixtures (HomeTeam/AwayTeam per round) -> IntermediateData/df_rounds.csv
+#   python -m ingestion zerozero --seasons 2012-2020       cards, scorers, assists and player cards -> IntermediateData/df_<stat>.csv
+#   python -m ingestion fixtures <folder>                  fixture pages built from IntermediateData
+#   python -m ingestion serve <folder> [--port 8365]       local stand-in serving the fixtures (then run with --root http://127.0.0.1:8365)
+# Pages are cached in IntermediateData/http_cache and completed jobs in IntermediateData/<source>.checkpoint.jsonl:
+# running the same command again after an interruption only fetches what is missing.
+
+Int_Path = 'IntermediateData'
+
+
+def season_range(text):
+    first, _, last = text.partition('-')
+    return list(range(int(first), int(last or first) + 1))
+
+
+def season_rounds(seasons, liganos_path = join('DASH', 'assets', 'df_liganos.csv')):
+    # Each season has 2(n - 1) rounds, where n is the number of teams for that season
+    df_liganos = pd.read_csv(liganos_path, usecols = ['Season', 'HomeTeam'])
+    teams = df_liganos.groupby(df_liganos['Season'].astype(str).str.zfill(4))['HomeTeam'].nunique()
+    return {season: (teams[str(season)[-2:] + str(season + 1)[-2:]] - 1) * 2 for season in seasons
+            if str(season)[-2:] + str(season + 1)[-2:] in teams}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog = 'python -m ingestion')
+    parser.add_argument('source', choices = ['futebol365', 'zerozero', 'fixtures', 'serve'])
+    parser.add_argument('folder', nargs = '?', help = "fixtures folder (fixtures and serve)")
+    parser.add_argument('--seasons', default = '1994-2020', help = "first years of the seasons, e.g. 1994-2020 or 2019")
+    parser.add_argument('--root', help = "site root, e.g. the fixture server URL")
+    parser.add_argument('--workers', type = int, default = 4)
+    parser.add_argument('--retries', type = int, default = 3)
+    parser.add_argument('--host-delay', type = float, default = 0.0, help = "minimum seconds between requests to one host")
+    parser.add_argument('--cache', default = join(Int_Path, 'http_cache'))
+    parser.add_argument('--port', type = int, default = 8365)
+    args = parser.parse_args()
+
+    logging.basicConfig(level = logging.INFO, format = '%(asctime)s %(levelname)s %(message)s')
+
+    if args.source == 'fixtures':
+        build_fixtures(args.folder)
+        return
+    if args.source == 'serve':
+        server = FixtureServer(args.folder, port = args.port)
+        print("Serving {} at {}".format(args.folder, server.url))
+        server.httpd.serve_forever()
+        return
+
+    seasons = season_range(args.seasons)
+    if args.source == 'futebol365':
+        jobs = futebol365_round_jobs(season_rounds(seasons), root = args.root or FUTEBOL365_ROOT)
+    else:
+        jobs = zerozero_stats_jobs(seasons, root = args.root or ZEROZERO_ROOT)
+
+    checkpoint = Checkpoint(join(Int_Path, args.source + '.checkpoint.jsonl'))
+    fetcher = Fetcher(cache_folder = args.cache, max_workers = args.workers, retries = args.retries, host_delay = args.host_delay)
+    failed = run(jobs, PARSERS[args.source], fetcher, checkpoint)
+
+    # Outputs in job order, whatever the order the pages completed in
+    if args.source == 'futebol365':
+        pd.DataFrame([record for job in jobs if job.key in checkpoint for record in checkpoint.done[job.key]]) \
+          .to_csv(join(Int_Path, 'df_rounds.csv'))
+    else:
+        for stat in ZEROZERO_STATS:
+            pd.DataFrame([record for job in jobs if job.context['stat'] == stat and job.key in checkpoint
+                          for record in checkpoint.done[job.key]]) \
+              .to_csv(join(Int_Path, 'df_' + stat + '.csv'))
+
+    if failed:
+        raise SystemExit("{} jobs failed (run again to retry them): {}".format(len(failed), ', '.join(job.key for job in failed)))
+
+
+if __name__ == '__main__':
+    main()
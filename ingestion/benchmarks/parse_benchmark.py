@@ -0,0 +1,133 @@
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+from os.path import abspath, dirname, join
+
+import pandas as pd
+
+try:
+    import lxml
+    from bs4 import BeautifulSoup
+except ImportError:
+    sys.exit("The notebook parsers need BeautifulSoup and lxml: pip install beautifulsoup4 lxml")
+
+# Running from the repository root, as the ingestion package does
+os.chdir(dirname(dirname(dirname(abspath(__file__)))))
+sys.path.insert(0, os.getcwd())
+
+from ingestion.fixtures import build_fixtures, fixture_name
+from ingestion.parsers import parse_football_data_index, parse_futebol365_round, parse_zerozero_stats
+from ingestion.sources import ZEROZERO_STATS, futebol365_round_url, zerozero_stats_url
+
+
+
+# Parser benchmark over the fixture pages: per-page parse time and peak memory of the ETL notebook parsers (BeautifulSoup,
+# pandas.read_html and character_n/re.finditer slicing) vs the streaming parsers of ingestion.parsers.
+# The notebook parsers need BeautifulSoup and lxml (pip install beautifulsoup4 lxml), as the notebook did.
+# Usage (from the repository root): python ingestion/benchmarks/parse_benchmark.py [repetitions]
+
+
+# ETL notebook parsers ------------------------------------------------------------------------------------------------------------
+
+def character_n(character, string, n):
+    if n == 1:
+        return string.find(character)
+    else:
+        return string.find(character, character_n(character, string, n-1) + 1)
+
+
+def hasNumbers(inputString):
+    return any(char.isdigit() for char in inputString)
+
+
+def notebook_futebol365_round(html, season):
+    soup = BeautifulSoup(html, 'html.parser')
+    records = []
+    results = soup.find(class_ = 'ink-grid all-container')
+    for job_elem in results.find_all('section', class_ = 'left-column-group'):
+        result = job_elem.find('h5', class_ = 'headerTitleSimpleBackground')
+        Equipas = soup.find(class_ = 'left-column-group')
+        for job_equipa in Equipas.find_all('table', class_ = 'ink-table ink-table-f365 alternating all-100'):
+            for res_equipa in job_equipa.find_all('td', class_ = 'align-left hide-xlarge hide-large hide-medium'):
+                if (hasNumbers(res_equipa.text[0]) == False):
+                    records.append((str(season) + '-' + str(season + 1), result.text.split("ª")[0],
+                                    res_equipa.text.split('\n')[1], res_equipa.text.split('\n')[3]))
+    return records
+
+
+def notebook_zerozero_stats(html, season, stat):
+    df = pd.read_html(StringIO(html), match = 'Equipa')[0]
+    return df.drop(['Unnamed: 0'], axis = 1).dropna()
+
+
+def notebook_football_data_index(html):
+    root_path = 'http://www.football-data.co.uk/'
+    Season_Position_html = [chunk.start() for chunk in re.finditer('Season', html)]
+    csv_Position_html = [chunk.start() for chunk in re.finditer('P1.csv', html)]
+
+    Season_csv_chunk = [html[Season_Position_html[i] : csv_Position_html[i] + len('P1.csv')] for i in range(len(Season_Position_html))]
+
+    file_identifier = 'mmz4281/yyyy/P1.csv'
+    csv_url = [root_path + season_file[-len(file_identifier):] for season_file in Season_csv_chunk]
+    return [(x[character_n('/', x, 4) + 1 : character_n('/', x, 5)], x) for x in csv_url]
+
+
+# Benchmark ----------------------------------------------------------------------------------------------------------------------
+
+def measure(parse, pages, repetitions):
+    # Median and 95th percentile parse time per page (ms), and the largest peak of traced memory while parsing one page (MB)
+    times = []
+    for _ in range(repetitions):
+        for page, context in pages:
+            start = time.perf_counter()
+            list(parse(page, **context))
+            times.append((time.perf_counter() - start) * 1e3)
+
+    peak = 0
+    for page, context in pages:
+        tracemalloc.start()
+        list(parse(page, **context))
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return statistics.median(times), sorted(times)[int(len(times) * 0.95)], peak / 2 ** 20
+
+
+if __name__ == '__main__':
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    folder = tempfile.mkdtemp()
+    build_fixtures(folder)
+
+    def read(url):
+        path = join(folder, fixture_name(url))
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding = 'utf-8') as fixture_file:
+            return fixture_file.read()
+
+    futebol365_pages = [(read(futebol365_round_url(season, game_round, '')), {'season': season})
+                        for season in [1994, 2013, 2019] for game_round in range(1, 35)]
+    zerozero_pages = [(read(zerozero_stats_url(stat, season, '')), {'season': season, 'stat': stat})
+                      for season in [1994, 2019] for stat in ZEROZERO_STATS]
+    index_pages = [(read('/portugalm.php'), {})]
+
+    stages = [('futebol365 round', notebook_futebol365_round, parse_futebol365_round, futebol365_pages),
+              ('zerozero stats', notebook_zerozero_stats, parse_zerozero_stats, zerozero_pages),
+              ('football-data index', notebook_football_data_index, parse_football_data_index, index_pages)]
+
+    print("{:<22}{:>7}{:>8}{:>13}{:>13}{:>9}{:>13}{:>13}{:>11}".format('Page', 'Pages', 'KB', 'Notebook ms', 'Notebook MB', 'Speedup',
+                                                                      'Stream ms', 'Stream p95', 'Stream MB'))
+    for stage, notebook_parse, streaming_parse, pages in stages:
+        pages = [(page, context) for page, context in pages if page is not None]
+        size = statistics.mean(len(page.encode('utf-8')) for page, _ in pages) / 1024
+        after = measure(streaming_parse, pages, repetitions)
+        before = measure(notebook_parse, pages, repetitions)
+
+        print("{:<22}{:>7}{:>8.1f}{:>13.3f}{:>13.3f}{:>8.1f}x{:>13.3f}{:>13.3f}{:>11.3f}".format(
+              stage, len(pages), size, before[0], before[2], before[0] / after[0], after[0], after[1], after[2]))
@@ -0,0 +1,48 @@
+import json
+import os
+
+
+
+# Checkpoint file: one JSON line per completed job ({"key": ..., "records": [...]}), appended and flushed as soon as the job
+# is parsed. An interrupted run is resumed by skipping the keys already in the file (a line cut short by the interruption
+# is ignored and cut off the file, so that job is simply done again and the next line starts clean).
+
+class Checkpoint:
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+
+        if os.path.exists(path):
+            with open(path, 'rb+') as checkpoint_file:
+                lines = checkpoint_file.readlines()
+                for line in lines:
+                    try:
+                        entry = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        entry = None
+                        continue
+                    self.done[entry['key']] = entry['records']
+
+                if lines and not lines[-1].endswith(b'\n'):
+                    if entry is None:
+                        checkpoint_file.truncate(checkpoint_file.tell() - len(lines[-1]))
+                    else:
+                        checkpoint_file.write(b'\n')
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def save(self, key, records):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok = True)
+        with open(self.path, 'a', encoding = 'utf-8') as checkpoint_file:
+            checkpoint_file.write(json.dumps({'key': key, 'records': records}, ensure_ascii = False) + '\n')
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        self.done[key] = records
+
+    def records(self):
+        return [record for records in self.done.values() for record in records]
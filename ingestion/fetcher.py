@@ -0,0 +1,148 @@
+import hashlib
+import http.client
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from os.path import exists, join
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+
+# Bounded-concurrency page fetcher: a thread pool where each worker keeps one persistent (keep-alive) connection per host,
+# an on-disk response cache keyed by URL, a minimum delay between requests to the same host, and retries with exponential
+# backoff on connection errors, timeouts, 429 and 5xx responses.
+
+USER_AGENT = 'Mozilla/5.0 (compatible; liganos-ingestion)'
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+
+    def __init__(self, url, reason):
+        super().__init__("{} ({})".format(url, reason))
+        self.url = url
+        self.reason = reason
+
+
+class ResponseCache:
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def path(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return join(self.folder, key[:2], key + '.html')
+
+    def get(self, url):
+        path = self.path(url)
+        if not exists(path):
+            return None
+        with open(path, encoding = 'utf-8') as cached_file:
+            return cached_file.read()
+
+    def put(self, url, text):
+        # Written aside and renamed, so an interrupted run never leaves a truncated page in the cache
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        with open(path + '.tmp', 'w', encoding = 'utf-8') as cached_file:
+            cached_file.write(text)
+        os.replace(path + '.tmp', path)
+
+
+class Fetcher:
+
+    def __init__(self, cache_folder = None, max_workers = 4, retries = 3, backoff = 1.0, timeout = 30, host_delay = 0.0):
+        self.cache = ResponseCache(cache_folder) if cache_folder else None
+        self.max_workers = max_workers
+        self.retries = retries                  # retries after the first attempt
+        self.backoff = backoff                  # seconds before the first retry, doubled on every further one
+        self.timeout = timeout
+        self.host_delay = host_delay            # minimum seconds between two requests to the same host (politeness)
+        self._local = threading.local()
+        self._host_locks = {}
+        self._host_last = {}
+        self._lock = threading.Lock()
+
+    def _connection(self, scheme, netloc):
+        connections = self._local.__dict__.setdefault('connections', {})
+        if (scheme, netloc) not in connections:
+            connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            connections[(scheme, netloc)] = connection_class(netloc, timeout = self.timeout)
+        return connections[(scheme, netloc)]
+
+    def _drop_connection(self, scheme, netloc):
+        connection = self._local.__dict__.get('connections', {}).pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+    def _wait_turn(self, netloc):
+        if not self.host_delay:
+            return
+        with self._lock:
+            host_lock = self._host_locks.setdefault(netloc, threading.Lock())
+        with host_lock:
+            wait = self._host_last.get(netloc, 0) + self.host_delay - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._host_last[netloc] = time.monotonic()
+
+    def _request(self, url):
+        parts = urlsplit(url)
+        target = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        self._wait_turn(parts.netloc)
+
+        connection = self._connection(parts.scheme, parts.netloc)
+        try:
+            connection.request('GET', target, headers = {'User-Agent': USER_AGENT, 'Connection': 'keep-alive'})
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            # The server may have closed the kept-alive connection: the next attempt opens a new one
+            self._drop_connection(parts.scheme, parts.netloc)
+            raise
+
+        if response.will_close:
+            self._drop_connection(parts.scheme, parts.netloc)
+
+        return response.status, response.headers.get_content_charset() or 'utf-8', body
+
+    def fetch(self, url):
+        if self.cache is not None:
+            text = self.cache.get(url)
+            if text is not None:
+                return text
+
+        for attempt in range(self.retries + 1):
+            try:
+                status, charset, body = self._request(url)
+                if status == 200:
+                    break
+                if status not in RETRY_STATUS:
+                    raise FetchError(url, 'HTTP {}'.format(status))
+                reason = 'HTTP {}'.format(status)
+            except (OSError, http.client.HTTPException) as error:
+                reason = repr(error)
+
+            if attempt == self.retries:
+                raise FetchError(url, reason)
+            logger.warning("Retrying %s (%s)", url, reason)
+            time.sleep(self.backoff * 2 ** attempt)
+
+        text = body.decode(charset, errors = 'replace')
+        if self.cache is not None:
+            self.cache.put(url, text)
+        return text
+
+    def fetch_all(self, urls):
+        # Yields (url, text or FetchError) as the pages complete, with at most max_workers requests in flight
+        with ThreadPoolExecutor(max_workers = self.max_workers) as executor:
+            futures = {executor.submit(self.fetch, url): url for url in urls}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except FetchError as error:
+                    yield futures[future], error
@@ -0,0 +1,149 @@
+import html
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import exists, join
+from urllib.parse import quote, urlsplit
+
+import pandas as pd
+
+from .sources import EDICAO, ZEROZERO_STATS, futebol365_round_url, season_years, zerozero_stats_url
+
+
+
+# Local stand-in for the scraped sites: saved HTML fixtures served over HTTP, so the fetcher, the parsers and a whole
+# resumable run can be exercised without touching the real sites. Fixtures are stored one file per path and query, and the
+# server can fail every n-th request with a 503 to exercise the retries.
+#
+# build_fixtures writes pages shaped like the real ones (the elements the parsers look for) from the notebook outputs in
+# IntermediateData/, for every season available there.
+
+# Navigation boilerplate around the content, so fixture pages are closer to the size of the real ones
+BOILERPLATE = ''.join('<li class="menu-item"><a href="/link/{0}">Link {0}</a></li>'.format(i) for i in range(400))
+
+
+def fixture_name(url):
+    parts = urlsplit(url)
+    return quote((parts.path or '/') + ('?' + parts.query if parts.query else ''), safe = '') + '.html'
+
+
+def write_fixture(folder, url, text):
+    os.makedirs(folder, exist_ok = True)
+    with open(join(folder, fixture_name(url)), 'w', encoding = 'utf-8') as fixture_file:
+        fixture_file.write(text)
+
+
+def page(body):
+    return ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>Fixture</title></head><body>'
+            '<nav><ul>' + BOILERPLATE + '</ul></nav>' + body + '<footer><ul>' + BOILERPLATE + '</ul></footer></body></html>')
+
+
+def futebol365_round_page(season, round_label, games):
+    # round_label as in the page header, e.g. '12' or 'Campeonato - 12' (2013/14)
+    game_round = int(round_label.split(' - ')[-1])
+    rows = ''.join('<tr><td class="align-right">{date}</td>'
+                   '<td class="align-left hide-xlarge hide-large hide-medium">\n{home}\n<span class="score">-</span>\n{away}\n</td>'
+                   '<td class="align-left hide-small hide-tiny">{home} - {away}</td></tr>'
+                   .format(date = '{:02d}/08/{}'.format(game_round % 28 + 1, season),
+                           home = html.escape(home), away = html.escape(away))
+                   for home, away in games)
+    return page('<div class="ink-grid all-container"><section class="left-column-group">'
+                '<h5 class="headerTitleSimpleBackground">{}ª Jornada</h5>'.format(html.escape(round_label)) +
+                '<table class="ink-table ink-table-f365 alternating all-100"><tbody>' + rows + '</tbody></table>'
+                '</section></div>')
+
+
+def zerozero_stats_page(df):
+    header = '<tr><th></th>' + ''.join('<th>{}</th>'.format(html.escape(str(column))) for column in df.columns) + '</tr>'
+    rows = ''.join('<tr><td>{}</td>'.format(position) + ''.join('<td>{}</td>'.format(html.escape(str(value))) for value in row) + '</tr>'
+                   for position, row in enumerate(df.itertuples(index = False, name = None), 1))
+    return page('<div id="page_main"><table class="zztable stats"><caption>Equipa</caption><thead>' + header + '</thead>'
+                '<tbody>' + rows + '</tbody></table></div>')
+
+
+def football_data_index_page(seasons):
+    # seasons: first years, most recent first
+    links = ''.join('<I>Season {}/{}</I><BR>\n<IMG SRC="Excel.gif" ALT="Excel">'
+                    '<A HREF="mmz4281/{}/P1.csv">Liga I</A><BR>\n'.format(season, season + 1, season_years(season))
+                    for season in seasons)
+    return page('<TABLE><TR><TD>' + links + '</TD></TR></TABLE>')
+
+
+def build_fixtures(folder, intermediate_path = 'IntermediateData'):
+    # Fixtures are looked up by path and query only, so they are built with an empty site root
+    root = ''
+    df_rounds = pd.read_csv(join(intermediate_path, 'df_rounds.csv'), index_col = 0)
+    for (season, round_label), games in df_rounds.groupby([df_rounds['Season'].str[:4].astype(int), df_rounds['Round'].astype(str)]):
+        write_fixture(folder, futebol365_round_url(season, int(round_label.split(' - ')[-1]), root),
+                      futebol365_round_page(season, round_label, games[['HomeTeam', 'AwayTeam']].values.tolist()))
+
+    for stat in ZEROZERO_STATS:
+        path = join(intermediate_path, 'df_' + stat + '.csv')
+        if not exists(path):
+            continue
+        df = pd.read_csv(path, index_col = 0)
+        for season, df_season in df.groupby(df['Season'].astype(str).str.zfill(4)):
+            first_year = int(('19' if season[:2] >= '50' else '20') + season[:2])
+            if season in EDICAO:
+                write_fixture(folder, zerozero_stats_url(stat, first_year, root),
+                              zerozero_stats_page(df_season.drop(columns = ['Season'])))
+
+    seasons = df_rounds['Season'].str[:4].astype(int).unique()
+    write_fixture(folder, root + '/portugalm.php', football_data_index_page(sorted(seasons, reverse = True)))
+
+
+class FixtureServer:
+
+    def __init__(self, folder, port = 0, fail_every = 0):
+        self.folder = folder
+        self.fail_every = fail_every            # every n-th request gets a 503 (0: never)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.url = 'http://127.0.0.1:{}'.format(self.httpd.server_address[1])
+        self._thread = threading.Thread(target = self.httpd.serve_forever, name = 'FixtureServer', daemon = True)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'       # keep-alive, as the real sites
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    fail = server.fail_every and server.requests % server.fail_every == 0
+
+                path = join(server.folder, fixture_name(self.path))
+                if fail:
+                    status, body = 503, b'Service Unavailable'
+                elif exists(path):
+                    with open(path, 'rb') as fixture_file:
+                        status, body = 200, fixture_file.read()
+                else:
+                    status, body = 404, b'Not Found'
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
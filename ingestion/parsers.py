@@ -0,0 +1,132 @@
+import html
+import logging
+import re
+from collections import namedtuple
+
+
+
+# Streaming page parsers: each page is scanned once with a compiled regular expression that only matches the elements of
+# interest, and the parsers yield typed records as they are found (no DOM is built and no substring is searched again).
+#   parse_futebol365_round   RoundGame per game of a futebol365 round page
+#   parse_zerozero_stats     dict per row of the zerozero stats table (numbers as int/float)
+#   parse_football_data_index  SeasonFile per season csv linked from the football-data index page
+
+RoundGame = namedtuple('RoundGame', ['Season', 'Round', 'HomeTeam', 'AwayTeam'])
+SeasonFile = namedtuple('SeasonFile', ['Season', 'File_url'])
+
+logger = logging.getLogger(__name__)
+
+TAG = re.compile(r'<[^>]*>')
+NUMBER = re.compile(r'-?\d+(\.\d+)?')
+
+# futebol365: the round header (e.g. "12ª Jornada", "Campeonato - 12ª Jornada") and the team cells of every game
+# ("\nHomeTeam\n - \nAwayTeam\n"); cells starting with a digit hold dates or scores instead. Scripts and comments are matched
+# as a whole, so markup inside them is passed over. A cell is either three lines (home team, dash or score, away team) or a
+# single "HomeTeam - AwayTeam" line, split on a dash with whitespace on both sides so hyphenated names are kept whole
+FUTEBOL365_TOKENS = re.compile(r'<script\b.*?</script>|<!--.*?-->'
+                               r'|<h5[^>]*class="headerTitleSimpleBackground"[^>]*>(?P<header>.*?)</h5>'
+                               r'|<td[^>]*class="align-left hide-xlarge hide-large hide-medium"[^>]*>(?P<teams>.*?)</td>',
+                               re.S)
+
+# zerozero: table and row boundaries, captions and cells, in page order. The rows of the first table mentioning 'Equipa' (in
+# its caption or one of its cells) are the records
+ZEROZERO_TOKENS = re.compile(r'<script\b.*?</script>|<!--.*?-->|<table\b|</table>|<tr\b'
+                             r'|<caption\b[^>]*>(?P<caption>.*?)</caption>'
+                             r'|<t(?P<kind>[hd])\b[^>]*>(?P<cell>.*?)</t[hd]>',
+                             re.S)
+
+# football-data: each "Season" label followed by its P1.csv link
+TEAMS_SEPARATOR = re.compile(r'\s+-\s+')
+SCORE = re.compile(r'(\d+\s*)?-(\s*\d+)?')
+
+FOOTBALL_DATA_SEASONS = re.compile(r'Season.*?(?P<url>mmz4281/(?P<season>\d{4})/P1\.csv)', re.S)
+
+
+def text(fragment):
+    return html.unescape(TAG.sub('', fragment))
+
+
+def typed(value):
+    value = value.strip()
+    if NUMBER.fullmatch(value):
+        return float(value) if '.' in value else int(value)
+    return value
+
+
+def parse_futebol365_round(page, season):
+    # The round comes from the page header, which also names the competition phase when there is one (2013/14)
+    round_label = None
+    for token in FUTEBOL365_TOKENS.finditer(page):
+        if token.group('header') is not None:
+            round_label = text(token.group('header')).split('ª')[0]
+            continue
+        if token.group('teams') is None:
+            continue
+
+        teams = text(token.group('teams')).strip()
+        if teams and not teams[0].isdigit():
+            lines = [line.strip() for line in teams.split('\n') if line.strip()]
+            if len(lines) == 3 and SCORE.fullmatch(lines[1]):
+                names = [lines[0], lines[2]]
+            else:
+                names = [name.strip() for name in TEAMS_SEPARATOR.split(teams)]
+            if len(names) != 2 or not all(names):
+                logger.warning("Skipped a game cell of round %s without two team names: %r", round_label, teams)
+                continue
+            yield RoundGame(str(season) + '-' + str(season + 1), round_label, names[0], names[1])
+
+
+def row_values(columns, cells):
+    # The unnamed first column (position) is dropped, as are incomplete rows (None)
+    values = dict(zip(columns, [typed(value) for _, value in cells]))
+    values.pop('', None)
+    if len(values) == len(columns) - (1 if '' in columns else 0) and all(value != '' for value in values.values()):
+        return values
+    return None
+
+
+def parse_zerozero_stats(page, season, stat = None):
+    # One pass over the page: the rows of each table are kept until its end tells whether it is the stats table
+    season_years = str(season)[-2:] + str(season + 1)[-2:]
+    columns, rows, cells, mentions = None, [], None, False
+
+    for token in ZEROZERO_TOKENS.finditer(page):
+        markup = token.group()
+        if token.group('kind') is not None:
+            if cells is not None:
+                cells.append((token.group('kind'), text(token.group('cell')).strip()))
+                mentions = mentions or 'Equipa' in cells[-1][1]
+            continue
+        if token.group('caption') is not None:
+            mentions = mentions or 'Equipa' in text(token.group('caption'))
+            continue
+        if markup.startswith('<script') or markup.startswith('<!--'):
+            continue
+
+        # A row or table boundary: the row read so far is complete
+        if cells:
+            if columns is None:
+                if all(kind == 'h' for kind, _ in cells):
+                    columns = [value for _, value in cells]
+            else:
+                values = row_values(columns, cells)
+                if values is not None:
+                    rows.append(values)
+
+        cells = [] if markup == '<tr' else None
+        if markup == '<table':
+            columns, rows, mentions = None, [], False
+        elif markup == '</table>' and mentions:
+            for values in rows:
+                yield dict({'Season': season_years}, **values)
+            return
+
+
+def parse_football_data_index(page, root = 'http://www.football-data.co.uk/'):
+    for match in FOOTBALL_DATA_SEASONS.finditer(page):
+        yield SeasonFile(match.group('season'), root + match.group('url'))
+
+
+PARSERS = {'futebol365': parse_futebol365_round,
+           'zerozero': parse_zerozero_stats,
+           'football-data': parse_football_data_index}
@@ -0,0 +1,36 @@
+import logging
+
+from .fetcher import FetchError
+
+logger = logging.getLogger(__name__)
+
+
+
+# Runs a list of jobs: pages are fetched concurrently (or read from the response cache), parsed as they arrive and
+# checkpointed one by one, so an interrupted run resumes with the jobs that are not in the checkpoint yet.
+# parse: function(html, **job.context) returning or yielding the job's records (dicts or namedtuples)
+
+def run(jobs, parse, fetcher, checkpoint):
+    pending = {job.url: job for job in jobs if job.key not in checkpoint}
+    failed = []
+    logger.info("%d jobs, %d already done, %d to run", len(jobs), len(jobs) - len(pending), len(pending))
+
+    for url, page in fetcher.fetch_all(list(pending)):
+        job = pending[url]
+        if isinstance(page, FetchError):
+            logger.error("Failed %s: %s", job.key, page.reason)
+            failed.append(job)
+            continue
+
+        try:
+            records = [record._asdict() if hasattr(record, '_asdict') else record for record in parse(page, **job.context)]
+        except Exception:
+            # An unexpected page layout fails that job only: it is retried by the next run
+            logger.exception("Failed to parse %s", job.key)
+            failed.append(job)
+            continue
+
+        checkpoint.save(job.key, records)
+        logger.debug("Done %s", job.key)
+
+    return failed
@@ -0,0 +1,82 @@
+from collections import namedtuple
+
+
+
+# Pages scraped by the ETL, as jobs: a unique key (used by the checkpoint), the URL and the context the parser needs.
+# The site roots can be pointed elsewhere, e.g. to the fixture server (ingestion.fixtures).
+
+FOOTBALL_DATA_ROOT = 'http://www.football-data.co.uk'
+FUTEBOL365_ROOT = 'https://www.futebol365.pt'
+ZEROZERO_ROOT = 'https://www.zerozero.pt'
+
+Job = namedtuple('Job', ['key', 'url', 'context'])
+
+# zerozero edition id of each season
+EDICAO = {'2021': '147383',
+          '1920': '135717',
+          '1819': '125220',
+          '1718': '109369',
+          '1617': '98399',
+          '1516': '87508',
+          '1415': '70079',
+          '1314': '58581',
+          '1213': '47487',
+          '1112': '22951',
+          '1011': '15339',
+          '0910': '8838',
+          '0809': '2306',
+          '0708': '1582',
+          '0607': '1295',
+          '0506': '1138',
+          '0405': '495',
+          '0304': '5',
+          '0203': '1',
+          '0102': '119',
+          '0001': '116',
+          '9900': '114',
+          '9899': '112',
+          '9798': '110',
+          '9697': '108',
+          '9596': '106',
+          '9495': '121'}
+
+# zerozero edition_stats.php queries: team cards, top scorers, top assistants and player cards
+ZEROZERO_STATS = {'cards': 'v=et4&o=a&sc=0&v1=e&v2=t&v3=4',
+                  'scorers': 'v=jt1&o=g&sc=0&v1=j&v2=t&v3=1',
+                  'assists': 'v=jt14&o=ass&sc=0&v1=j&v2=t&v3=14',
+                  'player_cards': 'v=jt4&o=a&sc=0&v1=j&v2=t&v3=4'}
+
+
+def season_years(season):
+    # 1994 -> '9495'
+    return str(season)[-2:] + str(season + 1)[-2:]
+
+
+def football_data_index_job(root = FOOTBALL_DATA_ROOT):
+    return Job('football-data/index', root + '/portugalm.php', {})
+
+
+def futebol365_round_url(season, game_round, root = FUTEBOL365_ROOT):
+    # 2013/14 pages are addressed by competition phase
+    if season_years(season) == '1314':
+        return root + '/competicao/392/?edition=' + str(season) + '&group=all&competition_phase=Campeonato&phase_round=' + str(game_round)
+    return root + '/competicao/392/?edition=' + str(season) + '&competition_round=' + str(game_round) + '&group=all'
+
+
+def futebol365_round_jobs(season_rounds, root = FUTEBOL365_ROOT):
+    # season_rounds: {first year of the season: number of rounds}, e.g. {1994: 34}
+    return [Job('futebol365/{}/{:02d}'.format(season, game_round),
+                futebol365_round_url(season, game_round, root),
+                {'season': season})
+            for season, rounds in sorted(season_rounds.items()) for game_round in range(1, rounds + 1)]
+
+
+def zerozero_stats_url(stat, season, root = ZEROZERO_ROOT):
+    return root + '/edition_stats.php?' + ZEROZERO_STATS[stat] + '&pais=0&pos=0&id_equipa=0&id_edicao=' + EDICAO[season_years(season)]
+
+
+def zerozero_stats_jobs(seasons, stats = tuple(ZEROZERO_STATS), root = ZEROZERO_ROOT):
+    return [Job('zerozero/{}/{}'.format(stat, season),
+                zerozero_stats_url(stat, season, root),
+                {'season': season, 'stat': stat})
+            for season in seasons if season_years(season) in EDICAO for stat in stats]
@@ -0,0 +1,12 @@
+import sys
+from os.path import abspath, dirname, join
+
+
+
+# Tests run from the repository root: the ingestion package is imported from there, the dashboard modules from DASH/
+# (as DashApp imports them)
+ROOT = dirname(dirname(abspath(__file__)))
+
+for path in [ROOT, join(ROOT, 'DASH')]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
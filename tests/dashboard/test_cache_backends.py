@@ -0,0 +1,35 @@
+import pytest
+
+from cache_backends import RedisBackend, RedisStandIn
+from callback_cache import OutputCache
+
+
+
+# The Redis backend against the in-process stand-in: clearing one cache walks the keyspace with SCAN (deleting as it goes)
+# and leaves the other caches' entries, and entries are not counted
+
+@pytest.fixture
+def backend():
+    with RedisStandIn() as server:
+        yield RedisBackend(port = server.port)
+
+
+def test_clear_scans_only_its_cache(backend):
+    cleared = OutputCache(lambda key: {'key': key}, backend = backend, name = 'cleared')
+    kept = OutputCache(lambda key: {'key': key}, backend = backend, name = 'kept')
+    for key in range(3 * RedisBackend.SCAN_COUNT):
+        cleared.get(key)
+    for key in range(5):
+        kept.get(key)
+
+    cleared.clear()
+
+    assert not any((key,) in cleared for key in range(3 * RedisBackend.SCAN_COUNT))
+    assert all((key,) in kept for key in range(5))
+
+
+def test_redis_entries_are_not_counted(backend):
+    cache = OutputCache(lambda key: {'key': key}, backend = backend)
+    cache.get(1)
+    assert cache.entries() is None
+    assert OutputCache(lambda key: {'key': key}).entries() == 0
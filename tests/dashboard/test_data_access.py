@@ -0,0 +1,95 @@
+import pandas as pd
+
+from data_access import Dataset, data_version, frame_version
+
+
+
+# Dataset over synthetic seasons: partitions are loaded on first access and the least recently used ones dropped past
+# max_partitions; a reload only drops (and reports) the seasons whose content hash changed
+
+def season_frames(season_order, points):
+    return {'df_class': pd.DataFrame({'SeasonOrder': [season_order] * 2, 'Team': ['A', 'B'], 'Points': [points, points - 10]})}
+
+
+def metadata(points):
+    # points: {season_order: points of the champion}, each season's Version is the content hash of its frame
+    return {'P1': [{'SeasonOrder': season_order, 'Season': str(season_order), 'SeasonExtended': str(season_order),
+                    'FirstRound': 1, 'LastRound': 34, 'Version': frame_version(season_frames(season_order, value)['df_class'])}
+                   for season_order, value in sorted(points.items())]}
+
+
+def dataset(points, loads, max_partitions = 32):
+    def load_partition(league, season_order):
+        loads.append(season_order)
+        return season_frames(season_order, points[season_order])
+    return Dataset(metadata(points), load_partition, max_partitions = max_partitions)
+
+
+def test_least_recently_used_partition_is_evicted():
+    loads = []
+    data = dataset({1: 70, 2: 75, 3: 80}, loads, max_partitions = 2)
+
+    data.partition('P1', 1)
+    data.partition('P1', 2)
+    data.partition('P1', 1)             # season 1 is now the most recently used
+    data.partition('P1', 3)             # past capacity: season 2 is dropped
+    assert loads == [1, 2, 3]
+
+    data.partition('P1', 1)
+    assert loads == [1, 2, 3]
+    data.partition('P1', 2)
+    assert loads == [1, 2, 3, 2]
+
+
+def test_reload_returns_only_the_changed_seasons():
+    loads = []
+    data = dataset({1: 70, 2: 75, 3: 80}, loads)
+    for season_order in [1, 2, 3]:
+        data.partition('P1', season_order)
+    versions = {key: data.cache_version(*key) for key in data.keys()}
+    version = data.version
+
+    changed = data.reload(dataset({1: 70, 2: 76, 3: 80}, loads))
+
+    assert changed == [('P1', 2)]
+    assert {key for key in data.keys() if data.cache_version(*key) != versions[key]} == {('P1', 2)}
+    assert data.version != version and data.version == data_version(metadata({1: 70, 2: 76, 3: 80}))
+
+    # Only the changed season is loaded again, with its new content
+    loads.clear()
+    assert data.season('df_class', 'P1', 2)['Points'].tolist() == [76, 66]
+    data.partition('P1', 1)
+    data.partition('P1', 3)
+    assert loads == [2]
+
+
+def test_reload_of_the_same_data_changes_nothing():
+    loads = []
+    data = dataset({1: 70, 2: 75}, loads)
+    version = data.version
+    assert data.reload(dataset({1: 70, 2: 75}, loads)) == []
+    assert data.version == version
+
+
+def test_replaced_partition_is_never_evicted():
+    loads = []
+    data = dataset({1: 70, 2: 75, 3: 80}, loads, max_partitions = 1)
+    version = data.cache_version('P1', 1)
+
+    data.replace_partition('P1', 1, season_frames(1, 73))
+    data.partition('P1', 2)
+    data.partition('P1', 3)
+
+    assert data.season('df_class', 'P1', 1)['Points'].tolist() == [73, 63]
+    assert data.cache_version('P1', 1) != version
+    assert loads == [1, 2, 3]
+
+
+def test_memory_report_of_every_partition_keeps_them_unloaded():
+    loads = []
+    data = dataset({1: 70, 2: 75, 3: 80}, loads, max_partitions = 1)
+    data.partition('P1', 1)
+
+    assert data.memory_report()['Rows'].to_dict() == {'df_class': 2}
+    assert data.memory_report(every_partition = True)['Rows'].to_dict() == {'df_class': 6}
+    assert list(data._partitions) == [('P1', 1)]
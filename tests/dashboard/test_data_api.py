@@ -0,0 +1,127 @@
+import gzip
+import json
+
+import dash
+import dash_html_components as html
+import pandas as pd
+import pytest
+
+from data_access import Dataset, frame_version
+from data_api import API_PREFIX, DataAPI, brotli, pa
+
+
+
+# Data API over a synthetic two-season Dataset, through the Flask test client: a 200 with its own ETag per content encoding,
+# a 304 on a matching If-None-Match, new ETags once a season's partition changes (only for that season) and a 406 for a format
+# the client does not accept
+
+def season_frames(season_order, points):
+    teams = ['A', 'B']
+    return {'df_class': pd.DataFrame({'SeasonOrder': season_order, 'Team': teams, 'Points': [points, points - 10]}),
+            'df_bcr': pd.DataFrame({'SeasonOrder': season_order, 'Round': [1, 1, 2, 2], 'Team': teams + teams[::-1],
+                                    'Position': [1, 2, 2, 1], 'Points': [3, 0, 3, 6]}),
+            'df_games': pd.DataFrame({'SeasonOrder': season_order, 'Round': [1, 2], 'HomeTeam': teams, 'AwayTeam': teams[::-1],
+                                      'B365H': [1.5, 2.25], 'B365D': [4.0, 3.2], 'B365A': [6.0, 3.0]}),
+            **{'leaderboard_' + name: pd.DataFrame({'SeasonOrder': season_order, 'Name': ['X'], 'Value': [points]})
+               for name in ['scorers', 'assists', 'discipline', 'teams']}}
+
+
+def dataset(points):
+    metadata = {'P1': [{'SeasonOrder': season_order, 'Season': str(season_order), 'SeasonExtended': str(season_order),
+                        'FirstRound': 1, 'LastRound': 2, 'Version': frame_version(season_frames(season_order, value)['df_class'])}
+                       for season_order, value in sorted(points.items())]}
+    return Dataset(metadata, lambda league, season_order: season_frames(season_order, points[season_order]))
+
+
+@pytest.fixture
+def api():
+    app = dash.Dash(__name__)
+    app.layout = html.Div()
+    data = dataset({1: 70, 2: 75})
+    return data, DataAPI(app, data), app.server.test_client()
+
+
+def url(season_order, resource = 'classification'):
+    return '{}/P1/{}/{}'.format(API_PREFIX, season_order, resource)
+
+
+# brotli and pyarrow are optional, as in the API
+DECODE = dict({'gzip': gzip.decompress, 'identity': lambda body: body}, **({'br': brotli.decompress} if brotli is not None else {}))
+
+
+def test_each_encoding_has_its_own_etag(api):
+    data, data_api, client = api
+    etags = {}
+    for encoding in DECODE:
+        response = client.get(url(1), headers = {'Accept-Encoding': encoding})
+        assert response.status_code == 200
+        assert response.headers.get('Content-Encoding', 'identity') == encoding
+        assert response.headers['Vary'] == 'Accept, Accept-Encoding'
+        body = json.loads(DECODE[encoding](response.get_data()))
+        assert [row['Points'] for row in body['rows']] == [70, 60]
+        etags[encoding] = response.headers['ETag']
+
+    assert len(set(etags.values())) == len(DECODE)
+    assert data_api.requests[('classification', 200)] == len(DECODE)
+
+
+def test_matching_if_none_match_is_not_modified(api):
+    data, data_api, client = api
+    etag = client.get(url(1, 'standings/2'), headers = {'Accept-Encoding': 'gzip'}).headers['ETag']
+
+    response = client.get(url(1, 'standings/2'), headers = {'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.get_data() == b''
+
+    # Another resource of the season does not match
+    assert client.get(url(1, 'standings/1'), headers = {'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 200
+
+
+def test_etags_change_with_the_partition(api):
+    data, data_api, client = api
+    etags = {season_order: client.get(url(season_order)).headers['ETag'] for season_order in [1, 2]}
+
+    # A runtime replacement of season 1, persisted to the store (e.g. by the standings engine)
+    df_class = season_frames(1, 71)['df_class']
+    data.replace_partition('P1', 1, {'df_class': df_class}, version = frame_version(df_class))
+    response = client.get(url(1), headers = {'If-None-Match': etags[1]})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etags[1]
+    assert [row['Points'] for row in response.get_json()['rows']] == [71, 61]
+    assert client.get(url(2), headers = {'If-None-Match': etags[2]}).status_code == 304
+
+    # The hot reload that follows, with new data for season 2 as well: season 1 keeps its replaced partition
+    etags[1] = response.headers['ETag']
+    changed = data.reload(dataset({1: 71, 2: 76}))
+    data_api.invalidate(changed)
+    assert changed == [('P1', 2)]
+    assert client.get(url(1), headers = {'If-None-Match': etags[1]}).status_code == 304
+    response = client.get(url(2), headers = {'If-None-Match': etags[2]})
+    assert response.status_code == 200
+    assert [row['Points'] for row in response.get_json()['rows']] == [76, 66]
+
+
+@pytest.mark.parametrize('query, accept, status, mimetype', [
+    ('', 'text/csv', 406, 'application/json'),
+    ('?format=csv', None, 406, 'application/json'),
+    ('', None, 200, 'application/json'),
+    ('', 'text/csv, application/json;q=0.5', 200, 'application/json'),
+    ('', 'application/vnd.apache.arrow.stream', 200, 'application/vnd.apache.arrow.stream')])
+def test_formats(api, query, accept, status, mimetype):
+    data, data_api, client = api
+    if pa is None and accept == 'application/vnd.apache.arrow.stream':
+        pytest.skip("pyarrow is not installed")
+    response = client.get(url(2) + query, headers = {'Accept': accept} if accept else {})
+
+    assert response.status_code == status
+    assert response.mimetype == mimetype
+    if status == 406:
+        assert response.get_json()['formats'] == (['json', 'arrow'] if pa is not None else ['json'])
+
+
+def test_unknown_season_and_resource(api):
+    data, data_api, client = api
+
+    assert client.get(url(9)).status_code == 404
+    assert client.get(url(1, 'transfers')).status_code == 404
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from odds import OddsAnalytics
+
+
+
+# Odds analytics of three hand-computed matches and two bookmakers, each missing the odds of one match:
+#
+#   match            result   Bet365 (H D A)     fair          Pinnacle (H D A)   fair
+#   Alpha - Beta     H        1.6  3.2  3.2      .5 .25 .25    2    4    4        .5  .25 .25
+#   Gamma - Alpha    D        2.5  2.5  5        .4 .4  .2     -    -    -
+#   Beta - Gamma     A        2    -    3        (missing)     4    4    2        .25 .25 .5
+#
+# Bet365 has a 25% margin on the first match and none on the second; favourite ties go to the home win, underdog ties to the
+# draw
+
+def analytics():
+    matches = pd.DataFrame({'Div': ['P1'] * 4,
+                            'SeasonOrder': [1, 1, 1, 1],
+                            'HomeTeam': ['Alpha', 'Gamma', 'Beta', 'Alpha'],
+                            'AwayTeam': ['Beta', 'Alpha', 'Gamma', 'Gamma'],
+                            'Res': ['H', 'D', 'A', np.nan],                        # the last match was not played
+                            'B365H': [1.6, 2.5, 2, 2], 'B365D': [3.2, 2.5, np.nan, 3], 'B365A': [3.2, 5, 3, 4],
+                            'PH': [2, np.nan, 4, 2], 'PD': [4, np.nan, 4, 3], 'PA': [4, np.nan, 2, 4]})
+    return OddsAnalytics(matches)
+
+
+def test_bookmakers_count_only_the_matches_with_all_three_odds():
+    odds = analytics()
+    bookmakers = odds.season_bookmakers('P1', 1).set_index('Bookmaker')
+
+    assert odds.books == ['B365', 'P']
+    assert bookmakers['Name'].to_dict() == {'B365': 'Bet365', 'P': 'Pinnacle'}
+    assert bookmakers['Matches'].to_dict() == {'B365': 2, 'P': 2}
+
+
+@pytest.mark.parametrize('book, expected', [
+    ('B365', {'Margin': 0.125, 'FavouriteWins': 0.5, 'FavouriteROI': -0.2, 'UnderdogROI': -1.0,
+              'HomeROI': -0.2, 'DrawROI': 0.25, 'AwayROI': -1.0, 'Brier': (0.375 + 0.56) / 2}),
+    ('P', {'Margin': 0.0, 'FavouriteWins': 1.0, 'FavouriteROI': 1.0, 'UnderdogROI': -1.0,
+           'HomeROI': 0.0, 'DrawROI': -1.0, 'AwayROI': 0.0, 'Brier': 0.375})])
+def test_margin_favourites_and_roi(book, expected):
+    row = analytics().season_bookmakers('P1', 1).set_index('Bookmaker').loc[book]
+
+    assert row[list(expected)].to_dict() == pytest.approx(expected)
+
+
+def test_fair_probabilities_per_team():
+    teams = analytics().season_teams('P1', 1, 'B365').set_index('Team')
+
+    assert teams['Matches'].to_dict() == {'Alpha': 2, 'Beta': 1, 'Gamma': 1}
+    assert teams['Wins'].to_dict() == {'Alpha': 1, 'Beta': 0, 'Gamma': 0}
+    assert teams['ExpectedWins'].to_dict() == pytest.approx({'Alpha': 0.5 + 0.2, 'Beta': 0.25, 'Gamma': 0.4})
+    assert teams['ROI'].to_dict() == pytest.approx({'Alpha': (0.6 - 1) / 2, 'Beta': -1.0, 'Gamma': -1.0})
+
+
+def test_calibration_buckets():
+    odds = analytics()
+    calibration = odds.season_calibration('P1', 1, 'P').set_index('Bucket')
+
+    # Pinnacle: four outcomes at a fair .25 (none happened) and two at .5 (both happened)
+    assert calibration['Outcomes'].to_dict() == {2: 4, 5: 2}
+    assert calibration['Predicted'].to_dict() == pytest.approx({2: 0.25, 5: 0.5})
+    assert calibration['Observed'].to_dict() == pytest.approx({2: 0.0, 5: 1.0})
+
+    # A single season: the league calibration is the season's
+    league = odds.league_calibration('P1', 'P').set_index('Bucket')
+    assert league['Outcomes'].to_dict() == {2: 4, 5: 2}
+    assert league['Observed'].to_dict() == pytest.approx({2: 0.0, 5: 1.0})
+
+
+def test_unknown_seasons_are_empty():
+    odds = analytics()
+
+    assert odds.season_bookmakers('P1', 2).empty
+    assert odds.season_calibration('P2', 1, 'P').empty
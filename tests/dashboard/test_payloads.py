@@ -0,0 +1,57 @@
+import logging
+
+import dash
+import dash_html_components as html
+import pytest
+from dash.dependencies import Input, Output
+
+from metrics import Metrics
+from payloads import PayloadStats
+
+
+
+# Payload sizes of a one-callback app: every invocation is sized and logged by default, and the sizes are exported on /metrics
+
+def app_with_stats(sample_every):
+    app = dash.Dash(__name__)
+    app.layout = html.Div([html.Div(id = 'source'), html.Div(id = 'target')])
+
+    @app.callback(Output('target', 'children'), [Input('source', 'children')])
+    def echo(value):
+        return 'x' * 100
+
+    metrics = Metrics()
+    stats = PayloadStats(sample_every = sample_every, metrics = metrics)
+    stats.attach(app)
+    return app, stats, metrics
+
+
+def invoke(app, times):
+    client = app.server.test_client()
+    for _ in range(times):
+        client.post('/_dash-update-component', json = {'output': 'target.children', 'outputs': {'id': 'target', 'property': 'children'},
+                                                       'inputs': [{'id': 'source', 'property': 'children', 'value': None}],
+                                                       'changedPropIds': ['source.children']})
+
+
+def test_every_invocation_is_sized_and_logged(caplog):
+    app, stats, metrics = app_with_stats(sample_every = 1)
+    with caplog.at_level(logging.INFO, logger = 'DashApp.payloads'):
+        invoke(app, 3)
+
+    assert [record.getMessage().split(':')[0] for record in caplog.records] == ['echo'] * 3
+    assert stats.report() == {'calls': {'echo': 3}, 'bytes': {'target.children': 3 * 102}}
+
+    exported = metrics.render()
+    assert 'liganos_response_size_bytes_count{callback="echo"} 3' in exported
+    assert 'liganos_output_size_bytes_sum{output="target.children"} 306' in exported
+
+
+@pytest.mark.parametrize('sample_every, sized', [(2, 2), (0, 0)])
+def test_sampling_is_opt_in(sample_every, sized):
+    app, stats, metrics = app_with_stats(sample_every)
+    invoke(app, 4)
+
+    assert stats.report()['calls'] == {'echo': 4}
+    assert 'liganos_response_size_bytes_count{callback="echo"} 4' in metrics.render()
+    assert stats.report()['bytes'].get('target.children', 0) == sized * 102 * sample_every
@@ -0,0 +1,24 @@
+from os.path import join
+
+from conftest import ROOT
+from data_store import open_dataset
+from search_index import SEARCH_FRAMES, SearchIndex, dataset_search_index
+
+
+
+# Updating the index with one season's frames only derives that season's rows: the result must match an index built from
+# scratch over the same frames
+
+def test_updated_matches_a_full_build():
+    data = open_dataset(join(ROOT, 'DASH', 'assets'), [name + '.csv' for name in SEARCH_FRAMES])
+    index = dataset_search_index(data)
+    keys = data.keys()
+
+    # The last season dropped, then added back
+    without_last = index.updated({}, removed = [keys[-1]])
+    assert without_last.profiles == SearchIndex.from_frames({key: data.partition_frames(*key) for key in keys[:-1]}).profiles
+
+    restored = without_last.updated({keys[-1]: data.partition_frames(*keys[-1])}, {keys[-1]: data.cache_version(*keys[-1])})
+    assert restored.version == index.version
+    assert restored.profiles == index.profiles
+    assert restored.search('v gui') == index.search('v gui')
@@ -0,0 +1,75 @@
+from io import StringIO
+from os.path import join
+
+import pandas as pd
+import pytest
+
+from conftest import ROOT
+from standings import StandingsEngine, history_frames
+
+
+
+# The whole-history frames (the ETL export) and the incremental engine must agree on every season: the same df_bcr rows
+# (every team that has played by each round) with the same positions, and the same final tables
+ASSETS = join(ROOT, 'DASH', 'assets')
+
+
+@pytest.fixture(scope = 'module')
+def frames():
+    return history_frames(pd.read_csv(join(ASSETS, 'df_liganos.csv'), index_col = 0, low_memory = False),
+                          pd.read_csv(join(ASSETS, 'df_rounds.csv'), index_col = 0),
+                          pd.read_csv(join(ASSETS, 'df_cards.csv'), index_col = 0))
+
+
+def season_engine(frames, season_order):
+    df_games = frames['df_games'][frames['df_games']['SeasonOrder'] == season_order]
+    engine = StandingsEngine(df_games['Season'].iloc[0], season_order)
+    engine.add_games(df_games)
+    return engine
+
+
+def test_engine_matches_history_on_every_season(frames):
+    bcr_columns = ['Team', 'Round', 'TotalPoints', 'Position']
+    class_columns = ['Team', 'Games', 'Won', 'Drawn', 'Lost', 'Points', 'GoalsScored', 'GoalsConceded', 'GoalsDifference']
+
+    season_orders = frames['df_games']['SeasonOrder'].unique()
+    assert len(season_orders) == 24
+
+    for season_order in season_orders:
+        engine_frames = season_engine(frames, season_order).frames()
+
+        df_bcr = frames['df_bcr'][frames['df_bcr']['SeasonOrder'] == season_order]
+        pd.testing.assert_frame_equal(df_bcr[bcr_columns].reset_index(drop = True), engine_frames['df_bcr'][bcr_columns],
+                                      check_dtype = False, obj = 'df_bcr of season {}'.format(season_order))
+
+        df_class = frames['df_class'][frames['df_class']['SeasonOrder'] == season_order]
+        pd.testing.assert_frame_equal(df_class[class_columns].reset_index(drop = True), engine_frames['df_class'][class_columns],
+                                      check_dtype = False, obj = 'df_class of season {}'.format(season_order))
+
+
+def test_one_row_per_team_and_round(frames):
+    assert not frames['df_bcr'].duplicated(['SeasonOrder', 'Round', 'Team']).any()
+
+    # Every team that has played by a round is in its classification, so its size never shrinks within a season
+    teams = frames['df_bcr'].groupby(['SeasonOrder', 'Round']).size()
+    assert (teams.groupby(level = 0).diff().fillna(0) >= 0).all()
+
+
+def test_committed_exports_are_up_to_date(frames):
+    for name, df in frames.items():
+        committed = pd.read_csv(join(ASSETS, name + '.csv'), index_col = 0, low_memory = False)
+        built = pd.read_csv(StringIO(df.to_csv()), index_col = 0, low_memory = False)
+        pd.testing.assert_frame_equal(committed, built, obj = name + '.csv')
+
+
+def test_postponed_match_recomputes_the_later_rounds(frames):
+    engine = season_engine(frames, 27)
+    last_round = engine.last_round
+    before = {row['Team']: row['TotalPoints'] for row in engine.round_standings(last_round)}
+
+    rounds = engine.add_matches(pd.DataFrame([{'HomeTeam': 'SL Benfica', 'AwayTeam': 'Tondela', 'HG': 1, 'AG': 0, 'Round': 5}]))
+    after = {row['Team']: row['TotalPoints'] for row in engine.round_standings(last_round)}
+
+    assert rounds == [5] and engine.rounds_from(5)[-1] == last_round
+    assert after['SL Benfica'] == before['SL Benfica'] + 3
+    assert after['Tondela'] == before['Tondela']
@@ -0,0 +1,63 @@
+import gzip
+import re
+from os.path import join
+
+import dash
+import dash_html_components as html
+import pytest
+
+from conftest import ROOT
+from static_assets import ASSETS_MAX_AGE, PrebuiltLayout, add_asset_cache_headers, asset_url
+
+
+
+# Asset cache headers and the prebuilt layout, on a small app over the dashboard's assets folder
+
+@pytest.fixture
+def app():
+    app = dash.Dash(__name__, assets_folder = join(ROOT, 'DASH', 'assets'))
+    app.layout = html.Div([html.Img(src = asset_url(app, 'liga-nos-png.png'))], id = 'page')
+    add_asset_cache_headers(app)
+    PrebuiltLayout(app)
+    return app
+
+
+def linked_assets(client):
+    # The stylesheet and script URLs Dash writes in the index page, with its own ?m= parameter
+    return re.findall(r'(?:href|src)="(/assets/[^"]+\?m=[^"]+)"', client.get('/').get_data(as_text = True))
+
+
+def test_dash_linked_assets_are_long_cached(app):
+    client = app.server.test_client()
+    urls = linked_assets(client)
+    assert any('bWLwfP_LigaNOS.css' in url for url in urls) and any('clientside.js' in url for url in urls)
+
+    for url in urls + [asset_url(app, 'liga-nos-png.png')]:
+        cache_control = client.get(url).cache_control
+        assert cache_control.public and cache_control.immutable and cache_control.max_age == ASSETS_MAX_AGE, url
+        assert not cache_control.no_cache, url
+
+
+def test_unversioned_asset_is_not_long_cached(app):
+    assert app.server.test_client().get('/assets/clientside.js').cache_control.max_age is None
+
+
+def test_layout_negotiates_gzip_with_q_values(app):
+    client = app.server.test_client()
+    identity = client.get('/_dash-layout', headers = {'Accept-Encoding': 'gzip;q=0, br'})
+    gzipped = client.get('/_dash-layout', headers = {'Accept-Encoding': 'gzip, deflate'})
+
+    assert 'Content-Encoding' not in identity.headers
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(gzipped.get_data()) == identity.get_data()
+    assert identity.headers['ETag'] != gzipped.headers['ETag']
+
+
+def test_layout_not_modified_keeps_the_validator(app):
+    client = app.server.test_client()
+    full = client.get('/_dash-layout', headers = {'Accept-Encoding': 'gzip'})
+    revalidated = client.get('/_dash-layout', headers = {'Accept-Encoding': 'gzip', 'If-None-Match': full.headers['ETag']})
+
+    assert revalidated.status_code == 304
+    for header in ['ETag', 'Vary', 'Cache-Control']:
+        assert revalidated.headers[header] == full.headers[header]
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from table_queries import filter_frame, query_page, requested_page, split_filter_part
+
+
+
+# Server-side filtering, paging and page reset of the history tables (DataTable custom mode)
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({'HomeTeam': ['Benfica', 'Arouca', 'Gil Vicente', 'Rio Ave', 'Porto'],
+                         'Season': ['2019/20', '2019/20', '2020/21', '2020/21', '2021/22'],
+                         'Points': [87, 37, 34, 43, 91]})
+
+
+@pytest.mark.parametrize('filter_part, expected', [
+    ('{Points} >= 70', ('Points', 'ge', '70')),
+    ('{Points}<=70', ('Points', 'le', '70')),
+    ('{Points} gt 70', ('Points', 'gt', '70')),
+    ('{HomeTeam} = "Rio Ave"', ('HomeTeam', 'eq', 'Rio Ave')),
+    ("{HomeTeam} contains 'a \\' b'", ('HomeTeam', 'contains', "a ' b")),
+    ('{HomeTeam} contains "ne "', ('HomeTeam', 'contains', 'ne ')),       # an operator token inside the operand
+    ('{HomeTeam} contains s<', ('HomeTeam', 'contains', 's<')),
+    ('{HomeTeam} icontains porto', ('HomeTeam', 'contains', 'porto')),
+    ('{Season} datestartswith 2020', ('Season', 'datestartswith', '2020')),
+    ('Points > 3', (None, None, None)),
+])
+def test_split_filter_part(filter_part, expected):
+    assert split_filter_part(filter_part) == expected
+
+
+def test_filter_frame_quoted_and_combined_operands(df):
+    assert filter_frame(df, '{HomeTeam} = "Rio Ave"')['HomeTeam'].tolist() == ['Rio Ave']
+    assert filter_frame(df, '{HomeTeam} contains "e " && {Points} < 40')['HomeTeam'].tolist() == []
+    assert filter_frame(df, '{HomeTeam} contains "vi" && {Points} < 40')['HomeTeam'].tolist() == ['Gil Vicente']
+    assert filter_frame(df, '{Points} contains 9')['HomeTeam'].tolist() == ['Porto']
+    assert filter_frame(df, '{Season} datestartswith 2020')['HomeTeam'].tolist() == ['Gil Vicente', 'Rio Ave']
+
+
+def test_filter_frame_skips_non_numeric_operands_of_numeric_columns(df):
+    assert filter_frame(df, '{Points} > abc').equals(df)
+    assert filter_frame(df, '{Points} > abc && {Points} > 80')['HomeTeam'].tolist() == ['Benfica', 'Porto']
+    assert filter_frame(df, '{Unknown} > 1').equals(df)
+
+
+def test_query_page_moves_past_the_end_back_to_the_last_page(df):
+    rows, page_count, page_current = query_page(df, 4, 2, [{'column_id': 'Points', 'direction': 'desc'}])
+    assert (page_count, page_current) == (3, 2)
+    assert [row['HomeTeam'] for row in rows] == ['Gil Vicente']
+
+    rows, page_count, page_current = query_page(df, 2, 2, filter_query = '{Points} > 40')
+    assert (page_count, page_current) == (2, 1)
+    assert [row['HomeTeam'] for row in rows] == ['Porto']
+
+
+def test_requested_page_resets_on_the_reset_inputs():
+    reset_inputs = ['season-slider.value', 'fixtures-table.filter_query']
+    assert requested_page(3, [{'prop_id': 'fixtures-table.page_current', 'value': 3}], reset_inputs) == 3
+    assert requested_page(3, [{'prop_id': 'fixtures-table.filter_query', 'value': ''}], reset_inputs) == 0
+    assert requested_page(3, [{'prop_id': 'season-slider.value', 'value': 27},
+                              {'prop_id': 'fixtures-table.page_current', 'value': 3}], reset_inputs) == 0
@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import team_profiles
+from team_profiles import FEATURES, TeamProfiles, describe, fit_profiles, nearest_team_seasons, open_profiles, profiles_path, \
+                          profiles_version
+
+
+
+# Team profiles: distinct profile descriptions, the blocked nearest team-seasons against a brute-force computation over a
+# small matrix with missing features, and the persisted fit (a save/load round trip, found by the files signature alone)
+
+def brute_force_nearest(X, observed, leagues, season_orders, n):
+    nearest, distances = [], []
+    for i in range(len(X)):
+        row_distances = []
+        for j in range(len(X)):
+            both = observed[i] & observed[j]
+            if leagues[i] == leagues[j] and season_orders[i] == season_orders[j]:
+                row_distances.append(np.inf)
+            else:
+                squares = sum((X[i, k] - X[j, k]) ** 2 for k in range(X.shape[1]) if both[k])
+                row_distances.append(np.sqrt(squares * X.shape[1] / max(both.sum(), 1)))
+        order = sorted(range(len(X)), key = lambda j: (row_distances[j], j))[:n]
+        nearest.append(order)
+        distances.append([row_distances[j] for j in order])
+    return np.array(nearest), np.array(distances)
+
+
+@pytest.mark.parametrize('n', [3, 7])
+def test_nearest_team_seasons_match_brute_force(monkeypatch, n):
+    # Blocks of 3 rows out of 7, and n = 7 leaves the team-seasons of the same season at an infinite distance
+    monkeypatch.setattr(team_profiles, 'DISTANCE_BLOCK', 3)
+    X = np.random.RandomState(0).normal(size = (7, 4))
+    X[[0, 2, 5], [3, 1, 3]] = np.nan
+    X[6, :2] = np.nan
+    observed = ~np.isnan(X)
+    leagues = np.array(['P1', 'P1', 'P1', 'P1', 'P2', 'P2', 'P2'])
+    season_orders = np.array([1, 1, 2, 2, 1, 1, 2])
+
+    nearest, distances = nearest_team_seasons(X, observed, leagues, season_orders, n)
+    expected_nearest, expected_distances = brute_force_nearest(X, observed, leagues, season_orders, n)
+
+    np.testing.assert_array_equal(nearest[np.isfinite(distances)], expected_nearest[np.isfinite(expected_distances)])
+    np.testing.assert_allclose(distances, expected_distances)
+
+
+def test_descriptions_are_distinct():
+    features = list(FEATURES)
+    centroids = np.zeros((4, len(features)))
+    # The first two profiles share their two main features (in another order) and differ on the third, the last two are the
+    # same profile
+    for profile, values in enumerate([{'GoalsScoredPerGame': 3, 'GoalsConcededPerGame': -2, 'FoulsPerGame': 1},
+                                      {'GoalsScoredPerGame': 2, 'GoalsConcededPerGame': -3, 'FoulsPerGame': -1},
+                                      {'DrawRate': 2}, {'DrawRate': 2}]):
+        for feature, value in values.items():
+            centroids[profile, features.index(feature)] = value
+    coverages = np.ones_like(centroids)
+    coverages[:, features.index('PointsPerGame')] = 0.2
+
+    descriptions = describe(centroids, coverages)
+
+    assert descriptions[:2] == ["many goals scored, few goals conceded, many fouls",
+                                "few goals conceded, many goals scored, few fouls"]
+    assert descriptions[2].startswith("many draws, ") and descriptions[2].endswith("(profile 3)")
+    assert len(set(descriptions)) == 4
+    assert describe(centroids[:3], coverages[:3])[2] == "many draws, few wins"
+
+
+def teams_frame(rows = 12):
+    rng = np.random.RandomState(1)
+    teams = pd.DataFrame({'League': ['P1'] * rows,
+                          'SeasonOrder': np.repeat([1, 2, 3], rows // 3),
+                          'SeasonExtended': np.repeat(['2000/2001', '2001/2002', '2002/2003'], rows // 3),
+                          'Team': ['Team {}'.format(i % 4) for i in range(rows)],
+                          'Position': np.tile(np.arange(1, 5), rows // 4),
+                          'Points': rng.randint(20, 80, rows)})
+    for feature in FEATURES:
+        teams[feature] = rng.normal(size = rows)
+    teams.loc[:3, ['ShotsPerGame', 'CornersPerGame', 'FoulsPerGame']] = np.nan
+    return teams
+
+
+def test_save_load_round_trip(tmp_path):
+    profiles = TeamProfiles('v1', *fit_profiles(teams_frame(), clusters = 3))
+    profiles.save(str(tmp_path / 'v1'))
+    loaded = TeamProfiles.load(str(tmp_path / 'v1'))
+
+    assert loaded.version == 'v1'
+    assert loaded.model == dict(profiles.model, version = 'v1')
+    assert loaded.profiles == profiles.profiles
+    for season_order in [1, 2, 3]:
+        pd.testing.assert_frame_equal(loaded.season_teams('P1', season_order).reset_index(drop = True),
+                                      profiles.season_teams('P1', season_order).reset_index(drop = True))
+    pd.testing.assert_frame_equal(loaded.similar_teams('P1', 2, 'Team 1').reset_index(drop = True),
+                                  profiles.similar_teams('P1', 2, 'Team 1').reset_index(drop = True))
+    assert loaded.similar_teams('P1', 2, 'Team 9').empty
+
+
+def test_open_profiles_by_files_signature(tmp_path, monkeypatch):
+    root_path = str(tmp_path / 'assets')
+    os.makedirs(root_path)
+    for name in ['df_class.csv', 'df_liganos.csv']:
+        with open(os.path.join(root_path, name), 'w') as csv_file:
+            csv_file.write('Team\n')
+
+    # The CSVs are never read to find the fit
+    monkeypatch.setattr(team_profiles, 'read_inputs', lambda root_path: pytest.fail("CSVs read"))
+    assert open_profiles(root_path, clusters = 3) is None
+
+    version = profiles_version(root_path, 3, team_profiles.SEED)
+    TeamProfiles(version, *fit_profiles(teams_frame(), clusters = 3)).save(os.path.join(profiles_path(root_path), version))
+    assert open_profiles(root_path, clusters = 3).version == version
+    assert open_profiles(root_path, clusters = 4) is None
+
+    with open(os.path.join(root_path, 'df_class.csv'), 'a') as csv_file:
+        csv_file.write('Porto\n')
+    assert profiles_version(root_path, 3, team_profiles.SEED) != version
+    assert open_profiles(root_path, clusters = 3) is None
@@ -0,0 +1,71 @@
+import json
+from glob import glob
+from os.path import abspath, basename, dirname, join
+
+import pandas as pd
+import pytest
+
+from ingestion.fixtures import football_data_index_page, futebol365_round_page, zerozero_stats_page
+from ingestion.parsers import PARSERS, RoundGame, SeasonFile, parse_futebol365_round, parse_zerozero_stats
+
+
+
+# Every page in pages/ is parsed with the parser, arguments and expected records of the JSON file next to it
+# ({"parser": ..., "context": {...}, "records": [...]}). Pages saved from the sites (e.g. from the fetcher's response cache)
+# are added the same way
+PAGES = join(dirname(abspath(__file__)), 'pages')
+
+
+def records(parsed):
+    return [list(record) if isinstance(record, tuple) else record for record in parsed]
+
+
+@pytest.mark.parametrize('page_path', sorted(glob(join(PAGES, '*.html'))), ids = basename)
+def test_saved_pages(page_path):
+    with open(page_path[:-len('.html')] + '.json', encoding = 'utf-8') as expected_file:
+        expected = json.load(expected_file)
+    with open(page_path, encoding = 'utf-8') as page_file:
+        page = page_file.read()
+
+    assert records(PARSERS[expected['parser']](page, **expected['context'])) == expected['records']
+
+
+def test_futebol365_skips_date_and_score_cells():
+    page = futebol365_round_page(2019, '7', [('SL Benfica', 'FC Porto'), ('Rio Ave', 'Tondela')])
+    assert list(parse_futebol365_round(page, 2019)) == [RoundGame('2019-2020', '7', 'SL Benfica', 'FC Porto'),
+                                                           RoundGame('2019-2020', '7', 'Rio Ave', 'Tondela')]
+
+
+def test_futebol365_team_cells_on_one_line_or_without_teams():
+    # Three-line cells (dash or score in the middle) and single-line ones; cells without two team names are skipped
+    cells = ['\n  Gil Vicente 2\n 2 - 0 \nCasa Pia\n', 'Arouca -  Vizela', '\n\tSporting-Braga B\n-\nRio Ave\n',
+             'Adiado', 'FC Porto - ', ' - ']
+    page = '<h5 class="headerTitleSimpleBackground">3ª Jornada</h5>' + \
+           ''.join('<td class="align-left hide-xlarge hide-large hide-medium">{}</td>'.format(cell) for cell in cells)
+    assert list(parse_futebol365_round(page, 2022)) == [RoundGame('2022-2023', '3', 'Gil Vicente 2', 'Casa Pia'),
+                                                           RoundGame('2022-2023', '3', 'Arouca', 'Vizela'),
+                                                           RoundGame('2022-2023', '3', 'Sporting-Braga B', 'Rio Ave')]
+
+
+def test_futebol365_page_without_games():
+    assert list(parse_futebol365_round('<html><body><p>Sem jogos</p></body></html>', 2019)) == []
+
+
+def test_zerozero_types_and_incomplete_rows():
+    df = pd.DataFrame({'Equipa': ['Sporting CP', 'SC Braga', 'Tondela'], 'J': [34, 34, 34], 'A': [70, 65, ''],
+                       'Media': [2.06, 1.91, 1.5]})
+    rows = list(parse_zerozero_stats(zerozero_stats_page(df), 2020))
+
+    assert rows == [{'Season': '2021', 'Equipa': 'Sporting CP', 'J': 34, 'A': 70, 'Media': 2.06},
+                    {'Season': '2021', 'Equipa': 'SC Braga', 'J': 34, 'A': 65, 'Media': 1.91}]
+    assert [type(rows[0][column]) for column in ['J', 'A', 'Media']] == [int, int, float]
+
+
+def test_zerozero_page_without_stats_table():
+    assert list(parse_zerozero_stats('<table><tr><th>Jogador</th></tr><tr><td>X</td></tr></table>', 2020)) == []
+
+
+def test_football_data_index():
+    page = football_data_index_page([2020, 2019])
+    assert list(PARSERS['football-data'](page)) == [SeasonFile('2021', 'http://www.football-data.co.uk/mmz4281/2021/P1.csv'),
+                                                    SeasonFile('1920', 'http://www.football-data.co.uk/mmz4281/1920/P1.csv')]
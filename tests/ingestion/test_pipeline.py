@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+import ingestion.fetcher
+from ingestion.checkpoint import Checkpoint
+from ingestion.fetcher import FetchError, Fetcher
+from ingestion.fixtures import FixtureServer, futebol365_round_page, write_fixture
+from ingestion.parsers import PARSERS
+from ingestion.pipeline import run
+from ingestion.sources import futebol365_round_jobs
+
+
+
+# Fetching, retries and resumable runs against the local fixture server: six futebol365 round pages of the 2019/20 season
+SEASON_ROUNDS = {2019: 6}
+
+
+@pytest.fixture
+def site(tmp_path):
+    folder = str(tmp_path / 'site')
+    for job in futebol365_round_jobs(SEASON_ROUNDS, root = ''):
+        game_round = int(job.key.rsplit('/', 1)[1])
+        write_fixture(folder, job.url, futebol365_round_page(2019, str(game_round), [('Home {}'.format(game_round), 'Away')]))
+    return folder
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Backoff delays, recorded instead of slept
+    delays = []
+    monkeypatch.setattr(ingestion.fetcher.time, 'sleep', delays.append)
+    return delays
+
+
+def test_fixture_server(site):
+    url = futebol365_round_jobs(SEASON_ROUNDS, root = '')[0].url
+    with FixtureServer(site) as server:
+        fetcher = Fetcher(retries = 0)
+        assert 'Home 1' in fetcher.fetch(server.url + url)
+        with pytest.raises(FetchError, match = 'HTTP 404'):
+            fetcher.fetch(server.url + '/missing')
+        assert server.requests == 2
+
+
+def test_retries_with_exponential_backoff(site, sleeps):
+    url = futebol365_round_jobs(SEASON_ROUNDS, root = '')[0].url
+    with FixtureServer(site, fail_every = 2) as server:
+        fetcher = Fetcher(retries = 3, backoff = 0.5)
+        fetcher.fetch(server.url + url)             # request 1
+        assert 'Home 1' in fetcher.fetch(server.url + url)     # request 2 gets a 503, its retry succeeds
+        assert server.requests == 3
+        assert sleeps == [0.5]
+
+
+def test_gives_up_after_the_retries(site, sleeps):
+    url = futebol365_round_jobs(SEASON_ROUNDS, root = '')[0].url
+    with FixtureServer(site, fail_every = 1) as server:
+        with pytest.raises(FetchError, match = 'HTTP 503'):
+            Fetcher(retries = 3, backoff = 0.5).fetch(server.url + url)
+        assert server.requests == 4
+        assert sleeps == [0.5, 1.0, 2.0]
+
+
+def test_no_retry_on_client_errors(site, sleeps):
+    with FixtureServer(site) as server:
+        with pytest.raises(FetchError):
+            Fetcher(retries = 3).fetch(server.url + '/missing')
+        assert server.requests == 1
+        assert sleeps == []
+
+
+def test_response_cache(site, tmp_path):
+    url = futebol365_round_jobs(SEASON_ROUNDS, root = '')[0].url
+    with FixtureServer(site) as server:
+        fetcher = Fetcher(cache_folder = str(tmp_path / 'cache'))
+        assert fetcher.fetch(server.url + url) == fetcher.fetch(server.url + url)
+        assert server.requests == 1
+
+
+def test_resume_after_interruption(site, tmp_path):
+    parse = PARSERS['futebol365']
+    parsed = []
+
+    def interrupted_parse(page, **context):
+        # The run is interrupted while the third page is parsed
+        if len(parsed) == 2:
+            raise KeyboardInterrupt
+        parsed.append(page)
+        return parse(page, **context)
+
+    checkpoint_path = str(tmp_path / 'futebol365.checkpoint.jsonl')
+    with FixtureServer(site) as server:
+        jobs = futebol365_round_jobs(SEASON_ROUNDS, root = server.url)
+
+        with pytest.raises(KeyboardInterrupt):
+            run(jobs, interrupted_parse, Fetcher(max_workers = 1), Checkpoint(checkpoint_path))
+
+        # A line cut short by the interruption is ignored: that job runs again
+        with open(checkpoint_path, 'a', encoding = 'utf-8') as checkpoint_file:
+            checkpoint_file.write('{"key": "futebol365/2019/03", "rec')
+
+        checkpoint = Checkpoint(checkpoint_path)
+        assert len(checkpoint) == 2
+        requests = server.requests
+
+        assert run(jobs, parse, Fetcher(max_workers = 2), checkpoint) == []
+        assert server.requests - requests == len(jobs) - 2
+
+    resumed = Checkpoint(checkpoint_path)
+    assert sorted(resumed.done) == sorted(job.key for job in jobs)
+    assert sorted(record['HomeTeam'] for record in resumed.records()) == ['Home {}'.format(n) for n in range(1, 7)]
+
+
+def test_failed_jobs_are_left_for_the_next_run(site, tmp_path, sleeps):
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.jsonl'))
+    with FixtureServer(site) as server:
+        jobs = futebol365_round_jobs({2019: 7}, root = server.url)      # round 7 has no page
+        failed = run(jobs, PARSERS['futebol365'], Fetcher(retries = 0), checkpoint)
+
+    assert [job.key for job in failed] == ['futebol365/2019/07']
+    assert len(checkpoint) == 6
+    with open(checkpoint.path, encoding = 'utf-8') as checkpoint_file:
+        assert all(json.loads(line)['key'] != 'futebol365/2019/07' for line in checkpoint_file)